@@ -9,6 +9,7 @@ import netshare.pre_post_processors as pre_post_processors
 import netshare.model_managers as model_managers
 import netshare.models as models
 from ..pre_post_processors.netshare.util import create_sdmetrics_config
+from ..utils import read_table, find_table
 
 from config_io import Config
 from sdmetrics.reports.timeseries import QualityReport
@@ -203,9 +204,8 @@ class Generator(object):
     def visualize(self, work_folder, local_web, local_web_port=8050):
         work_folder = os.path.expanduser(work_folder)
         os.makedirs(self._get_visualization_folder(work_folder), exist_ok=True)
-        real_data = pd.read_csv(
-            os.path.join(
-                self._get_pre_processed_data_folder(work_folder), "raw.csv"))
+        real_data = read_table(find_table(
+            self._get_pre_processed_data_folder(work_folder), "raw"))
         # Find synthetic data with the largest ID
         syn_data_list = [
             f
@@ -250,7 +250,10 @@ class Generator(object):
         my_report = QualityReport(
             config_dict=sdmetrics_config['config'])
         my_report.generate(real_data[synthetic_data.columns], synthetic_data,
-                           sdmetrics_config['metadata'])
+                           sdmetrics_config['metadata'], copy_data=False,
+                           executor=getattr(
+                               pre_post_processor_config,
+                               "quality_report_executor", None))
         my_report.fig2png(save_folder)
         my_report.fig2json(save_folder)
         my_report.save_result_as_json(save_folder)
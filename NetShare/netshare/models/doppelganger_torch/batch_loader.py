@@ -0,0 +1,48 @@
+import torch
+
+# `data_loader` options of DoppelGANger
+DATA_LOADERS = ["dataloader", "tensor"]
+
+
+class TensorBatchLoader(object):
+    '''Batches of in-memory tensors, w/o per-sample collation.
+
+    Yields the same kind of batches as `DataLoader(TensorDataset(*tensors),
+    batch_size, shuffle=shuffle, drop_last=drop_last)`: every pass over the
+    loader draws a new permutation of the samples, and every batch is
+    gathered from each tensor with a single `index_select` in the calling
+    process (no worker processes, no pickling).
+    '''
+
+    def __init__(self, tensors, batch_size, shuffle=True, drop_last=True,
+                 generator=None):
+        self.tensors = tensors
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.generator = generator
+
+        self.num_samples = tensors[0].size(0)
+        for tensor in tensors:
+            if tensor.size(0) != self.num_samples:
+                raise ValueError(
+                    "All tensors must have the same number of samples!")
+
+    def __len__(self):
+        if self.drop_last:
+            return self.num_samples // self.batch_size
+        return (self.num_samples + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        if self.shuffle:
+            indices = torch.randperm(
+                self.num_samples, generator=self.generator)
+        else:
+            indices = torch.arange(self.num_samples)
+        for batch_idx in range(len(self)):
+            batch_indices = indices[
+                batch_idx * self.batch_size:
+                (batch_idx + 1) * self.batch_size]
+            yield tuple(
+                tensor.index_select(0, batch_indices)
+                for tensor in self.tensors)
@@ -5,6 +5,7 @@ import datetime
 import numpy as np
 from tqdm import tqdm
 from .network import DoppelGANgerGenerator, Discriminator, AttrDiscriminator
+from .batch_loader import DATA_LOADERS, TensorBatchLoader
 from torch.autograd import Variable
 from torch.utils.data import DataLoader, TensorDataset
 from torch.utils.tensorboard import SummaryWriter
@@ -66,7 +67,17 @@ class DoppelGANger(object):
         attr_discriminator_num_units,
         # Pretrain-related
         restore=False,
-        pretrain_dir=None
+        pretrain_dir=None,
+        # "dataloader": torch DataLoader w/ worker processes
+        # "tensor": in-process batches sliced from the in-memory tensors
+        data_loader="dataloader",
+        # One fused Linear for all the feature output heads of the generator
+        # (see `FusedOutputHead`), loads checkpoints of the per-head layout
+        fused_feature_head=False,
+        # Generate w/ adaptive rolling this many LSTM steps at a time,
+        # dropping the ended sequences from the batch after every block
+        # (None: step by step over the whole batch)
+        rolling_block_size=None
     ):
 
         self.checkpoint_dir = checkpoint_dir
@@ -104,6 +115,12 @@ class DoppelGANger(object):
         self.generator_feature_num_units = generator_feature_num_units
         self.generator_feature_num_layers = generator_feature_num_layers
         self.use_adaptive_rolling = use_adaptive_rolling
+        self.fused_feature_head = fused_feature_head
+        if rolling_block_size is not None and rolling_block_size < 1:
+            raise ValueError(
+                "rolling_block_size must be positive, "
+                f"got {rolling_block_size}!")
+        self.rolling_block_size = rolling_block_size
 
         self.discriminator_num_layers = discriminator_num_layers
         self.discriminator_num_units = discriminator_num_units
@@ -114,6 +131,12 @@ class DoppelGANger(object):
         self.restore = restore
         self.pretrain_dir = pretrain_dir
 
+        if data_loader not in DATA_LOADERS:
+            raise ValueError(
+                f"Unknown data_loader {data_loader}! "
+                f"Supported data loaders: {DATA_LOADERS}")
+        self.data_loader = data_loader
+
         self.EPS = 1e-8
 
         self.MODEL_NAME = "model"
@@ -169,8 +192,10 @@ class DoppelGANger(object):
 
         self.check_data()
 
+        # w/o a copy if the data is already float32
         dataset = TensorDataset(
-            torch.Tensor(data_attribute), torch.Tensor(data_feature)
+            torch.as_tensor(data_attribute, dtype=torch.float32),
+            torch.as_tensor(data_feature, dtype=torch.float32)
         )
 
         self._train(dataset)
@@ -293,6 +318,11 @@ class DoppelGANger(object):
             raise Exception("Directory to load pytorch model doesn't exist")
 
         state = torch.load(model_path)
+        # A checkpoint of the per-head layout is converted when loaded into
+        # a fused feature head, its generator optimizer state doesn't match
+        per_head_to_fused = self.fused_feature_head and \
+            "feature_gen_last_layer.projection.weight" not in \
+            state["generator_state_dict"]
         self.generator.load_state_dict(state["generator_state_dict"])
         self.discriminator.load_state_dict(state["discriminator_state_dict"])
 
@@ -302,8 +332,12 @@ class DoppelGANger(object):
             )
 
         if "generator_optimizer_state_dict" in state:
-            self.opt_generator.load_state_dict(
-                state["generator_optimizer_state_dict"])
+            if per_head_to_fused:
+                print("Generator optimizer state of the per-head feature "
+                      "output layout is not restored.")
+            else:
+                self.opt_generator.load_state_dict(
+                    state["generator_optimizer_state_dict"])
             self.opt_discriminator.load_state_dict(
                 state["discriminator_optimizer_state_dict"]
             )
@@ -327,6 +361,8 @@ class DoppelGANger(object):
             feature_num_layers=self.generator_feature_num_layers,
             batch_size=self.batch_size,
             use_adaptive_rolling=self.use_adaptive_rolling,
+            fused_feature_head=self.fused_feature_head,
+            rolling_block_size=self.rolling_block_size,
             device=self.device
         )
         self.generator.to(self.device)
@@ -461,16 +497,24 @@ class DoppelGANger(object):
         if self.use_attr_discriminator:
             self.attr_discriminator.train()
 
-        loader = DataLoader(
-            dataset,
-            batch_size=self.batch_size * self.num_packing,
-            shuffle=True,
-            num_workers=2,
-            pin_memory=True,
-            drop_last=True,
-            prefetch_factor=2 + self.num_packing,
-            persistent_workers=True,
-        )
+        if self.data_loader == "tensor":
+            loader = TensorBatchLoader(
+                dataset.tensors,
+                batch_size=self.batch_size * self.num_packing,
+                shuffle=True,
+                drop_last=True,
+            )
+        else:
+            loader = DataLoader(
+                dataset,
+                batch_size=self.batch_size * self.num_packing,
+                shuffle=True,
+                num_workers=2,
+                pin_memory=True,
+                drop_last=True,
+                prefetch_factor=2 + self.num_packing,
+                persistent_workers=True,
+            )
         iteration = 0
         loss_dict = {
             "g_loss_d": 0.0,
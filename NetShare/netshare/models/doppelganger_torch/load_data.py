@@ -3,38 +3,103 @@ import math
 import numpy as np
 import pickle
 
+from .util import add_gen_flag, normalize_per_sample
 
-def load_data(path, sample_len, flag="train"):
+TRAIN_ARRAYS = ["data_feature", "data_attribute", "data_gen_flag"]
+
+
+def _load_arrays(path, flag, mmap_mode=None):
+    # `data_{flag}/<array>.npy` (memory-mapped if `mmap_mode` is set, see
+    # `split_per_chunk`) or `data_{flag}.npz`
+    npy_folder = os.path.join(path, "data_{}".format(flag))
+    if os.path.isdir(npy_folder):
+        arrays = {
+            name: np.load(
+                os.path.join(npy_folder, name + ".npy"), mmap_mode=mmap_mode)
+            for name in TRAIN_ARRAYS}
+    else:
+        data_npz = np.load(os.path.join(path, "data_{}.npz".format(flag)))
+        arrays = {name: data_npz[name] for name in TRAIN_ARRAYS}
 
-    data_npz = np.load(os.path.join(path, "data_{}.npz".format(flag)))
     with open(os.path.join(path, "data_feature_output.pkl"), "rb") as f:
         data_feature_outputs = pickle.load(f)
     with open(os.path.join(path, "data_attribute_output.pkl"), "rb") as f:
         data_attribute_outputs = pickle.load(f)
 
-    data_feature = data_npz["data_feature"]
-    data_attribute = data_npz["data_attribute"]
-    data_gen_flag = data_npz["data_gen_flag"]
+    return arrays, data_feature_outputs, data_attribute_outputs
+
+
+def load_train_data(path, sample_len, self_norm, flag="train",
+                    block_size=1024, dtype=np.float32):
+    '''Load the training data, padded to a multiple of `sample_len`, then
+    `normalize_per_sample` (if `self_norm`) and `add_gen_flag`, as the
+    model takes them.
+
+    The arrays are memory-mapped when stored as `.npy` files, and processed
+    `block_size` samples at a time into preallocated `dtype` arrays, so that
+    the only full-size copies in memory are the returned arrays.
 
-    # Append data_feature and data_gen_flag to multiple of sample_len
-    timeseries_len = data_feature.shape[1]
+    Returns:
+        data_feature, data_attribute, data_gen_flag (padded to a multiple of
+        `sample_len`), data_feature_outputs (w/ the gen flag output),
+        data_attribute_outputs (w/ the self-norm outputs) and
+        real_attribute_mask.
+    '''
+    arrays, data_feature_outputs, data_attribute_outputs = _load_arrays(
+        path, flag, mmap_mode="r")
+    num_sample, timeseries_len = arrays["data_gen_flag"].shape
     ceil_timeseries_len = math.ceil(timeseries_len / sample_len) * sample_len
-    data_feature = np.pad(
-        data_feature,
-        pad_width=((0, 0),
-                   (0, ceil_timeseries_len - timeseries_len),
-                   (0, 0)),
-        mode='constant', constant_values=0)
-    data_gen_flag = np.pad(
-        data_gen_flag,
-        pad_width=((0, 0),
-                   (0, ceil_timeseries_len - timeseries_len)),
-        mode='constant', constant_values=0)
+    num_real_attribute = len(data_attribute_outputs)
+
+    data_feature = data_attribute = data_gen_flag = None
+    for start in range(0, max(num_sample, 1), block_size):
+        stop = min(start + block_size, num_sample)
+        block_feature = np.pad(
+            arrays["data_feature"][start:stop],
+            pad_width=((0, 0),
+                       (0, ceil_timeseries_len - timeseries_len),
+                       (0, 0)),
+            mode='constant', constant_values=0)
+        block_attribute = np.array(arrays["data_attribute"][start:stop])
+        block_gen_flag = np.pad(
+            arrays["data_gen_flag"][start:stop],
+            pad_width=((0, 0),
+                       (0, ceil_timeseries_len - timeseries_len)),
+            mode='constant', constant_values=0)
+        # The outputs are extended in place
+        block_attribute_outputs = list(data_attribute_outputs)
+        block_feature_outputs = list(data_feature_outputs)
+
+        if self_norm:
+            block_feature, block_attribute, block_attribute_outputs, \
+                real_attribute_mask = normalize_per_sample(
+                    block_feature,
+                    block_attribute,
+                    block_feature_outputs,
+                    block_attribute_outputs)
+        else:
+            real_attribute_mask = [True] * num_real_attribute
+        block_feature, block_feature_outputs = add_gen_flag(
+            block_feature, block_gen_flag, block_feature_outputs, sample_len)
+
+        if data_feature is None:
+            data_feature = np.empty(
+                (num_sample,) + block_feature.shape[1:], dtype=dtype)
+            data_attribute = np.empty(
+                (num_sample,) + block_attribute.shape[1:], dtype=dtype)
+            data_gen_flag = np.empty(
+                (num_sample, ceil_timeseries_len), dtype=dtype)
+            final_feature_outputs = block_feature_outputs
+            final_attribute_outputs = block_attribute_outputs
+        data_feature[start:stop] = block_feature
+        data_attribute[start:stop] = block_attribute
+        data_gen_flag[start:stop] = block_gen_flag
 
     return (
         data_feature,
         data_attribute,
         data_gen_flag,
-        data_feature_outputs,
-        data_attribute_outputs,
+        final_feature_outputs,
+        final_attribute_outputs,
+        real_attribute_mask,
     )
@@ -91,6 +91,92 @@ class Discriminator(torch.nn.Module):
         return self.disc(input_)
 
 
+class FusedOutputHead(torch.nn.Module):
+    """
+    The output heads of `outputs` (repeated `repeat` times) as one Linear
+
+    Equivalent to concatenating the outputs of one `Linear(in_features,
+    output.dim)` followed by Softmax (discrete), Sigmoid (ZERO_ONE) or Tanh
+    (MINUSONE_ONE) per output: the activations are applied to the columns
+    of a single `Linear(in_features, sum(dims) * repeat)` through
+    precomputed index tensors, one softmax per distinct discrete dim.
+
+    State dicts of the per-head layout (a ModuleList of
+    Sequential(Linear, activation), i.e. `{i}.0.weight` and `{i}.0.bias`)
+    are loaded by concatenating the weights of the heads.
+    """
+
+    def __init__(self, in_features, outputs, repeat=1):
+        super(FusedOutputHead, self).__init__()
+        self.heads = [outputs[i % len(outputs)]
+                      for i in range(len(outputs) * repeat)]
+        self.projection = torch.nn.Linear(
+            in_features, int(np.sum([t.dim for t in self.heads])))
+
+        sigmoid_index = []
+        tanh_index = []
+        softmax_index = {}
+        offset = 0
+        for output in self.heads:
+            index = list(range(offset, offset + output.dim))
+            if output.type_ == OutputType.DISCRETE:
+                softmax_index.setdefault(output.dim, []).append(index)
+            elif output.normalization == Normalization.ZERO_ONE:
+                sigmoid_index += index
+            else:
+                tanh_index += index
+            offset += output.dim
+
+        # Columns of the activations, concatenated in this order
+        self.softmax_dims = sorted(softmax_index.keys())
+        order = sigmoid_index + tanh_index
+        for dim in self.softmax_dims:
+            order += [i for index in softmax_index[dim] for i in index]
+        self.register_buffer(
+            "sigmoid_index", torch.tensor(sigmoid_index, dtype=torch.long),
+            persistent=False)
+        self.register_buffer(
+            "tanh_index", torch.tensor(tanh_index, dtype=torch.long),
+            persistent=False)
+        for dim in self.softmax_dims:
+            self.register_buffer(
+                "softmax_index_{}".format(dim),
+                torch.tensor(softmax_index[dim], dtype=torch.long),
+                persistent=False)
+        self.register_buffer(
+            "inverse_order",
+            torch.from_numpy(np.argsort(order)),
+            persistent=False)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        if prefix + "projection.weight" not in state_dict and \
+                prefix + "0.0.weight" in state_dict:
+            for name in ["weight", "bias"]:
+                state_dict[prefix + "projection." + name] = torch.cat([
+                    state_dict.pop("{}{}.0.{}".format(prefix, i, name))
+                    for i in range(len(self.heads))])
+        super(FusedOutputHead, self)._load_from_state_dict(
+            state_dict, prefix, *args, **kwargs)
+
+    def forward(self, input_):
+        output = self.projection(input_)
+        activations = []
+        if len(self.sigmoid_index) > 0:
+            activations.append(torch.sigmoid(
+                output.index_select(-1, self.sigmoid_index)))
+        if len(self.tanh_index) > 0:
+            activations.append(torch.tanh(
+                output.index_select(-1, self.tanh_index)))
+        for dim in self.softmax_dims:
+            # (..., # of heads of this dim, dim)
+            segments = output[..., getattr(self, "softmax_index_{}".format(
+                dim))]
+            activations.append(
+                torch.softmax(segments, dim=-1).flatten(start_dim=-2))
+        return torch.cat(activations, dim=-1).index_select(
+            -1, self.inverse_order)
+
+
 class DoppelGANgerGenerator(torch.nn.Module):
     def __init__(
         self,
@@ -106,6 +192,8 @@ class DoppelGANgerGenerator(torch.nn.Module):
         feature_num_layers=1,
         batch_size=100,
         use_adaptive_rolling=True,
+        fused_feature_head=False,
+        rolling_block_size=None,
         device="cpu",
         scope_name="doppelganger_generator",
         *args,
@@ -121,8 +209,11 @@ class DoppelGANgerGenerator(torch.nn.Module):
         self.attribute_outputs = attribute_outputs
         self.feature_num_layers = feature_num_layers
         self.feature_num_units = feature_num_units
+        self.sample_len = sample_len
         self.batch_size = batch_size
         self.use_adaptive_rolling = use_adaptive_rolling
+        self.fused_feature_head = fused_feature_head
+        self.rolling_block_size = rolling_block_size
 
         self.use_addi_attribute_generator = True
 
@@ -229,29 +320,35 @@ class DoppelGANgerGenerator(torch.nn.Module):
             batch_first=True,
         )
 
-        self.feature_gen_last_layer = torch.nn.ModuleList()
         feature_len = len(self.feature_outputs)
         num_layer_units = self.feature_num_units
-        for i in range(feature_len * sample_len):
+        if self.fused_feature_head:
+            self.feature_gen_last_layer = FusedOutputHead(
+                num_layer_units, self.feature_outputs, sample_len)
+        else:
+            self.feature_gen_last_layer = torch.nn.ModuleList()
+            for i in range(feature_len * sample_len):
 
-            feature_out_layer = [
-                torch.nn.Linear(
-                    num_layer_units, self.feature_outputs[i % feature_len].dim
-                )
-            ]
-            if self.feature_outputs[i % feature_len].type_ == OutputType.DISCRETE:
-                feature_out_layer.append(torch.nn.Softmax(dim=-1))
-            else:
-                if (
-                    self.feature_outputs[i % feature_len].normalization
-                    == Normalization.ZERO_ONE
-                ):
-                    feature_out_layer.append(torch.nn.Sigmoid())
+                feature_out_layer = [
+                    torch.nn.Linear(
+                        num_layer_units,
+                        self.feature_outputs[i % feature_len].dim
+                    )
+                ]
+                if self.feature_outputs[i % feature_len].type_ == \
+                        OutputType.DISCRETE:
+                    feature_out_layer.append(torch.nn.Softmax(dim=-1))
                 else:
-                    feature_out_layer.append(torch.nn.Tanh())
+                    if (
+                        self.feature_outputs[i % feature_len].normalization
+                        == Normalization.ZERO_ONE
+                    ):
+                        feature_out_layer.append(torch.nn.Sigmoid())
+                    else:
+                        feature_out_layer.append(torch.nn.Tanh())
 
-            self.feature_gen_last_layer.append(
-                torch.nn.Sequential(*feature_out_layer))
+                self.feature_gen_last_layer.append(
+                    torch.nn.Sequential(*feature_out_layer))
 
         self._reinitialize()
 
@@ -278,6 +375,51 @@ class DoppelGANgerGenerator(torch.nn.Module):
                 elif "bias" in name:
                     p.data.fill_(0)
 
+    def _feature_output(self, feature_rnn_output):
+        if self.fused_feature_head:
+            return self.feature_gen_last_layer(feature_rnn_output)
+        feature = []
+        for feature_layer in self.feature_gen_last_layer:
+            feature_sub_output = feature_layer(feature_rnn_output)
+            feature.append(feature_sub_output)
+        return torch.cat(feature, dim=2)
+
+    def _rolling_feature(self, feature_input, h0, c0):
+        """
+        Adaptive rolling for generation (w/o gradients)
+
+        Runs the LSTM `rolling_block_size` steps at a time and drops the
+        sequences that ended (a gen flag <= 0.5 in a step) from the batch
+        after every block, writing into a preallocated zero tensor. The
+        steps after the end of a sequence are masked in `forward`, so the
+        result is the same as of the step-by-step loop.
+        """
+        batch_size, steps = feature_input.shape[0], feature_input.shape[1]
+        feature = torch.zeros(
+            batch_size, steps, self.feature_out_dim * self.sample_len,
+            dtype=feature_input.dtype, device=feature_input.device)
+        active = torch.arange(batch_size, device=feature_input.device)
+        hn, cn = h0, c0
+        for start in range(0, steps, self.rolling_block_size):
+            stop = min(start + self.rolling_block_size, steps)
+            output_per_block, (hn, cn) = self.lstm_module(
+                feature_input[active, start:stop], (hn, cn))
+            feature_per_block = self._feature_output(output_per_block)
+            feature[active, start:stop] = feature_per_block
+
+            gen_flag_per_block = feature_per_block[
+                :, :, self.feature_out_dim - 2:: self.feature_out_dim
+            ]
+            not_ended = torch.all(
+                torch.all(gen_flag_per_block > 0.5, dim=2), dim=1)
+            if not torch.all(not_ended):
+                active = active[not_ended]
+                if active.size(0) == 0:
+                    break
+                hn = hn[:, not_ended].contiguous()
+                cn = cn[:, not_ended].contiguous()
+        return feature
+
     def forward(
         self,
         real_attribute_noise,
@@ -367,7 +509,11 @@ class DoppelGANgerGenerator(torch.nn.Module):
         feature_input = torch.cat((feature_input_, feature_input_noise), dim=2)
 
         ##########
-        if self.use_adaptive_rolling:
+        if self.use_adaptive_rolling and \
+                self.rolling_block_size is not None and \
+                not torch.is_grad_enabled():
+            feature = self._rolling_feature(feature_input, h0, c0)
+        elif self.use_adaptive_rolling:
             hn, cn = h0, c0
             feature = []
             batch_size = feature_input.size()[0]
@@ -377,12 +523,7 @@ class DoppelGANgerGenerator(torch.nn.Module):
             for xt in data:
                 output_per_step, (hn, cn) = self.lstm_module(
                     xt[:, None, :], (hn, cn))
-                feature_per_step = []
-                for feature_layer in self.feature_gen_last_layer:
-                    feature_sub_output = feature_layer(output_per_step)
-                    feature_per_step.append(feature_sub_output)
-
-                feature_per_step = torch.cat(feature_per_step, dim=2)
+                feature_per_step = self._feature_output(output_per_step)
                 gen_flag_per_step = feature_per_step[
                     :, :, self.feature_out_dim - 2:: self.feature_out_dim
                 ]
@@ -407,11 +548,7 @@ class DoppelGANgerGenerator(torch.nn.Module):
                 feature_input, (h0, c0)
             )
 
-            feature = []
-            for feature_layer in self.feature_gen_last_layer:
-                feature_sub_output = feature_layer(feature_rnn_output_tmp)
-                feature.append(feature_sub_output)
-            feature = torch.cat(feature, dim=2)
+            feature = self._feature_output(feature_rnn_output_tmp)
         ###########
 
         # feature: (batch_size, step/sample_len, num_feature*sample_len)
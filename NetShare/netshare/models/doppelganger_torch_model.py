@@ -9,8 +9,8 @@ from netshare.utils import output
 # from gan import output  # NOQA
 # sys.modules["output"] = output  # NOQA
 from .doppelganger_torch.doppelganger import DoppelGANger  # NOQA
-from .doppelganger_torch.util import add_gen_flag, normalize_per_sample, renormalize_per_sample, reverse_gen_flag  # NOQA
-from .doppelganger_torch.load_data import load_data  # NOQA
+from .doppelganger_torch.util import renormalize_per_sample, reverse_gen_flag  # NOQA
+from .doppelganger_torch.load_data import load_train_data  # NOQA
 
 
 class DoppelGANgerTorchModel(Model):
@@ -29,36 +29,18 @@ class DoppelGANgerTorchModel(Model):
                 "config.json"), 'w') as fout:
             json.dump(self._config, fout)
 
-        # load data
+        # load data, self-norm if applicable, and add gen flags
         (
             data_feature,
             data_attribute,
             data_gen_flag,
             data_feature_outputs,
             data_attribute_outputs,
-        ) = load_data(
+            real_attribute_mask,
+        ) = load_train_data(
             path=self._config["dataset"],
-            sample_len=self._config["sample_len"])
-        num_real_attribute = len(data_attribute_outputs)
-
-        # self-norm if applicable
-        if self._config["self_norm"]:
-            (
-                data_feature,
-                data_attribute,
-                data_attribute_outputs,
-                real_attribute_mask
-            ) = normalize_per_sample(
-                data_feature,
-                data_attribute,
-                data_feature_outputs,
-                data_attribute_outputs)
-        else:
-            real_attribute_mask = [True] * num_real_attribute
-
-        data_feature, data_feature_outputs = add_gen_flag(
-            data_feature, data_gen_flag, data_feature_outputs, self._config["sample_len"]
-        )
+            sample_len=self._config["sample_len"],
+            self_norm=self._config["self_norm"])
 
         # create directories
         checkpoint_dir = os.path.join(
@@ -111,7 +93,10 @@ class DoppelGANgerTorchModel(Model):
             attr_discriminator_num_layers=self._config["attr_discriminator_num_layers"],
             attr_discriminator_num_units=self._config["attr_discriminator_num_units"],
             restore=getattr(self._config, "restore", False),
-            pretrain_dir=self._config["pretrain_dir"]
+            pretrain_dir=self._config["pretrain_dir"],
+            data_loader=getattr(self._config, "data_loader", "dataloader"),
+            fused_feature_head=getattr(
+                self._config, "fused_feature_head", False)
         )
 
         dg.train(
@@ -132,36 +117,19 @@ class DoppelGANgerTorchModel(Model):
 
         print("Currently generating with config:", self._config)
 
-        # load data
+        # load data, self-norm if applicable, and add gen flags
         (
             data_feature,
             data_attribute,
             data_gen_flag,
             data_feature_outputs,
             data_attribute_outputs,
-        ) = load_data(
+            real_attribute_mask,
+        ) = load_train_data(
             path=self._config["dataset"],
-            sample_len=self._config["sample_len"])
-        num_real_attribute = len(data_attribute_outputs)
-
-        # self-norm if applicable
-        if self._config["self_norm"]:
-            (
-                data_feature,
-                data_attribute,
-                data_attribute_outputs,
-                real_attribute_mask
-            ) = normalize_per_sample(
-                data_feature,
-                data_attribute,
-                data_feature_outputs,
-                data_attribute_outputs)
-        else:
-            real_attribute_mask = [True] * num_real_attribute
-
-        data_feature, data_feature_outputs = add_gen_flag(
-            data_feature, data_gen_flag, data_feature_outputs, self._config["sample_len"]
-        )
+            sample_len=self._config["sample_len"],
+            self_norm=self._config["self_norm"])
+        num_real_attribute = real_attribute_mask.count(True)
 
         # create directories
         checkpoint_dir = os.path.join(
@@ -214,7 +182,11 @@ class DoppelGANgerTorchModel(Model):
             attr_discriminator_num_layers=self._config["attr_discriminator_num_layers"],
             attr_discriminator_num_units=self._config["attr_discriminator_num_units"],
             restore=getattr(self._config, "restore", False),
-            pretrain_dir=self._config["pretrain_dir"]
+            pretrain_dir=self._config["pretrain_dir"],
+            fused_feature_head=getattr(
+                self._config, "fused_feature_head", False),
+            rolling_block_size=getattr(
+                self._config, "rolling_block_size", None)
         )
 
         if self._config["given_data_attribute_flag"]:
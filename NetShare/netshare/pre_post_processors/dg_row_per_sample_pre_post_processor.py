@@ -8,6 +8,7 @@ from tqdm import tqdm
 from .pre_post_processor import PrePostProcessor
 from netshare.utils.field import ContinuousField, DiscreteField
 from netshare.utils.output import Normalization
+from netshare.utils.train_data import train_data_dtypes
 
 EPS = 1e-8
 
@@ -22,6 +23,9 @@ class DGRowPerSamplePrePostProcessor(PrePostProcessor):
         # Remove missing rows.
         original_df.dropna(inplace=True)
 
+        train_dtype, gen_flag_dtype = train_data_dtypes(
+            getattr(self._config, 'train_data_dtype', 'float32'))
+
         # Parse data.
         metadata_numpys = []
         metadata_fields = []
@@ -53,7 +57,7 @@ class DGRowPerSamplePrePostProcessor(PrePostProcessor):
             metadata_numpys.append(this_numpy)
             metadata_fields.append(field_instance)
         metadata_numpy = np.concatenate(
-            metadata_numpys, axis=1).astype(np.float64)
+            metadata_numpys, axis=1).astype(train_dtype)
         print(f'List of metadata: '
               f'{list((k.dtype, k.shape) for k in metadata_numpys)}')
         print(f'Metadata type: {metadata_numpy.dtype}, '
@@ -96,7 +100,7 @@ class DGRowPerSamplePrePostProcessor(PrePostProcessor):
             timeseries_numpys.append(this_numpy)
             timeseries_fields.append(field_instance)
         timeseries_numpy = np.concatenate(timeseries_numpys, axis=2).astype(
-            np.float64)
+            train_dtype)
         print(f'List of timeseries: '
               f'{list((k.dtype, k.shape) for k in timeseries_numpys)}')
         print(f'Timeseries type: {timeseries_numpy.dtype}, '
@@ -135,7 +139,8 @@ class DGRowPerSamplePrePostProcessor(PrePostProcessor):
                 os.path.join(npz_folder, f'data_train_{i}.npz'),
                 data_feature=timeseries_train_numpy[i],
                 data_attribute=metadata_train_numpy[i],
-                data_gen_flag=np.ones(timeseries_train_numpy.shape[1]),
+                data_gen_flag=np.ones(
+                    timeseries_train_numpy.shape[1], dtype=gen_flag_dtype),
                 global_max_flow_len=[timeseries_train_numpy.shape[1]])
 
         return True
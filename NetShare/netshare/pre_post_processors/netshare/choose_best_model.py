@@ -3,31 +3,75 @@ import json
 
 import pandas as pd
 import numpy as np
+import netshare.ray as ray
 
 from scipy.stats import rankdata
 from .util import create_sdmetrics_config, convert_sdmetricsConfigQuant_to_fieldValueDict
+from netshare.utils import read_table, find_table, is_table
 from sdmetrics.reports.timeseries import QualityReport
 
 
-def compare_rawdf_syndfs(
-    raw_df,
-    syn_dfs,
-    config_pre_post_processor
-):
-    # Compare raw_df and syn_dfs and return the best syn_df
+def _quality_report(config_pre_post_processor):
     sdmetrics_config = create_sdmetrics_config(
         config_pre_post_processor,
         comparison_type='quantitative')
-    report = QualityReport(config_dict=sdmetrics_config['config'])
+    return QualityReport(config_dict=sdmetrics_config['config']), \
+        sdmetrics_config['metadata']
+
+
+def _build_profile(raw_df, config_pre_post_processor):
+    # Real-data side of the quantitative SDMetrics scores, computed once
+    # for all the syn_dfs compared with raw_df
+    report, metadata = _quality_report(config_pre_post_processor)
+    return report.build_profile(
+        raw_df[list(metadata['fields'].keys())], metadata)
+
+
+def _score_syndf(profile, syn_df, config_pre_post_processor):
+    # Quantitative SDMetrics scores of syn_df against the raw_df profile
+    report, _ = _quality_report(config_pre_post_processor)
+    report.score_against(profile, syn_df)
+    return convert_sdmetricsConfigQuant_to_fieldValueDict(
+        report.dict_metric_scores)
+
+
+def _truncate_syndf(syn_df, time_col_name, time_range, truncate):
+    # truncate to raw data time range
+    if truncate == "per_chunk":
+        return syn_df[
+            (syn_df[time_col_name] >= time_range[0])
+            & (syn_df[time_col_name] <= time_range[1])
+        ]
+    # TODO: support more truncation methods if necessary
+    else:
+        raise ValueError("Unknown truncation methods...")
+
+
+@ray.remote(scheduling_strategy="SPREAD")
+def _score_syndf_remote(profile, syn_df, config_pre_post_processor):
+    return _score_syndf(profile, syn_df, config_pre_post_processor)
+
+
+@ray.remote(scheduling_strategy="SPREAD")
+def _score_syndf_file(
+    profile,
+    syn_df_file,
+    time_col_name,
+    time_range,
+    truncate,
+    config_pre_post_processor
+):
+    # Returns the scores and the truncation ratio of one candidate
+    syn_df = read_table(syn_df_file)
+    syn_df_truncated = _truncate_syndf(
+        syn_df, time_col_name, time_range, truncate)
+    return (
+        _score_syndf(profile, syn_df_truncated, config_pre_post_processor),
+        1.0 - len(syn_df_truncated) / len(syn_df))
 
-    metrics_dict_list = []
-    for syn_df in syn_dfs:
-        report.generate(
-            raw_df, syn_df, sdmetrics_config['metadata'])
-        metrics_dict_list.append(
-            convert_sdmetricsConfigQuant_to_fieldValueDict(
-                report.dict_metric_scores))
 
+def rank_syndfs(metrics_dict_list):
+    # Index of the candidate with the best sum of per-metric rankings
     metrics = list(metrics_dict_list[0].keys())
     metric_vals_dict = {}
     for metrics_dict in metrics_dict_list:
@@ -39,7 +83,21 @@ def compare_rawdf_syndfs(
     for metric, vals in metric_vals_dict.items():
         metric_vals_2d.append(vals)
     rankings_sum = np.sum(rankdata(metric_vals_2d, axis=1), axis=0)
-    best_syndf_idx = np.argmin(rankdata(rankings_sum))
+    return np.argmin(rankdata(rankings_sum))
+
+
+def compare_rawdf_syndfs(
+    raw_df,
+    syn_dfs,
+    config_pre_post_processor
+):
+    # Compare raw_df and syn_dfs and return the best syn_df
+    profile_ref = ray.put(_build_profile(raw_df, config_pre_post_processor))
+    config_ref = ray.put(config_pre_post_processor)
+    metrics_dict_list = ray.get([
+        _score_syndf_remote.remote(profile_ref, syn_df, config_ref)
+        for syn_df in syn_dfs])
+    best_syndf_idx = rank_syndfs(metrics_dict_list)
 
     return best_syndf_idx, syn_dfs[best_syndf_idx]
 
@@ -58,10 +116,19 @@ def choose_best_model(
             config.update(config_pre_post_processor)
         config_group_list = data["config_group_list"]
 
-    # TODO: change to distribute (Ray-style)
-    dict_dataset_syndfs = {}
+    file_format = getattr(
+        config_pre_post_processor, "intermediate_format", "csv")
+    time_col_name = getattr(
+        getattr(config_pre_post_processor, 'timestamp'),
+        'column')
+    config_ref = ray.put(config_pre_post_processor)
+
+    # Score every (config_group, chunk, checkpoint) candidate as a separate
+    # task. Each real chunk is read and profiled once, and the profile is
+    # shared by all of its tasks.
+    profiles = {}
+    candidates = []
     for config_group_idx, config_group in enumerate(config_group_list):
-        print("Config group #{}: {}".format(config_group_idx, config_group))
         config_ids = config_group["config_ids"]
         chunk0_idx = config_ids[0]
         syndf_root_folder = os.path.join(
@@ -75,52 +142,57 @@ def choose_best_model(
             ]
         ) == len(config_ids)
 
-        best_syndfs = []
-        truncate_ratios = []
         for chunk_id, config_idx in enumerate(config_ids):
             config = configs[config_idx]
-            raw_df = pd.read_csv(os.path.join(config["dataset"], "raw.csv"))
-            time_col_name = getattr(
-                getattr(config_pre_post_processor, 'timestamp'),
-                'column')
+            if config["dataset"] not in profiles:
+                raw_df = read_table(find_table(config["dataset"], "raw"))
+                profile = _build_profile(raw_df, config_pre_post_processor)
+                profiles[config["dataset"]] = (
+                    ray.put(profile),
+                    (raw_df[time_col_name].min(),
+                     raw_df[time_col_name].max()))
+            profile_ref, time_range = profiles[config["dataset"]]
 
-            syn_dfs = []
-            syn_dfs_names = []
             syn_df_folder = os.path.join(
                 syndf_root_folder, "chunk_id-{}".format(chunk_id)
             )
-            for file in os.listdir(syn_df_folder):
-                if file.endswith(".csv"):
-                    syn_dfs_names.append(file)
-                    syn_df = pd.read_csv(os.path.join(syn_df_folder, file))
-
-                    # truncate to raw data time range
-                    if config["truncate"] == "per_chunk":
-                        syn_df_truncated = syn_df[
-                            (syn_df[time_col_name] >= raw_df[time_col_name].min())
-                            & (syn_df[time_col_name] <= raw_df[time_col_name].max())
-                        ]
-                    # TODO: support more truncation methods if necessary
-                    else:
-                        raise ValueError("Unknown truncation methods...")
-                    truncate_ratios.append(
-                        1.0 - len(syn_df_truncated) / len(syn_df))
-
-                    syn_dfs.append(syn_df_truncated)
-
-            best_syndf_idx, best_syndf = compare_rawdf_syndfs(
-                raw_df[syn_dfs[0].columns], syn_dfs, config_pre_post_processor
-            )
+            syn_df_files = [
+                os.path.join(syn_df_folder, file)
+                for file in os.listdir(syn_df_folder)
+                if is_table(file, file_format)]
+            objs = [
+                _score_syndf_file.remote(
+                    profile_ref, syn_df_file, time_col_name, time_range,
+                    config["truncate"], config_ref)
+                for syn_df_file in syn_df_files]
+            candidates.append((
+                config_group_idx, chunk_id, time_range, config["truncate"],
+                syn_df_files, objs))
+
+    # Aggregate the rankings
+    dict_group_syndfs = {}
+    dict_group_truncate_ratios = {}
+    for config_group_idx, chunk_id, time_range, truncate, syn_df_files, \
+            objs in candidates:
+        results = ray.get(objs)
+        best_syndf_idx = rank_syndfs([metrics for metrics, _ in results])
+        best_syndf = _truncate_syndf(
+            read_table(syn_df_files[best_syndf_idx]),
+            time_col_name, time_range, truncate)
+        print(
+            "Config group #{}, Chunk_id: {}, # of syn dfs: {}, best_syndf: {}"
+            .format(config_group_idx, chunk_id, len(syn_df_files),
+                    os.path.basename(syn_df_files[best_syndf_idx])))
+        dict_group_syndfs.setdefault(config_group_idx, []).append(best_syndf)
+        dict_group_truncate_ratios.setdefault(config_group_idx, []).extend(
+            truncate_ratio for _, truncate_ratio in results)
 
-            best_syndfs.append(best_syndf)
-            print(
-                "Chunk_id: {}, # of syn dfs: {}, best_syndf: {}".format(
-                    chunk_id, len(syn_dfs), syn_dfs_names[best_syndf_idx]
-                )
-            )
-
-        print("Average truncation ratio:", np.mean(truncate_ratios))
-        big_best_syndf = pd.concat(best_syndfs)
+    dict_dataset_syndfs = {}
+    for config_group_idx, config_group in enumerate(config_group_list):
+        print("Config group #{}: {}".format(config_group_idx, config_group))
+        print("Average truncation ratio:",
+              np.mean(dict_group_truncate_ratios[config_group_idx]))
+        big_best_syndf = pd.concat(dict_group_syndfs[config_group_idx])
         print("Big syndf shape:", big_best_syndf.shape)
         print()
 
@@ -129,12 +201,14 @@ def choose_best_model(
         dict_dataset_syndfs[config_group["dp_noise_multiplier"]].append(
             big_best_syndf)
 
-        dict_dataset_bestsyndf = {}
-
-    big_raw_df = pd.read_csv(os.path.join(pre_processed_data_folder, "raw.csv"))
+    dict_dataset_bestsyndf = {}
     for dpnoisemultiplier, syn_dfs in dict_dataset_syndfs.items():
         assert len(syn_dfs) >= 1
         if len(syn_dfs) > 1:
+            # only the generated columns of the raw data are needed
+            big_raw_df = read_table(
+                find_table(pre_processed_data_folder, "raw"),
+                columns=list(syn_dfs[0].columns))
             best_syndf_idx, best_syn_df = compare_rawdf_syndfs(
                 big_raw_df[syn_dfs[0].columns],
                 syn_dfs, config_pre_post_processor)
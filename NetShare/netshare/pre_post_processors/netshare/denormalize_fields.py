@@ -1,4 +1,3 @@
-import csv
 import os
 import json
 import random
@@ -6,10 +5,13 @@ import pickle
 from typing import Dict, List
 
 import numpy as np
+import pandas as pd
+import netshare.ray as ray
 from config_io import Config
 from tqdm import tqdm
 
 from netshare.utils.logger import logger
+from netshare.utils import write_table, table_extension
 
 
 def _get_fields_names(fields_list):
@@ -64,114 +66,176 @@ def write_to_csv(
     data_gen_flag,
     filename,
     config,
+    file_format="csv",
 ) -> None:
     """
-    This function dumps the given data to the given directory as a csv format.
+    This function dumps the given data to the given directory as a csv format
+    (or as `file_format`, see `netshare.utils.write_table`).
     `data_gen_flag` is an indicator showing if the time series for this session
     has ended in this time step.
     """
     os.makedirs(csv_folder, exist_ok=True)
-    csv_path = os.path.join(csv_folder, filename)
+    df = _to_dataframe(session_key_fields, timeseries_fields,
+                       session_key, timeseries, data_gen_flag, config)
+    if file_format != "csv":
+        # same column types as reading the csv back
+        for col in df.columns[df.dtypes == object]:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    write_table(df, os.path.join(csv_folder, filename), file_format)
+
+
+def _to_dataframe(
+    session_key_fields,
+    timeseries_fields,
+    session_key,
+    timeseries,
+    data_gen_flag,
+    config,
+):
     # change session key shape to #session * #attributes
     session_key_numpy = np.array(np.concatenate(session_key, axis=1))
     # change timeseries shape to #session * #time_steps * #features
     timeseries_numpy = np.array(np.concatenate(timeseries, axis=2))
 
-    with open(csv_path, "w") as f:
-        writer = csv.writer(f)
-        raw_metadata_field_names = [
-            col.column for col in (config["metadata"])
-        ]
-        raw_timeseries_filed_names = [
-            col.column for col in config["timeseries"]]
-        session_titles = [
-            f for i, f in enumerate(_get_fields_names(session_key_fields))
-            if f in raw_metadata_field_names]
-        session_titles_idx = [
-            i for i, f in enumerate(_get_fields_names(session_key_fields))
-            if f in raw_metadata_field_names]
-        timeseries_titles = [
-            f
-            for i, f in enumerate(_get_fields_names(timeseries_fields))
-            if f in raw_timeseries_filed_names
-        ]
-        timeseries_titles_idx = [
-            i
-            for i, f in enumerate(_get_fields_names(timeseries_fields))
-            if f in raw_timeseries_filed_names
-        ]
-
-        if config["timestamp"].get("generation", False):
-            timeseries_titles.append(config["timestamp"]["column"])
-            if config["timestamp"]["encoding"] == "interarrival":
-                # Find `flow_start` and `interarrival_within_flow` index
-                flow_start_idx, interarrival_within_flow_idx = None, None
-                for idx, field_name in enumerate(
-                        _get_fields_names(session_key_fields)):
-                    if field_name == "flow_start":
-                        flow_start_idx = idx
-                        break
-                for idx, field_name in enumerate(
-                        _get_fields_names(timeseries_fields)):
-                    if field_name == "interarrival_within_flow":
-                        interarrival_within_flow_idx = idx
-                        break
-                if flow_start_idx is None or interarrival_within_flow_idx is None:
-                    raise ValueError(
-                        "Using `interarrival` encoding: `flow_start` or `interarrival_field` not found!"
-                    )
-
-                # convert interarrival to raw timestamp
-                interarrival_cumsum = np.cumsum(
-                    timeseries_numpy[:, :, interarrival_within_flow_idx].astype(
-                        float),
-                    axis=1)
-                # first packet has 0.0 interarrival
-                interarrival_cumsum[:, 0] = 0.0
-                flow_start_expand = (
-                    np.array(
-                        [
-                            session_key_numpy[:, flow_start_idx],
-                        ]
-                        * interarrival_cumsum.shape[1]
-                    )
-                    .transpose()
-                    .astype(float)
-                )
-                timestamp_matrix = np.expand_dims(
-                    np.add(flow_start_expand, interarrival_cumsum), axis=2
+    raw_metadata_field_names = [
+        col.column for col in (config["metadata"])
+    ]
+    raw_timeseries_filed_names = [
+        col.column for col in config["timeseries"]]
+    session_titles = [
+        f for i, f in enumerate(_get_fields_names(session_key_fields))
+        if f in raw_metadata_field_names]
+    session_titles_idx = [
+        i for i, f in enumerate(_get_fields_names(session_key_fields))
+        if f in raw_metadata_field_names]
+    timeseries_titles = [
+        f
+        for i, f in enumerate(_get_fields_names(timeseries_fields))
+        if f in raw_timeseries_filed_names
+    ]
+    timeseries_titles_idx = [
+        i
+        for i, f in enumerate(_get_fields_names(timeseries_fields))
+        if f in raw_timeseries_filed_names
+    ]
+
+    if config["timestamp"].get("generation", False):
+        timeseries_titles.append(config["timestamp"]["column"])
+        if config["timestamp"]["encoding"] == "interarrival":
+            # Find `flow_start` and `interarrival_within_flow` index
+            flow_start_idx, interarrival_within_flow_idx = None, None
+            for idx, field_name in enumerate(
+                    _get_fields_names(session_key_fields)):
+                if field_name == "flow_start":
+                    flow_start_idx = idx
+                    break
+            for idx, field_name in enumerate(
+                    _get_fields_names(timeseries_fields)):
+                if field_name == "interarrival_within_flow":
+                    interarrival_within_flow_idx = idx
+                    break
+            if flow_start_idx is None or interarrival_within_flow_idx is None:
+                raise ValueError(
+                    "Using `interarrival` encoding: `flow_start` or `interarrival_field` not found!"
                 )
-                timeseries_numpy = np.concatenate(
-                    (timeseries_numpy, timestamp_matrix), axis=2
+
+            # convert interarrival to raw timestamp
+            interarrival_cumsum = np.cumsum(
+                timeseries_numpy[:, :, interarrival_within_flow_idx].astype(
+                    float),
+                axis=1)
+            # first packet has 0.0 interarrival
+            interarrival_cumsum[:, 0] = 0.0
+            flow_start_expand = (
+                np.array(
+                    [
+                        session_key_numpy[:, flow_start_idx],
+                    ]
+                    * interarrival_cumsum.shape[1]
                 )
-                timeseries_titles_idx.append(timeseries_numpy.shape[2] - 1)
-
-        writer.writerow(session_titles + timeseries_titles)
-
-        session_key_set = set()
-        for (
-            data_gen_per_session,
-            session_data_per_session,
-            timeseries_per_session,
-        ) in zip(
-            data_gen_flag,
-            # remove cols not in raw data
-            session_key_numpy[:, session_titles_idx],
-            timeseries_numpy[
-                :, :, timeseries_titles_idx
-            ],  # remove cols not in raw data
-        ):
-            session_data_per_session = session_data_per_session.tolist()
-            # remove duplicated session keys
-            if tuple(session_data_per_session) in session_key_set:
-                logger.debug(
-                    "Session key {session_data_per_session} already exists!")
-                continue
-            session_key_set.add(tuple(session_data_per_session))
-            for j in range(data_gen_per_session.shape[0]):
-                if data_gen_per_session[j] == 1.0:
-                    timeseries_data = timeseries_per_session[j].tolist()
-                    writer.writerow(session_data_per_session + timeseries_data)
+                .transpose()
+                .astype(float)
+            )
+            timestamp_matrix = np.expand_dims(
+                np.add(flow_start_expand, interarrival_cumsum), axis=2
+            )
+            timeseries_numpy = np.concatenate(
+                (timeseries_numpy, timestamp_matrix), axis=2
+            )
+            timeseries_titles_idx.append(timeseries_numpy.shape[2] - 1)
+
+    # remove cols not in raw data
+    session_key_numpy = session_key_numpy[:, session_titles_idx]
+    timeseries_numpy = timeseries_numpy[:, :, timeseries_titles_idx]
+
+    # remove duplicated session keys (the first session is kept)
+    if session_key_numpy.shape[1] > 0:
+        session_dup = pd.DataFrame(session_key_numpy).duplicated().values
+    else:
+        session_dup = np.arange(session_key_numpy.shape[0]) > 0
+    if session_dup.any():
+        logger.debug(
+            f"{np.sum(session_dup)} duplicated session keys are removed!")
+    session_key_numpy = session_key_numpy[~session_dup]
+    timeseries_numpy = timeseries_numpy[~session_dup]
+    data_gen_flag = np.asarray(data_gen_flag)[~session_dup]
+
+    # one row per generated time step, in session order
+    gen_mask = data_gen_flag == 1.0
+    session_lens = gen_mask.sum(axis=1)
+    columns = [np.repeat(session_key_numpy[:, i], session_lens)
+               for i in range(session_key_numpy.shape[1])]
+    columns += [timeseries_numpy[:, :, i][gen_mask]
+                for i in range(timeseries_numpy.shape[2])]
+
+    df = pd.DataFrame(dict(enumerate(columns)),
+                      index=pd.RangeIndex(int(np.sum(session_lens))))
+    df.columns = session_titles + timeseries_titles
+    return df
+
+
+def _load_fields(chunk_folder):
+    with open(os.path.join(chunk_folder, "data_attribute_fields.pkl"),
+              'rb') as f:
+        session_key_fields = list(pickle.load(f))
+    with open(os.path.join(chunk_folder, "data_feature_fields.pkl"),
+              'rb') as f:
+        timeseries_fields = list(pickle.load(f))
+    return session_key_fields, timeseries_fields
+
+
+@ray.remote(scheduling_strategy="SPREAD")
+def _denormalize_ckpt(
+    session_key_fields,
+    timeseries_fields,
+    npz_path,
+    csv_folder,
+    filename,
+    config,
+    file_format,
+):
+    """
+    Denormalizes one generated checkpoint (.npz) of one chunk.
+    """
+    data = np.load(npz_path)
+    session_key = _denormalize_by_fields_list(
+        data["data_attribute"], session_key_fields, is_session_key=True)
+    timeseries = _denormalize_by_fields_list(
+        data["data_feature"], timeseries_fields, is_session_key=False)
+    write_to_csv(
+        csv_folder=csv_folder,
+        session_key_fields=session_key_fields,
+        timeseries_fields=timeseries_fields,
+        session_key=session_key,
+        timeseries=timeseries,
+        data_gen_flag=data["data_gen_flag"],
+        filename=filename,
+        config=config,
+        file_format=file_format,
+    )
 
 
 def denormalize_fields(
@@ -183,6 +247,7 @@ def denormalize_fields(
     """
     This function denormalizes the data in the generated_data folder using the attributes and features fields that were created in the pre-process step.
     Last, it writes the denormalized data to a csv file under the same directory hierarchy as the created data.
+    Each (chunk, checkpoint) pair is denormalized by a separate task.
 
     :return: the path to the denormalized data.
     """
@@ -191,52 +256,38 @@ def denormalize_fields(
         configs = data["configs"]
         config_group_list = data["config_group_list"]
 
+    file_format = getattr(
+        config_pre_post_processor, "intermediate_format", "csv")
+    config_ref = ray.put(config_pre_post_processor)
+
+    # The field lists of each chunk are loaded (and shipped) only once
+    fields_refs = {}
+    objs = []
     for config in tqdm(configs):
-        with open(os.path.join(
-            pre_processed_data_folder,
-            f"chunkid-{config['chunk_id']}",
-            "data_attribute_fields.pkl"
-        ), 'rb') as f:
-            session_key_fields = list(pickle.load(f))
-
-        with open(os.path.join(
-            pre_processed_data_folder,
-            f"chunkid-{config['chunk_id']}",
-            "data_feature_fields.pkl"
-        ), 'rb') as f:
-            timeseries_fields = list(pickle.load(f))
+        chunk_id = config['chunk_id']
+        if chunk_id not in fields_refs:
+            fields_refs[chunk_id] = [
+                ray.put(fields) for fields in _load_fields(os.path.join(
+                    pre_processed_data_folder, f"chunkid-{chunk_id}"))]
+        session_key_fields_ref, timeseries_fields_ref = fields_refs[chunk_id]
 
         # Each configuration has multiple iteration ckpts
         per_chunk_basedir = os.path.join(
             config["eval_root_folder"],
-            "feat_raw", f"chunk_id-{config['chunk_id']}")
+            "feat_raw", f"chunk_id-{chunk_id}")
+        csv_root_folder = os.path.join(
+            config["eval_root_folder"], "syn_dfs")
         for f in os.listdir(per_chunk_basedir):
             if not f.endswith(".npz"):
                 continue
-            data = np.load(os.path.join(per_chunk_basedir, f))
-            unnormalized_session_key = data["data_attribute"]
-            unnormalized_timeseries = data["data_feature"]
-            data_gen_flag = data["data_gen_flag"]
-
-            session_key = _denormalize_by_fields_list(
-                unnormalized_session_key, session_key_fields,
-                is_session_key=True)
-            timeseries = _denormalize_by_fields_list(
-                unnormalized_timeseries, timeseries_fields, is_session_key=False
-            )
-
-            csv_root_folder = os.path.join(
-                config["eval_root_folder"], "syn_dfs")
-            csv_filename = f.replace(".npz", ".csv")
-            write_to_csv(
+            objs.append(_denormalize_ckpt.remote(
+                session_key_fields_ref,
+                timeseries_fields_ref,
+                npz_path=os.path.join(per_chunk_basedir, f),
                 csv_folder=os.path.join(
-                    csv_root_folder, f"chunk_id-{config['chunk_id']}"
-                ),
-                session_key_fields=session_key_fields,
-                timeseries_fields=timeseries_fields,
-                session_key=session_key,
-                timeseries=timeseries,
-                data_gen_flag=data_gen_flag,
-                filename=csv_filename,
-                config=config_pre_post_processor,
-            )
+                    csv_root_folder, f"chunk_id-{chunk_id}"),
+                filename=f.replace(".npz", table_extension(file_format)),
+                config=config_ref,
+                file_format=file_format,
+            ))
+    _ = ray.get(objs)
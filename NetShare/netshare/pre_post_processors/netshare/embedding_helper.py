@@ -1,5 +1,11 @@
+import os
+import json
+import weakref
 import itertools
 import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
 
 from annoy import AnnoyIndex
 from gensim.models import Word2Vec
@@ -29,6 +35,8 @@ def build_annoy_dictionary_word2vec(
         dict_type_cols[type].append(col.column)
     print(dict_type_cols)
 
+    encoder = Word2VecEncoder(model, norm_option=True)
+
     sets = []
     dict_type_annDictPair = {}
     for type, cols in dict_type_cols.items():
@@ -38,9 +46,10 @@ def build_annoy_dictionary_word2vec(
         type_dict = {}
         index = 0
 
-        for ele in type_set:
-            type_ann.add_item(index, get_vector(
-                model, str(ele), norm_option=True))
+        type_list = list(type_set)
+        type_vectors = encoder.encode(type_list)
+        for ele, vector in zip(type_list, type_vectors):
+            type_ann.add_item(index, vector)
             type_dict[index] = ele
             index += 1
         type_ann.build(n_trees)
@@ -67,31 +76,176 @@ def get_original_objs(ann, vectors, dic):
         res.append(dic[obj_list[0]])
     return res
 
+
+class Word2VecEncoder(object):
+    """Batch word -> vector lookup for a trained Word2Vec model.
+
+    The (optionally l2-normalized) embedding matrix, the word -> row index
+    and the nearest-numeric index used for out-of-vocabulary words are
+    built once, so a whole column is encoded with a single gather instead
+    of one `get_vector` call per row.
+    """
+
+    def __init__(self, model, norm_option=True):
+        wv = model.wv
+        if norm_option:
+            model.init_sims()
+            self.vectors = wv.vectors_norm
+        else:
+            self.vectors = wv.vectors
+        self.words = pd.Index(wv.index2word)
+
+        # Privacy-related
+        # If word not in the vocabulary, replace with nearest neighbor
+        # Suppose that protocol is covered
+        #   while very few port numbers are out of range
+        numeric_rows = [
+            row for row, word in enumerate(wv.index2word) if word.isdigit()]
+        self.numeric_rows = np.array(numeric_rows, dtype=np.int64)
+        self.nbrs = None
+        if len(numeric_rows) > 0:
+            numeric_words = np.array(
+                [int(wv.index2word[row]) for row in numeric_rows]
+            ).reshape((-1, 1))
+            self.nbrs = NearestNeighbors(
+                n_neighbors=1, algorithm='ball_tree').fit(numeric_words)
+
+    def get_rows(self, words):
+        words = pd.Index(np.asarray(words).reshape(-1).astype(str))
+        rows = self.words.get_indexer(words)
+
+        oov_mask = rows < 0
+        if oov_mask.any():
+            oov_words, oov_inverse = np.unique(
+                np.asarray(words)[oov_mask], return_inverse=True)
+            print(f"{len(oov_words)} words not in dict: "
+                  f"{list(oov_words[:10])}")
+            if self.nbrs is None:
+                raise ValueError(
+                    "No numeric words in the vocabulary to replace "
+                    "out-of-vocabulary words with!")
+            _, indices = self.nbrs.kneighbors(
+                oov_words.astype(np.int64).reshape((-1, 1)))
+            rows[oov_mask] = self.numeric_rows[indices[:, 0]][oov_inverse]
+
+        return rows
+
+    def encode(self, words):
+        return self.vectors[self.get_rows(words)]
+
+
+_word2vec_encoders = weakref.WeakKeyDictionary()
+
+
+def get_word2vec_encoder(model, norm_option=True):
+    """Build the encoder of `model` once per model."""
+    encoders = _word2vec_encoders.setdefault(model, {})
+    if norm_option not in encoders:
+        encoders[norm_option] = Word2VecEncoder(model, norm_option=norm_option)
+    return encoders[norm_option]
+
+
+class Word2VecDecoder(object):
+    """Batch vector -> word lookup for one word2vec type (ip/port/proto).
+
+    Queries are de-duplicated before lookup. `backend` is one of
+    - "annoy": nearest neighbour through the (memory-mapped) Annoy index,
+      optionally fanned out over `num_threads` threads
+    - "brute_force": exact `argmax(V @ x)` over the normalized vocabulary
+    - "auto": brute force if the vocabulary has at most
+      `brute_force_max_items` words, Annoy otherwise
+    """
+
+    def __init__(
+            self, ann_path, dict_path, word2vec_size, backend="auto",
+            num_threads=1, brute_force_max_items=4096):
+        self.ann = AnnoyIndex(word2vec_size, 'angular')
+        self.ann.load(ann_path)
+        with open(dict_path, 'r') as f:
+            self.dic = {int(k): v for k, v in json.load(f).items()}
+        self.num_threads = num_threads
+
+        n_items = self.ann.get_n_items()
+        if backend == "auto":
+            backend = "brute_force" \
+                if n_items <= brute_force_max_items else "annoy"
+        if backend not in ["annoy", "brute_force"]:
+            raise ValueError(f"Unknown word2vec decoder backend {backend}!")
+        self.backend = backend
+
+        if self.backend == "brute_force":
+            vectors = np.array(
+                [self.ann.get_item_vector(i) for i in range(n_items)],
+                dtype=np.float32)
+            # angular distance: rank by cosine similarity
+            self.vectors = vectors / np.maximum(
+                np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self.words = np.array([self.dic[i] for i in range(n_items)])
+
+    def _query_annoy(self, vectors):
+        def query(vectors_per_thread):
+            return [
+                self.ann.get_nns_by_vector(
+                    vector, 1, search_k=-1, include_distances=False)[0]
+                for vector in vectors_per_thread]
+
+        if self.num_threads > 1 and len(vectors) > 1:
+            with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+                results = executor.map(
+                    query, np.array_split(vectors, self.num_threads))
+                return np.array(
+                    list(itertools.chain.from_iterable(results)),
+                    dtype=np.int64)
+        return np.array(query(vectors), dtype=np.int64)
+
+    def _query_brute_force(self, vectors, batch_size=65536):
+        indices = np.empty(len(vectors), dtype=np.int64)
+        for i in range(0, len(vectors), batch_size):
+            indices[i: i + batch_size] = np.argmax(
+                vectors[i: i + batch_size] @ self.vectors.T, axis=1)
+        return indices
+
+    def decode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        flat_vectors = vectors.reshape(-1, vectors.shape[-1])
+        unique_vectors, inverse = np.unique(
+            flat_vectors, axis=0, return_inverse=True)
+
+        if self.backend == "brute_force":
+            indices = self._query_brute_force(unique_vectors)
+        else:
+            indices = self._query_annoy(unique_vectors)
+
+        return self.words[indices][inverse.reshape(-1)].reshape(
+            vectors.shape[:-1])
+
+
+_word2vec_decoders = {}
+
+
+def get_word2vec_decoder(
+        pre_processed_data_folder, word2vec_type, word2vec_size, **kwargs):
+    """Load the decoder of `word2vec_type` once per process, and again
+    whenever its files are rewritten (e.g. by a new `_pre_process`)."""
+    ann_path = os.path.join(
+        pre_processed_data_folder, f"{word2vec_type}_ann.ann")
+    dict_path = os.path.join(
+        pre_processed_data_folder, f"{word2vec_type}_dict.json")
+    key = (os.path.abspath(pre_processed_data_folder), word2vec_type,
+           word2vec_size, tuple(sorted(kwargs.items())))
+    stamp = tuple((stat.st_mtime_ns, stat.st_size)
+                  for stat in map(os.stat, [ann_path, dict_path]))
+    if key not in _word2vec_decoders or _word2vec_decoders[key][0] != stamp:
+        _word2vec_decoders[key] = (stamp, Word2VecDecoder(
+            ann_path=ann_path,
+            dict_path=dict_path,
+            word2vec_size=word2vec_size,
+            **kwargs))
+    return _word2vec_decoders[key][1]
+
+
 # return vector for the given word
 
 
 def get_vector(model, word, norm_option=False):
-    all_words_str = list(model.wv.vocab.keys())
-
-    # Privacy-related
-    # If word not in the vocabulary, replace with nearest neighbor
-    # Suppose that protocol is covered
-    #   while very few port numbers are out of range
-    if word not in all_words_str:
-        print(f"{word} not in dict")
-        print("Help!!!!")
-        all_words = []
-        for ele in all_words_str:
-            if ele.isdigit():
-                all_words.append(int(ele))
-        all_words = np.array(all_words).reshape((-1, 1))
-        nbrs = NearestNeighbors(
-            n_neighbors=1, algorithm='ball_tree').fit(all_words)
-        distances, indices = nbrs.kneighbors([[int(word)]])
-        nearest_word = str(all_words[indices[0][0]][0])
-        # print("nearest_word:", nearest_word)
-        model.init_sims()
-        return model.wv.word_vec(nearest_word, use_norm=norm_option)
-    else:
-        model.init_sims()
-        return model.wv.word_vec(word, use_norm=norm_option)
+    return get_word2vec_encoder(model, norm_option).encode([word])[0]
@@ -1,24 +1,32 @@
 import inspect
-import copy
 import os
 import json
 import ctypes
 import shutil
 
+import numpy as np
 import pandas as pd
 import netshare.ray as ray
 
 from gensim.models import Word2Vec
 from tqdm import tqdm
 
-from .word2vec_embedding import word2vec_train
+from .word2vec_embedding import word2vec_train, CSVSentences
 from .embedding_helper import build_annoy_dictionary_word2vec
-from .preprocess_helper import countList2cdf, continuous_list_flag, plot_cdf
+from .pcap_parser import pcap2df, pcap2csv
+from .preprocess_helper import countList2cdf, plot_cdf
 from .preprocess_helper import df2chunks, split_per_chunk
+from .preprocess_helper import build_flow_chunk_index, save_flow_chunk_index
+from .preprocess_helper import count_non_continuous_flows
+from .preprocess_helper import save_chunk_columns, get_column_stats
+from .preprocess_helper import scan_trace, get_chunk_assigner, spill_chunks
+from .preprocess_helper import build_flow_chunk_index_from_sizes
+from .preprocess_helper import load_spilled_chunk
 from ..pre_post_processor import PrePostProcessor
 from netshare.utils import Normalization
 from netshare.utils import ContinuousField, DiscreteField, BitField, Word2VecField
 from netshare.utils import exec_cmd
+from netshare.utils import write_table, table_extension, remove_stale_tables
 from .denormalize_fields import denormalize_fields
 from .choose_best_model import choose_best_model
 
@@ -29,6 +37,12 @@ class NetsharePrePostProcessor(PrePostProcessor):
     def _pre_process(self, input_folder, output_folder, log_folder):
         print(f"{self.__class__.__name__}.{inspect.stack()[0][3]}")
 
+        # "memory": send each chunk to its task by value
+        # "npy": write each chunk once as .npy columns and send the path
+        chunk_handoff = getattr(self._config, "chunk_handoff", "memory")
+        if chunk_handoff not in ["memory", "npy"]:
+            raise ValueError(f"Unknown chunk_handoff {chunk_handoff}!")
+
         # single file
         if os.path.isfile(input_folder):
             if not (input_folder.endswith(".csv") or
@@ -41,14 +55,43 @@ class NetsharePrePostProcessor(PrePostProcessor):
         else:
             print("Merged file is located at {}")
 
+        # Streaming mode: never hold the whole trace in memory. The input
+        # is read in batches of `streaming_batch_rows` rows and the chunks
+        # are spilled to disk and read back one at a time.
+        streaming = getattr(self._config, "streaming", False)
+        batch_rows = getattr(self._config, "streaming_batch_rows", 1000000)
+        # Format of the tables passed between stages (CSV is only used for
+        # the final export otherwise). Streaming mode keeps raw.csv.
+        file_format = getattr(self._config, "intermediate_format", "csv")
+        raw_table = os.path.join(
+            output_folder, "raw" + table_extension(file_format))
+
         if self._config["dataset_type"] == "pcap":
+            # "numpy": parse packet headers straight into columns
+            # "libpcap": compile main.c and convert to CSV first
+            pcap_parser = getattr(self._config, "pcap_parser", "numpy")
+            df = None
             if input_folder.endswith(".csv"):
-                shutil.copyfile(
-                    os.path.join(input_folder),
-                    os.path.join(output_folder, "raw.csv")
-                )
-                df = pd.read_csv(input_folder)
-            elif input_folder.endswith(".pcap"):
+                if streaming or file_format == "csv":
+                    shutil.copyfile(
+                        os.path.join(input_folder),
+                        os.path.join(output_folder, "raw.csv")
+                    )
+                csv_file = input_folder
+            elif input_folder.endswith(".pcap") and pcap_parser == "numpy":
+                # the raw table is only written for post-processing
+                csv_file = os.path.join(output_folder, "raw.csv")
+                if streaming:
+                    pcap2csv(
+                        input_folder, csv_file,
+                        n_parts=getattr(self._config, "pcap_n_parts", None))
+                else:
+                    df = pcap2df(
+                        input_folder,
+                        n_parts=getattr(self._config, "pcap_n_parts", None))
+                    write_table(df, raw_table, file_format)
+                print(f"{input_folder} has been parsed")
+            elif input_folder.endswith(".pcap") and pcap_parser == "libpcap":
                 # compile shared library for converting pcap to csv
                 cwd = os.path.dirname(os.path.abspath(__file__))
                 cmd = f"cd {cwd} && \
@@ -67,17 +110,31 @@ class NetsharePrePostProcessor(PrePostProcessor):
                     csv_file.encode('utf-8')  # csv file
                 )
                 print(f"{input_folder} has been converted to {csv_file}")
-                df = pd.read_csv(csv_file)
+            elif input_folder.endswith(".pcap"):
+                raise ValueError(f"Unknown pcap_parser {pcap_parser}!")
             else:
                 raise ValueError(
                     "PCAP file extension should be `.pcap`(native) or `.csv`(converted)!")
+            if df is None and not streaming:
+                df = pd.read_csv(csv_file)
+                if file_format != "csv":
+                    write_table(df, raw_table, file_format)
         else:
             if not input_folder.endswith(".csv"):
                 raise ValueError(
                     "Non-pcap file, only CSV format is supported!")
-            df = pd.read_csv(input_folder)
-            df.to_csv(os.path.join(output_folder, "raw.csv"), index=False)
+            csv_file = input_folder
+            if streaming:
+                df = None
+                shutil.copyfile(
+                    input_folder, os.path.join(output_folder, "raw.csv"))
+            else:
+                df = pd.read_csv(input_folder)
+                write_table(df, raw_table, file_format)
 
+        # `find_table` must not find the raw table of an earlier run
+        remove_stale_tables(
+            os.path.join(output_folder, "raw.csv") if streaming else raw_table)
         print("dataset type:", self._config["dataset_type"])
 
         metadata_cols = [m for m in self._config["metadata"]]
@@ -89,6 +146,20 @@ class NetsharePrePostProcessor(PrePostProcessor):
         print("metadata cols:", [m.column for m in metadata_cols])
         print("word2vec cols:", [w.column for w in word2vec_cols])
 
+        # Global per-column stats (min/max, categorical choices, word2vec
+        # vocabulary) and, in streaming mode, the chunk boundaries.
+        if streaming:
+            print("Scanning {} in batches of {} rows...".format(
+                csv_file, batch_rows))
+            trace_stats = scan_trace(
+                path=csv_file,
+                batch_rows=batch_rows,
+                config_timestamp=self._config["timestamp"],
+                column_fields=self._config.metadata + self._config.timeseries)
+        else:
+            trace_stats = get_column_stats(
+                df, self._config.metadata + self._config.timeseries)
+
         # Word2Vec embedding
         if len(word2vec_cols) == 0:
             print("No word2vec columns... Skipping word2vec embedding...")
@@ -107,13 +178,19 @@ class NetsharePrePostProcessor(PrePostProcessor):
                     model_name=self._config["word2vec"]["model_name"],
                     word2vec_cols=word2vec_cols,
                     word2vec_size=self._config["word2vec"]["vec_size"],
-                    annoy_n_trees=self._config["word2vec"]["annoy_n_trees"]
+                    annoy_n_trees=self._config["word2vec"]["annoy_n_trees"],
+                    sentences=CSVSentences(
+                        path=csv_file,
+                        columns=[c.column for c in word2vec_cols],
+                        batch_rows=batch_rows) if streaming else None
                 )
                 word2vec_model = Word2Vec.load(word2vec_model_path)
 
             print("Building annoy dictionary word2vec...")
             dict_type_annDictPair = build_annoy_dictionary_word2vec(
-                df=df,
+                df=df if not streaming else {
+                    c.column: list(trace_stats["column_values"][c.column])
+                    for c in word2vec_cols},
                 model_path=word2vec_model_path,
                 word2vec_cols=word2vec_cols,
                 word2vec_size=self._config["word2vec"]["vec_size"],
@@ -163,7 +240,11 @@ class NetsharePrePostProcessor(PrePostProcessor):
                     name=getattr(field, 'name', field.column),
                     word2vec_size=self._config["word2vec"]["vec_size"],
                     pre_processed_data_folder=output_folder,
-                    word2vec_type=field.encoding.split('_')[1])
+                    word2vec_type=field.encoding.split('_')[1],
+                    decode_backend=getattr(
+                        self._config["word2vec"], "decode_backend", "auto"),
+                    decode_num_threads=getattr(
+                        self._config["word2vec"], "decode_num_threads", 1))
 
             # Categorical field: (string | integer)
             if 'categorical' in getattr(field, 'encoding', ''):
@@ -172,7 +253,8 @@ class NetsharePrePostProcessor(PrePostProcessor):
                         '"encoding=cateogrical" can be only used for "type=(string | integer)"')
                 field_instance = DiscreteField(
                     choices=getattr(
-                        field, 'choices', list(set(df[field.column]))),
+                        field, 'choices',
+                        list(trace_stats["column_values"][field.column])),
                     name=getattr(field, 'name', field.column))
 
             # Continuous Field: (float)
@@ -180,8 +262,12 @@ class NetsharePrePostProcessor(PrePostProcessor):
                 field_instance = ContinuousField(
                     name=field_name,
                     norm_option=getattr(Normalization, field.normalization),
-                    min_x=getattr(field, 'min_x', min(df[field.column])) - EPS,
-                    max_x=getattr(field, 'max_x', max(df[field.column])) + EPS,
+                    min_x=getattr(
+                        field, 'min_x',
+                        trace_stats["column_min"][field.column]) - EPS,
+                    max_x=getattr(
+                        field, 'max_x',
+                        trace_stats["column_max"][field.column]) + EPS,
                     dim_x=1,
                     log1p_norm=getattr(field, 'log1p_norm', False)
                 )
@@ -194,12 +280,92 @@ class NetsharePrePostProcessor(PrePostProcessor):
         print("metadata fields:", [f.name for f in metadata_fields]),
         print("timeseries fields:", [f.name for f in timeseries_fields])
 
-        # Group data by metadata and measurement
-        gk = df.groupby(by=[m.column for m in self._config["metadata"]])
+        flow_key_cols = [m.column for m in self._config["metadata"]]
+
+        '''generating cross-chunk flow stats'''
+        # split big df to chunks
+        print("Using {}".format(self._config["df2chunks"]))
+        print(self._config["n_chunks"])
+        if streaming:
+            assign_chunk, _tmp_sizeortime = get_chunk_assigner(
+                stats=trace_stats,
+                config_timestamp=self._config["timestamp"],
+                split_type=self._config["df2chunks"],
+                n_chunks=self._config["n_chunks"],
+                path=csv_file,
+                batch_rows=batch_rows)
+            print("Spilling chunks to disk...")
+            chunk_files, chunk_lens, flow_chunk_sizes = spill_chunks(
+                path=csv_file,
+                batch_rows=batch_rows,
+                assign=assign_chunk,
+                n_chunks=self._config["n_chunks"],
+                flow_key_cols=flow_key_cols,
+                out_folder=os.path.join(output_folder, "raw_chunks"))
+            del trace_stats
+
+            # Like df2chunks, fixed_time splits skip empty chunks
+            if self._config["n_chunks"] > 1 and \
+                    self._config["df2chunks"] == "fixed_time":
+                for chunk_id in np.flatnonzero(chunk_lens == 0):
+                    print("Raw chunk_id: {}, empty df_chunk!".format(
+                        chunk_id))
+                chunk_id_map = np.cumsum(chunk_lens > 0) - 1
+                flow_chunk_sizes = flow_chunk_sizes.rename(
+                    index=dict(enumerate(chunk_id_map)),
+                    level=len(flow_key_cols))
+                chunk_files = [chunk_file for chunk_file, chunk_len in zip(
+                    chunk_files, chunk_lens) if chunk_len > 0]
+                chunk_lens = chunk_lens[chunk_lens > 0]
+
+            print("compute flowkey-chunk index...")
+            flow_keys, flow_sizes, flow_first_chunk, flow_chunk_mask = \
+                build_flow_chunk_index_from_sizes(
+                    flow_chunk_sizes, n_chunks=len(chunk_files))
+            per_chunk_flow_sizes = flow_chunk_sizes.groupby(
+                level=len(flow_key_cols))
+
+            def load_chunk(chunk_id):
+                return load_spilled_chunk(
+                    chunk_file=chunk_files[chunk_id],
+                    config_timestamp=self._config["timestamp"],
+                    flow_key_cols=flow_key_cols,
+                    flow_keys=flow_keys)
+        else:
+            df_chunks, _tmp_sizeortime = df2chunks(
+                big_raw_df=df,
+                config_timestamp=self._config["timestamp"],
+                split_type=self._config["df2chunks"],
+                n_chunks=self._config["n_chunks"])
+            chunk_lens = np.array([len(df_chunk) for df_chunk in df_chunks])
+
+            print("compute flowkey-chunk index...")
+            flow_ids, flow_first_chunk, flow_chunk_mask = \
+                build_flow_chunk_index(
+                    df=df,
+                    df_chunks=df_chunks,
+                    flow_key_cols=flow_key_cols,
+                    n_chunks=len(df_chunks))
+            flow_sizes = df.groupby(by=flow_key_cols).size()
+            flow_keys = flow_sizes.index
+            flow_sizes = flow_sizes.values
+            per_chunk_flow_sizes = [
+                (chunk_id, df_chunk.groupby(by=flow_key_cols).size())
+                for chunk_id, df_chunk in enumerate(df_chunks)
+                if len(df_chunk) > 0]
+            # Only the chunks (slices of the sorted trace) are needed from
+            # now on
+            del df
+
+            def load_chunk(chunk_id):
+                df_chunk = df_chunks[chunk_id]
+                # the chunk is handed off from now on
+                df_chunks[chunk_id] = None
+                return df_chunk, flow_ids.loc[df_chunk.index].to_numpy()
 
         # flow size distribution
         plot_cdf(
-            count_list=sorted(gk.size().values, reverse=True),
+            count_list=sorted(flow_sizes, reverse=True),
             xlabel="# of packets per flow",
             ylabel="CDF",
             title="",
@@ -207,21 +373,11 @@ class NetsharePrePostProcessor(PrePostProcessor):
             base_dir=output_folder
         )
 
-        '''generating cross-chunk flow stats'''
-        # split big df to chunks
-        print("Using {}".format(self._config["df2chunks"]))
-        print(self._config["n_chunks"])
-        df_chunks, _tmp_sizeortime = df2chunks(
-            big_raw_df=df,
-            config_timestamp=self._config["timestamp"],
-            split_type=self._config["df2chunks"],
-            n_chunks=self._config["n_chunks"])
-
         df_chunk_cnt_validation = 0
-        for chunk_id, df_chunk in enumerate(df_chunks):
+        for chunk_id, chunk_len in enumerate(chunk_lens):
             print("Chunk_id: {}, # of pkts/records: {}".format(
-                chunk_id, len(df_chunk)))
-            df_chunk_cnt_validation += len(df_chunk)
+                chunk_id, chunk_len))
+            df_chunk_cnt_validation += chunk_len
         print("df_chunk_cnt_validation:", df_chunk_cnt_validation)
 
         if self._config["df2chunks"] == "fixed_size":
@@ -235,49 +391,30 @@ class NetsharePrePostProcessor(PrePostProcessor):
         else:
             raise ValueError("Unknown df2chunks type!")
 
-        flowkeys_chunkidx_file = os.path.join(
-            output_folder, "flowkeys_idxlist.json")
-        if os.path.exists(flowkeys_chunkidx_file):
-            print("Reading pre-computed flowkey-chunk list...")
-            with open(flowkeys_chunkidx_file) as f:
-                flowkeys_chunkidx = json.load(f)
-        else:
-            print("compute flowkey-chunk list from scratch...")
-            flow_chunkid_keys = {}
-            for chunk_id, df_chunk in enumerate(df_chunks):
-                gk = df_chunk.groupby(
-                    [m.column for m in self._config["metadata"]])
-                flow_keys = list(gk.groups.keys())
-                flow_keys = list(map(str, flow_keys))
-                flow_chunkid_keys[chunk_id] = flow_keys
-
-            # key: flow key
-            # value: [a list of appeared chunk idx]
+        flow_chunk_index_folder = os.path.join(
+            output_folder, "flow_chunk_index")
+        save_flow_chunk_index(
+            flow_chunk_index_folder, flow_first_chunk, flow_chunk_mask)
+
+        flow_in_chunks = np.unpackbits(
+            flow_chunk_mask, axis=1, count=len(chunk_lens)).astype(bool)
+        flowkeys_chunklen_list = flow_in_chunks.sum(axis=1)
+        num_flows_cross_chunk = np.sum(flowkeys_chunklen_list > 1)
+        num_non_continuous_flows = count_non_continuous_flows(flow_in_chunks)
+
+        # key: flow key
+        # value: [a list of appeared chunk idx]
+        if getattr(self._config, "dump_flowkeys_idxlist", False):
             flowkeys_chunkidx = {}
-            for chunk_id, flowkeys in flow_chunkid_keys.items():
-                print("processing chunk {}/{}, # of flows: {}".format(
-                    chunk_id + 1, len(df_chunks), len(flowkeys)))
-                for k in flowkeys:
-                    if k not in flowkeys_chunkidx:
-                        flowkeys_chunkidx[k] = []
-                    flowkeys_chunkidx[k].append(chunk_id)
-
-            with open(flowkeys_chunkidx_file, 'w') as f:
+            for flowkey, chunkidx in zip(flow_keys, flow_in_chunks):
+                flowkeys_chunkidx[str(flowkey)] = \
+                    np.flatnonzero(chunkidx).tolist()
+            with open(os.path.join(
+                    output_folder, "flowkeys_idxlist.json"), 'w') as f:
                 json.dump(flowkeys_chunkidx, f)
 
-        num_non_continuous_flows = 0
-        num_flows_cross_chunk = 0
-        flowkeys_chunklen_list = []
-        for flowkey, chunkidx in flowkeys_chunkidx.items():
-            flowkeys_chunklen_list.append(len(chunkidx))
-            if not continuous_list_flag(chunkidx):
-                num_non_continuous_flows += 1
-            if len(chunkidx) > 1:
-                num_flows_cross_chunk += 1
-
         print("# of total flows:", len(flowkeys_chunklen_list))
-        print("# of total flows (sanity check):", len(
-            df.groupby([m.column for m in self._config["metadata"]])))
+        print("# of total flows (sanity check):", len(flow_first_chunk))
         print("# of flows cross chunk (of total flows): {} ({}%)".format(
             num_flows_cross_chunk,
             float(num_flows_cross_chunk) / len(flowkeys_chunklen_list) * 100))
@@ -294,16 +431,11 @@ class NetsharePrePostProcessor(PrePostProcessor):
         # global_max_flow_len for consistency between chunks
         per_chunk_flow_len_agg = []
         max_flow_lens = []
-        for chunk_id, df_chunk in enumerate(df_chunks):
-            # corner case: skip for empty df_chunk
-            if len(df_chunk) == 0:
-                continue
-            gk_chunk = df_chunk.groupby(
-                by=[m.column for m in self._config["metadata"]])
-            max_flow_lens.append(max(gk_chunk.size().values))
-            per_chunk_flow_len_agg += list(gk_chunk.size().values)
+        for chunk_id, chunk_flow_sizes in per_chunk_flow_sizes:
+            max_flow_lens.append(max(chunk_flow_sizes.values))
+            per_chunk_flow_len_agg += list(chunk_flow_sizes.values)
             print("chunk_id: {}, max_flow_len: {}".format(
-                chunk_id, max(gk_chunk.size().values)))
+                chunk_id, max(chunk_flow_sizes.values)))
         if not self._config["max_flow_len"]:
             global_max_flow_len = max(max_flow_lens)
         else:
@@ -313,26 +445,43 @@ class NetsharePrePostProcessor(PrePostProcessor):
               sorted(per_chunk_flow_len_agg)[-10:])
 
         '''prepare NetShare training data for each chunk'''
+        # Shared by all tasks instead of being serialized once per task
+        word2vec_model_ref = ray.put(word2vec_model)
+        metadata_fields_ref = ray.put(metadata_fields)
+        timeseries_fields_ref = ray.put(timeseries_fields)
+
         objs = []
-        for chunk_id, df_chunk in tqdm(enumerate(df_chunks)):
+        for chunk_id in tqdm(range(len(chunk_lens))):
             # skip empty df_chunk: corner case
-            if len(df_chunk) == 0:
+            if chunk_lens[chunk_id] == 0:
                 print("Chunk_id {} empty! Skipping ...".format(chunk_id))
                 continue
 
             print("\nChunk_id:", chunk_id)
+            data_out_dir = os.path.join(output_folder, f"chunkid-{chunk_id}")
+            df_per_chunk, chunk_flow_ids = load_chunk(chunk_id)
+            if chunk_handoff == "npy":
+                df_per_chunk_folder = os.path.join(data_out_dir, "raw_columns")
+                save_chunk_columns(df_per_chunk, df_per_chunk_folder)
+                df_per_chunk = df_per_chunk_folder
+                flow_ids_file = os.path.join(
+                    df_per_chunk_folder, "flow_ids.npy")
+                np.save(flow_ids_file, chunk_flow_ids)
+                chunk_flow_ids = flow_ids_file
+
             objs.append(split_per_chunk.remote(
                 config=self._config,
-                metadata_fields=copy.deepcopy(metadata_fields),
-                timeseries_fields=copy.deepcopy(timeseries_fields),
-                df_per_chunk=df_chunk.copy(),
-                embed_model=word2vec_model,
+                metadata_fields=metadata_fields_ref,
+                timeseries_fields=timeseries_fields_ref,
+                df_per_chunk=df_per_chunk,
+                embed_model=word2vec_model_ref,
                 global_max_flow_len=global_max_flow_len,
                 chunk_id=chunk_id,
-                data_out_dir=os.path.join(
-                    output_folder, f"chunkid-{chunk_id}"),
-                flowkeys_chunkidx=flowkeys_chunkidx
+                data_out_dir=data_out_dir,
+                flow_chunk_index_folder=flow_chunk_index_folder,
+                flow_ids=chunk_flow_ids
             ))
+            del df_per_chunk, chunk_flow_ids
 
         objs_output = ray.get(objs)
 
@@ -0,0 +1,291 @@
+'''Pure-NumPy PCAP parser.
+
+Parses the IPv4/TCP/UDP headers of a (classic, not pcapng) PCAP file
+straight into column arrays with the same columns as the CSV written by
+`main.c`. The record boundaries are found by walking the 16-byte record
+headers; all header fields are then gathered at once from the
+memory-mapped file. Large files are split by file offset into parts
+that are parsed by separate `netshare.ray` tasks.
+'''
+import os
+import mmap
+import itertools
+import collections
+import math
+import struct
+
+import numpy as np
+import pandas as pd
+import netshare.ray as ray
+
+from tqdm import tqdm
+
+PCAP_HEADER_LEN = 24
+RECORD_HEADER_LEN = 16
+
+# magic number -> (byte order, fraction of second per timestamp unit)
+PCAP_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 10**6),
+    b"\xa1\xb2\xc3\xd4": (">", 10**6),
+    b"\x4d\x3c\xb2\xa1": ("<", 10**9),
+    b"\xa1\xb2\x3c\x4d": (">", 10**9),
+}
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_IPV4 = 228
+
+ETHERTYPE_IP = 0x0800
+ETHERTYPE_VLAN = 0x8100
+ETHER_HDR_LEN = 14
+VLAN_TAG_LEN = 4
+
+IP_PROTOS = {6: "TCP", 17: "UDP"}
+
+PCAP_COLUMNS = [
+    "srcip", "dstip", "srcport", "dstport", "proto", "time", "pkt_len",
+    "version", "ihl", "tos", "id", "flag", "off", "ttl", "chksum"]
+
+
+def read_pcap_header(path):
+    with open(path, 'rb') as f:
+        header = f.read(PCAP_HEADER_LEN)
+    if len(header) < PCAP_HEADER_LEN or header[:4] not in PCAP_MAGICS:
+        raise ValueError(
+            f"{path} is not a PCAP file! "
+            "(pcapng files need to be converted with `editcap -F pcap`)")
+    byteorder, ts_units = PCAP_MAGICS[header[:4]]
+    snaplen, linktype = struct.unpack(byteorder + "II", header[16:24])
+    if linktype not in [LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_IPV4]:
+        raise ValueError(f"Unsupported PCAP link type {linktype}!")
+
+    return {
+        "byteorder": byteorder,
+        "ts_units": ts_units,
+        "snaplen": snaplen if snaplen > 0 else 262144,
+        "linktype": linktype,
+    }
+
+
+def _record_chains(data, offsets, header, max_ts_gap, n_checks=8):
+    '''Whether each of `offsets` starts a chain of `n_checks` plausible
+    records (or of fewer records ending exactly at the end of the file).'''
+    byteorder = header["byteorder"]
+    first_ts_sec = _uint(data, np.array([PCAP_HEADER_LEN]), 4, byteorder)[0]
+    ok = np.zeros(len(offsets), dtype=bool)
+    # candidates still being followed and their current record
+    candidates = np.arange(len(offsets))
+    record = np.asarray(offsets, dtype=np.int64)
+    for _ in range(n_checks):
+        at_end = record == len(data)
+        ok[candidates[at_end]] = True
+        keep = ~at_end & (record + RECORD_HEADER_LEN <= len(data))
+        candidates, record = candidates[keep], record[keep]
+        ts_sec = _uint(data, record, 4, byteorder)
+        ts_frac = _uint(data, record + 4, 4, byteorder)
+        incl_len = _uint(data, record + 8, 4, byteorder)
+        orig_len = _uint(data, record + 12, 4, byteorder)
+        keep = (ts_frac < header["ts_units"]) & \
+            (incl_len <= header["snaplen"]) & (incl_len <= orig_len) & \
+            (np.abs(ts_sec - first_ts_sec) <= max_ts_gap)
+        candidates = candidates[keep]
+        record = record[keep] + RECORD_HEADER_LEN + incl_len[keep]
+    ok[candidates] = True
+    return ok
+
+
+def find_record_offsets(buf, header, start, stop, max_ts_gap=10**8,
+                        scan_window=1 << 12, max_scan_window=1 << 20):
+    '''File offsets of the records that start in [start, stop).
+
+    For start > PCAP_HEADER_LEN, the first record is found by scanning
+    for a chain of plausible record headers, `scan_window` candidate
+    offsets at a time (doubled up to `max_scan_window`). The records are
+    then walked one at a time, which is inherently sequential: ~0.27s of
+    a single core per 1M records, i.e. ~14s for a 50M-packet trace split
+    over the parts (util/benchmark/bench_pcap_parser.py --walk_only).
+    '''
+    stop = min(stop, len(buf))
+    offset = PCAP_HEADER_LEN
+    if start > PCAP_HEADER_LEN:
+        data = np.frombuffer(buf, dtype=np.uint8)
+        offset = start
+        while offset < stop:
+            candidates = np.arange(
+                offset, min(offset + scan_window, stop), dtype=np.int64)
+            ok = _record_chains(data, candidates, header, max_ts_gap)
+            if ok.any():
+                offset = int(candidates[np.argmax(ok)])
+                break
+            offset += scan_window
+            scan_window = min(2 * scan_window, max_scan_window)
+        # `buf` can't be closed while viewed
+        del data
+
+    incl_len = struct.Struct(header["byteorder"] + "I")
+    offsets = []
+    while offset < stop and offset + RECORD_HEADER_LEN <= len(buf):
+        offsets.append(offset)
+        offset += RECORD_HEADER_LEN + \
+            incl_len.unpack_from(buf, offset + 8)[0]
+    offsets = np.array(offsets, dtype=np.int64)
+
+    # a truncated last record is dropped
+    if len(offsets) > 0 and offset > len(buf):
+        offsets = offsets[:-1]
+    return offsets
+
+
+def _uint(buf, offsets, n_bytes, byteorder=">"):
+    '''Gather `n_bytes`-byte unsigned integers at `offsets`.'''
+    value = np.zeros(len(offsets), dtype=np.int64)
+    for i in range(n_bytes):
+        byte = buf[offsets + (i if byteorder == ">" else n_bytes - 1 - i)]
+        value = (value << 8) | byte
+    return value
+
+
+def parse_pcap_part(path, start, stop):
+    '''Parse the records that start in [start, stop) of `path`.
+
+    Returns {column: array} for the TCP/UDP over IPv4 packets, in file
+    order, and the number of packets per protocol.
+    '''
+    header = read_pcap_header(path)
+    buf = np.memmap(path, dtype=np.uint8, mode='r')
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        offsets = find_record_offsets(mm, header, start, stop)
+    byteorder = header["byteorder"]
+
+    # Record headers
+    ts_sec = _uint(buf, offsets, 4, byteorder)
+    ts_frac = _uint(buf, offsets + 4, 4, byteorder)
+    incl_len = _uint(buf, offsets + 8, 4, byteorder)
+    time = ts_sec * 10**6 + ts_frac // (header["ts_units"] // 10**6)
+
+    # Link layer
+    data = offsets + RECORD_HEADER_LEN
+    if header["linktype"] == LINKTYPE_ETHERNET:
+        ip_start = np.full(len(offsets), -1, dtype=np.int64)
+        has_ether = incl_len >= ETHER_HDR_LEN + VLAN_TAG_LEN
+        ether_type = np.zeros(len(offsets), dtype=np.int64)
+        ether_type[has_ether] = _uint(buf, data[has_ether] + 12, 2)
+        ip_start[ether_type == ETHERTYPE_IP] = ETHER_HDR_LEN
+        is_vlan = ether_type == ETHERTYPE_VLAN
+        inner_type = np.zeros(len(offsets), dtype=np.int64)
+        inner_type[is_vlan] = _uint(buf, data[is_vlan] + 16, 2)
+        ip_start[is_vlan & (inner_type == ETHERTYPE_IP)] = \
+            ETHER_HDR_LEN + VLAN_TAG_LEN
+    else:
+        ip_start = np.zeros(len(offsets), dtype=np.int64)
+
+    # IPv4 header (w/ the first 4 bytes of TCP/UDP for ports)
+    keep = (ip_start >= 0) & (incl_len >= ip_start + 20)
+    ip = data + np.maximum(ip_start, 0)
+    version_ihl = np.zeros(len(offsets), dtype=np.int64)
+    version_ihl[keep] = buf[ip[keep]]
+    ihl = version_ihl & 0xF
+    keep &= (version_ihl >> 4 == 4) & (incl_len >= ip_start + ihl * 4 + 4)
+    proto = np.zeros(len(offsets), dtype=np.int64)
+    proto[keep] = buf[ip[keep] + 9]
+    proto_counts = {
+        "TCP": int(np.sum(proto[keep] == 6)),
+        "UDP": int(np.sum(proto[keep] == 17)),
+        "ICMP": int(np.sum(proto[keep] == 1)),
+        "Others": int(np.sum(~np.isin(proto[keep], [1, 6, 17]))),
+        "non-IPv4": int(np.sum(~keep)),
+    }
+    keep &= np.isin(proto, list(IP_PROTOS.keys()))
+
+    ip, ihl, proto, time = ip[keep], ihl[keep], proto[keep], time[keep]
+    l4 = ip + ihl * 4
+    ip_off = _uint(buf, ip + 6, 2)
+    columns = {
+        "srcip": _uint(buf, ip + 12, 4),
+        "dstip": _uint(buf, ip + 16, 4),
+        "srcport": _uint(buf, l4, 2),
+        "dstport": _uint(buf, l4 + 2, 2),
+        "proto": np.array([IP_PROTOS[6], IP_PROTOS[17]], dtype=object)[
+            (proto == 17).astype(np.int64)],
+        "time": time,
+        "pkt_len": _uint(buf, ip + 2, 2),
+        "version": buf[ip].astype(np.int64) >> 4,
+        "ihl": ihl,
+        "tos": buf[ip + 1].astype(np.int64),
+        "id": _uint(buf, ip + 4, 2),
+        "flag": ip_off >> 13,
+        "off": ip_off & 0x1FFF,
+        "ttl": buf[ip + 8].astype(np.int64),
+        "chksum": _uint(buf, ip + 10, 2),
+    }
+
+    return columns, proto_counts
+
+
+parse_pcap_part_remote = ray.remote(parse_pcap_part)
+
+
+def split_pcap(path, n_parts, min_part_size=1 << 20):
+    '''Split `path` into at most `n_parts` byte ranges of records.'''
+    file_size = os.path.getsize(path)
+    n_parts = max(1, min(
+        n_parts, math.ceil((file_size - PCAP_HEADER_LEN) / min_part_size)))
+    bounds = np.linspace(
+        PCAP_HEADER_LEN, file_size, n_parts + 1).astype(np.int64)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def pcap_parts(path, n_parts=None, max_in_flight=None):
+    '''Yield the parsed parts of `path` as DataFrames, in file order.
+
+    At most `max_in_flight` parts are submitted and not yet yielded at any
+    time (by default one per CPU w/ Ray, one w/o Ray, where parts are
+    parsed when submitted).
+    '''
+    if n_parts is None:
+        n_parts = os.cpu_count()
+    if max_in_flight is None:
+        max_in_flight = os.cpu_count() if ray.config.enabled else 1
+    parts = split_pcap(path, n_parts)
+    objs = collections.deque()
+
+    proto_counts = {}
+    with tqdm(total=len(parts)) as progress:
+        parts = iter(parts)
+        while True:
+            for start, stop in itertools.islice(
+                    parts, max_in_flight - len(objs)):
+                objs.append(parse_pcap_part_remote.remote(
+                    path, int(start), int(stop)))
+            if len(objs) == 0:
+                break
+            columns, part_proto_counts = ray.get(objs.popleft())
+            for proto, count in part_proto_counts.items():
+                proto_counts[proto] = proto_counts.get(proto, 0) + count
+            progress.update(1)
+            yield pd.DataFrame(columns, columns=PCAP_COLUMNS)
+    print(", ".join(f"{proto}: {count}"
+                    for proto, count in proto_counts.items()))
+    print("Only TCP/UDP packets over IPv4 are kept.")
+
+
+def pcap2df(path, n_parts=None):
+    return pd.concat(
+        list(pcap_parts(path, n_parts)), ignore_index=True)
+
+
+def pcap2csv(path, csv_file, n_parts=None, part_size=1 << 28):
+    '''Write the parsed packets to `csv_file` one part at a time.
+
+    By default, `path` is split into parts of about `part_size` bytes (at
+    least one per CPU), so that the parts in memory are bounded.
+    '''
+    if n_parts is None:
+        n_parts = max(os.cpu_count(), math.ceil(
+            os.path.getsize(path) / part_size))
+    header = True
+    for df_part in pcap_parts(path, n_parts):
+        df_part.to_csv(csv_file, mode='w' if header else 'a', index=False,
+                       header=header)
+        header = False
@@ -1,7 +1,9 @@
 import os
+import json
 import math
 import copy
 import pickle
+import shutil
 import ipaddress
 
 import pandas as pd
@@ -16,7 +18,9 @@ from sklearn import preprocessing
 
 from netshare.utils import Normalization
 from netshare.utils import DiscreteField, ContinuousField, BitField
-from .embedding_helper import get_vector
+from netshare.utils import write_table, table_extension, train_data_dtypes
+from netshare.utils import remove_stale_tables
+from .embedding_helper import get_word2vec_encoder
 
 
 def countList2cdf(count_list):
@@ -56,6 +60,25 @@ def continuous_list_flag(l_):
     return len(set(first_order_diff)) <= 1
 
 
+def count_non_continuous_flows(flow_in_chunks):
+    '''Vectorized `continuous_list_flag` over the chunk list of every flow.
+
+    flow_in_chunks: (# of flows, n_chunks) bool
+    '''
+    rows, cols = np.nonzero(flow_in_chunks)
+    same_flow = rows[1:] == rows[:-1]
+    diff_rows = rows[1:][same_flow]
+    diffs = np.diff(cols)[same_flow]
+
+    n_flows = flow_in_chunks.shape[0]
+    min_diff = np.full(n_flows, np.iinfo(np.int64).max)
+    max_diff = np.full(n_flows, np.iinfo(np.int64).min)
+    np.minimum.at(min_diff, diff_rows, diffs)
+    np.maximum.at(max_diff, diff_rows, diffs)
+
+    return int(np.sum(max_diff > min_diff))
+
+
 def chunks(a, n):
     '''Split list *a* into *n* chunks evenly'''
     k, m = divmod(len(a), n)
@@ -140,6 +163,293 @@ def df2chunks(big_raw_df,
         raise ValueError("Unknown split type")
 
 
+def get_column_stats(df, column_fields):
+    '''min/max of float columns and values of categorical columns.
+
+    In-memory counterpart of the column stats of `scan_trace`.
+    '''
+    stats = {
+        "column_min": {},
+        "column_max": {},
+        "column_values": {},
+    }
+    for field in column_fields:
+        col = field.column
+        if field.type == "float":
+            stats["column_min"][col] = min(df[col])
+            stats["column_max"][col] = max(df[col])
+        if 'categorical' in getattr(field, 'encoding', ''):
+            stats["column_values"][col] = set(df[col])
+
+    return stats
+
+
+def scan_trace(path, batch_rows, config_timestamp, column_fields):
+    '''First pass of the streaming preprocessing.
+
+    Reads `path` in batches of `batch_rows` rows and accumulates
+        n_rows: # of rows
+        time_min, time_max: range of the timestamp column (if any)
+        column_min, column_max: {column: min/max} of float columns
+        column_values: {column: set of values} of categorical and
+            word2vec columns
+    '''
+    time_col_name = config_timestamp["column"] if \
+        config_timestamp["generation"] and config_timestamp["column"] \
+        else None
+
+    stats = {
+        "n_rows": 0,
+        "time_min": None,
+        "time_max": None,
+        "column_min": {},
+        "column_max": {},
+        "column_values": {},
+    }
+    for batch in tqdm(pd.read_csv(path, chunksize=batch_rows)):
+        stats["n_rows"] += len(batch)
+        if time_col_name:
+            batch_min = batch[time_col_name].min()
+            batch_max = batch[time_col_name].max()
+            stats["time_min"] = batch_min if stats["time_min"] is None \
+                else min(stats["time_min"], batch_min)
+            stats["time_max"] = batch_max if stats["time_max"] is None \
+                else max(stats["time_max"], batch_max)
+
+        for field in column_fields:
+            col = field.column
+            if field.type == "float":
+                batch_min, batch_max = min(batch[col]), max(batch[col])
+                stats["column_min"][col] = batch_min \
+                    if col not in stats["column_min"] \
+                    else min(stats["column_min"][col], batch_min)
+                stats["column_max"][col] = batch_max \
+                    if col not in stats["column_max"] \
+                    else max(stats["column_max"][col], batch_max)
+            if 'categorical' in getattr(field, 'encoding', '') or \
+                    'word2vec' in getattr(field, 'encoding', ''):
+                stats["column_values"].setdefault(col, set()).update(
+                    batch[col])
+
+    print("# of rows:", stats["n_rows"])
+
+    return stats
+
+
+def find_sorted_values(path, column, ranks, value_min, value_max,
+                       batch_rows, n_bins=4096):
+    '''Values of rank `ranks` (0-based) of `column` in sorted order.
+
+    Reads only `column` of `path`, in batches of `batch_rows` rows, w/o
+    holding the whole column: every pass histograms the values of the
+    interval [lo, hi) known to hold each rank into `n_bins` bins and
+    narrows the interval to the bin of the rank, until the interval holds
+    at most `batch_rows` values (which are then read and sorted) or a
+    single distinct value.
+    '''
+    ranks = np.asarray(ranks, dtype=np.int64)
+    lo = np.full(len(ranks), np.nextafter(float(value_min), -np.inf))
+    hi = np.full(len(ranks), np.nextafter(float(value_max), np.inf))
+    # # of values < lo, # of values in [lo, hi)
+    below = np.zeros(len(ranks), dtype=np.int64)
+    count = np.full(len(ranks), np.iinfo(np.int64).max)
+    values = [None] * len(ranks)
+
+    while any(value is None for value in values):
+        pending = [i for i, value in enumerate(values) if value is None]
+        collect = {i: [] for i in pending if count[i] <= batch_rows}
+        edges = {i: np.linspace(lo[i], hi[i], n_bins + 1)
+                 for i in pending if i not in collect}
+        hists = {i: np.zeros(n_bins, dtype=np.int64) for i in edges}
+        interval_min = {i: None for i in edges}
+        interval_max = {i: None for i in edges}
+        for batch in pd.read_csv(path, usecols=[column], chunksize=batch_rows):
+            batch_values = batch[column].to_numpy()
+            for i in pending:
+                in_interval = batch_values[
+                    (batch_values >= lo[i]) & (batch_values < hi[i])]
+                if i in collect:
+                    collect[i].append(in_interval)
+                elif len(in_interval) > 0:
+                    bins = np.searchsorted(
+                        edges[i], in_interval, side="right") - 1
+                    hists[i] += np.bincount(bins, minlength=n_bins)
+                    batch_min, batch_max = in_interval.min(), \
+                        in_interval.max()
+                    interval_min[i] = batch_min if interval_min[i] is None \
+                        else min(interval_min[i], batch_min)
+                    interval_max[i] = batch_max if interval_max[i] is None \
+                        else max(interval_max[i], batch_max)
+
+        for i in pending:
+            if i in collect:
+                values[i] = np.sort(np.concatenate(collect[i]))[
+                    ranks[i] - below[i]]
+            elif interval_min[i] == interval_max[i]:
+                values[i] = interval_min[i]
+            else:
+                cum = np.cumsum(hists[i])
+                b = int(np.searchsorted(
+                    cum, ranks[i] - below[i], side="right"))
+                below[i] += cum[b - 1] if b > 0 else 0
+                count[i] = hists[i][b]
+                lo[i], hi[i] = edges[i][b], edges[i][b + 1]
+
+    return np.array(values)
+
+
+def get_chunk_assigner(stats, config_timestamp, split_type, n_chunks,
+                       path=None, batch_rows=None, eps=1e-5):
+    '''Streaming counterpart of `df2chunks`.
+
+    Returns `assign(batch)` giving the chunk id of every row of a batch
+    (-1 for rows `df2chunks` would drop), and the chunk size (# of rows)
+    or chunk time, as the second output of `df2chunks`. `fixed_size`
+    splits read the timestamps of `path` again (see `find_sorted_values`).
+    '''
+    if n_chunks > 1 and (
+        (not config_timestamp["column"]) or (
+            not config_timestamp["generation"])):
+        raise ValueError(
+            "Trying to split into multiple chunks by timestamp but no timestamp is provided!")
+
+    if n_chunks == 1:
+        def assign(batch):
+            return np.zeros(len(batch), dtype=np.int64)
+        if stats["time_min"] is None:
+            return assign, None
+        return assign, (stats["time_max"] - stats["time_min"]) / n_chunks
+
+    time_col_name = config_timestamp["column"]
+    if split_type == "fixed_size":
+        # Rows are assigned by timestamp: chunk i holds the rows between
+        # the (i * chunk_size)-th and ((i + 1) * chunk_size)-th smallest
+        # timestamps.
+        chunk_size = math.ceil(stats["n_rows"] / n_chunks)
+        chunk_start_times = find_sorted_values(
+            path=path,
+            column=time_col_name,
+            ranks=np.arange(chunk_size, stats["n_rows"], chunk_size),
+            value_min=stats["time_min"],
+            value_max=stats["time_max"],
+            batch_rows=batch_rows)
+
+        def assign(batch):
+            return np.searchsorted(
+                chunk_start_times, batch[time_col_name].to_numpy(),
+                side="right")
+        return assign, chunk_size
+
+    elif split_type == "fixed_time":
+        time_evenly_spaced = np.linspace(
+            stats["time_min"], stats["time_max"], num=n_chunks + 1)
+        time_evenly_spaced[-1] *= (1 + eps)
+        chunk_time = (stats["time_max"] - stats["time_min"]) / n_chunks
+
+        def assign(batch):
+            # chunk i: time_evenly_spaced[i] <= t < time_evenly_spaced[i + 1]
+            chunk_ids = np.searchsorted(
+                time_evenly_spaced, batch[time_col_name].to_numpy(),
+                side="right") - 1
+            chunk_ids[chunk_ids >= n_chunks] = -1
+            return chunk_ids
+        return assign, chunk_time
+
+    else:
+        raise ValueError("Unknown split type")
+
+
+def spill_chunks(path, batch_rows, assign, n_chunks, flow_key_cols,
+                 out_folder, compact_every=16):
+    '''Second pass of the streaming preprocessing.
+
+    Appends every batch of `path` to one CSV file per chunk in
+    `out_folder` and counts the rows of every (flow, chunk) pair on the
+    way. Returns
+        chunk_files: [path of the CSV file of every chunk]
+        chunk_lens: (n_chunks,) # of rows of every chunk
+        flow_chunk_sizes: pd.Series of # of rows, indexed by
+            (*flow_key_cols, chunk id)
+    '''
+    os.makedirs(out_folder, exist_ok=True)
+    chunk_files = [os.path.join(out_folder, f"chunk-{chunk_id}.csv")
+                   for chunk_id in range(n_chunks)]
+    for chunk_file in chunk_files:
+        if os.path.exists(chunk_file):
+            os.remove(chunk_file)
+    chunk_lens = np.zeros(n_chunks, dtype=np.int64)
+
+    flow_chunk_sizes = []
+    for batch in tqdm(pd.read_csv(path, chunksize=batch_rows)):
+        chunk_ids = assign(batch)
+        flow_chunk_sizes.append(batch.groupby(
+            flow_key_cols + [chunk_ids]).size())
+        if len(flow_chunk_sizes) >= compact_every:
+            flow_chunk_sizes = [pd.concat(flow_chunk_sizes).groupby(
+                level=list(range(len(flow_key_cols) + 1))).sum()]
+
+        for chunk_id, rows in pd.Series(
+                np.arange(len(batch))).groupby(chunk_ids):
+            if chunk_id < 0:
+                continue
+            batch.iloc[rows.to_numpy()].to_csv(
+                chunk_files[chunk_id], mode='a', index=False,
+                header=chunk_lens[chunk_id] == 0)
+            chunk_lens[chunk_id] += len(rows)
+
+    flow_chunk_sizes = pd.concat(flow_chunk_sizes).groupby(
+        level=list(range(len(flow_key_cols) + 1))).sum()
+    # rows dropped by the split (chunk id -1) do not belong to any chunk
+    flow_chunk_sizes = flow_chunk_sizes[
+        flow_chunk_sizes.index.get_level_values(-1) >= 0]
+
+    return chunk_files, chunk_lens, flow_chunk_sizes
+
+
+def build_flow_chunk_index_from_sizes(flow_chunk_sizes, n_chunks):
+    '''`build_flow_chunk_index` from the output of `spill_chunks`.
+
+    Flows are factorized in sorted flow key order. Returns
+        flow_keys: pd.Index of the flow keys in flow id order
+        flow_sizes: (# of flows,) # of rows of every flow
+        first_chunk, chunk_mask: see `build_flow_chunk_index`
+    '''
+    flow_chunk_sizes = flow_chunk_sizes.sort_index()
+    flow_key_index = flow_chunk_sizes.index.droplevel(-1)
+    chunk_ids = flow_chunk_sizes.index.get_level_values(-1).to_numpy()
+    flow_ids, flow_keys = pd.factorize(flow_key_index, sort=True)
+
+    flow_in_chunks = np.zeros((len(flow_keys), n_chunks), dtype=bool)
+    flow_in_chunks[flow_ids, chunk_ids] = True
+    first_chunk = np.argmax(flow_in_chunks, axis=1).astype(np.int32)
+    chunk_mask = np.packbits(flow_in_chunks, axis=1)
+    flow_sizes = np.bincount(
+        flow_ids, weights=flow_chunk_sizes.to_numpy(),
+        minlength=len(flow_keys)).astype(np.int64)
+
+    return flow_keys, flow_sizes, first_chunk, chunk_mask
+
+
+def load_spilled_chunk(chunk_file, config_timestamp, flow_key_cols,
+                       flow_keys):
+    '''Read a chunk written by `spill_chunks` back as `df2chunks` would
+    have produced it (sorted by timestamp), with its flow ids.
+
+    Returns (df_chunk, flow_ids), flow_ids indexed like df_chunk.
+    '''
+    # The chunk files hold the exact repr of the parsed input values
+    df_chunk = pd.read_csv(chunk_file, float_precision="round_trip")
+    if config_timestamp["generation"] and config_timestamp["column"]:
+        df_chunk = df_chunk.sort_values(config_timestamp["column"])
+    flow_ids = flow_keys.get_indexer(
+        pd.MultiIndex.from_frame(df_chunk[flow_key_cols])
+        if len(flow_key_cols) > 1 else df_chunk[flow_key_cols[0]])
+    if (flow_ids < 0).any():
+        raise ValueError(
+            f"{chunk_file} has flows that are missing in the flow index!")
+    return df_chunk, pd.Series(flow_ids, index=df_chunk.index)
+
+
 def apply_per_field(
         original_df,
         config_fields,
@@ -152,8 +462,8 @@ def apply_per_field(
         field_instance = field_instances[i]
         # Bit Field: (integer)
         if 'bit' in getattr(field, 'encoding', ''):
-            this_df = original_df.apply(lambda row: field_instance.normalize(
-                row[field.column]), axis='columns', result_type='expand')
+            this_df = pd.DataFrame(field_instance.normalize_array(
+                original_df[field.column].to_numpy()))
             this_df.columns = [
                 f'{field.column}_{i}' for i in range(this_df.shape[1])]
             new_field_list += list(this_df.columns)
@@ -161,10 +471,8 @@ def apply_per_field(
 
         # word2vec field: (any)
         if 'word2vec' in getattr(field, 'encoding', ''):
-            this_df = original_df.apply(
-                lambda row: get_vector(embed_model, str(
-                    row[field.column]), norm_option=True),
-                axis='columns', result_type='expand')
+            this_df = pd.DataFrame(get_word2vec_encoder(embed_model).encode(
+                original_df[field.column].to_numpy()))
             this_df.columns = [
                 f'{field.column}_{i}' for i in range(this_df.shape[1])]
             new_field_list += list(this_df.columns)
@@ -188,6 +496,165 @@ def apply_per_field(
     return new_df, new_field_list
 
 
+def truncated_flow_rows(df, flow_key_cols, max_flow_len):
+    '''Boolean mask of the rows kept by `truncate_flows`.'''
+    flow_pos = df.groupby(flow_key_cols).cumcount()
+    return (flow_pos < max_flow_len).to_numpy()
+
+
+def truncate_flows(df, flow_key_cols, max_flow_len):
+    '''Keep the first `max_flow_len` rows of every flow.
+
+    Rows keep their original order; rows with NaN flow keys are dropped,
+    as groupby does.
+    '''
+    return df[truncated_flow_rows(
+        df, flow_key_cols, max_flow_len)].reset_index(drop=True)
+
+
+def build_flow_tensors(df, gk, timeseries_cols, max_flow_len,
+                       dtype=None, gen_flag_dtype=float):
+    '''Scatter per-flow rows into zero-padded training tensors.
+
+    Flows are ordered as `gk` iterates them and rows keep their order
+    within each flow. `data_feature` is of `dtype` (the dtype of the
+    timeseries columns if None) and `data_gen_flag` of `gen_flag_dtype`.
+    Returns
+        data_feature: (# of flows, max_flow_len, # of timeseries cols)
+        data_gen_flag: (# of flows, max_flow_len)
+        flow_first_rows: positional index of the first row of each flow
+    '''
+    flow_ids = gk.ngroup().to_numpy()
+    flow_pos = gk.cumcount().to_numpy()
+    # rows with NaN flow keys are dropped by groupby
+    valid_rows = flow_ids >= 0
+    if (flow_pos[valid_rows] >= max_flow_len).any():
+        raise ValueError(
+            "Flow longer than max_flow_len {}!".format(max_flow_len))
+
+    values = df[timeseries_cols].to_numpy()
+    data_feature = np.zeros(
+        (gk.ngroups, max_flow_len, values.shape[1]),
+        dtype=values.dtype if dtype is None else dtype)
+    data_feature[flow_ids[valid_rows], flow_pos[valid_rows]] = \
+        values[valid_rows]
+
+    data_gen_flag = np.zeros((gk.ngroups, max_flow_len), dtype=gen_flag_dtype)
+    data_gen_flag[flow_ids[valid_rows], flow_pos[valid_rows]] = 1.0
+
+    _, flow_first_rows = np.unique(flow_ids[valid_rows], return_index=True)
+    flow_first_rows = np.flatnonzero(valid_rows)[flow_first_rows]
+
+    return data_feature, data_gen_flag, flow_first_rows
+
+
+def build_flow_chunk_index(df, df_chunks, flow_key_cols, n_chunks):
+    '''Columnar flow key -> chunk index.
+
+    Flows are factorized in sorted flow key order. Returns
+        flow_ids: pd.Series of the flow id of every row, indexed like `df`
+        first_chunk: (# of flows,) first chunk the flow appears in
+        chunk_mask: (# of flows, ceil(n_chunks / 8)) uint8, bit i (MSB
+            first, see np.packbits) is set if the flow appears in chunk i
+    '''
+    gk = df.groupby(flow_key_cols)
+    flow_ids = pd.Series(gk.ngroup().to_numpy(), index=df.index)
+
+    flow_in_chunks = np.zeros((gk.ngroups, n_chunks), dtype=bool)
+    for chunk_id, df_chunk in enumerate(df_chunks):
+        flow_in_chunks[flow_ids.loc[df_chunk.index].to_numpy(), chunk_id] = \
+            True
+    first_chunk = np.argmax(flow_in_chunks, axis=1).astype(np.int32)
+    chunk_mask = np.packbits(flow_in_chunks, axis=1)
+
+    return flow_ids, first_chunk, chunk_mask
+
+
+def save_flow_chunk_index(folder, first_chunk, chunk_mask):
+    os.makedirs(folder, exist_ok=True)
+    np.save(os.path.join(folder, "first_chunk.npy"), first_chunk)
+    np.save(os.path.join(folder, "chunk_mask.npy"), chunk_mask)
+
+
+def load_flow_chunk_index(folder, mmap_mode="r"):
+    first_chunk = np.load(
+        os.path.join(folder, "first_chunk.npy"), mmap_mode=mmap_mode)
+    chunk_mask = np.load(
+        os.path.join(folder, "chunk_mask.npy"), mmap_mode=mmap_mode)
+    return first_chunk, chunk_mask
+
+
+def save_chunk_columns(df_chunk, folder):
+    '''Write every column of `df_chunk` to `folder` as one .npy file.
+
+    Numeric columns can be memory-mapped back by `load_chunk_columns`;
+    object (e.g., string) columns are pickled and loaded in full.
+    '''
+    os.makedirs(folder, exist_ok=True)
+    columns = []
+    for i, column in enumerate(df_chunk.columns):
+        values = df_chunk[column].to_numpy()
+        np.save(os.path.join(folder, f"col-{i}.npy"), values,
+                allow_pickle=values.dtype == object)
+        columns.append(column)
+    with open(os.path.join(folder, "columns.json"), 'w') as f:
+        json.dump(columns, f)
+
+
+def load_chunk_columns(folder, mmap_mode="r"):
+    with open(os.path.join(folder, "columns.json"), 'r') as f:
+        columns = json.load(f)
+    data = {}
+    for i, column in enumerate(columns):
+        path = os.path.join(folder, f"col-{i}.npy")
+        try:
+            data[column] = np.load(path, mmap_mode=mmap_mode)
+        except ValueError:
+            # object arrays cannot be memory-mapped
+            data[column] = np.load(path, allow_pickle=True)
+    return pd.DataFrame(data, columns=columns)
+
+
+def lookup_flow_chunks(flow_ids, first_chunk, chunk_mask, n_chunks):
+    '''Per-flow chunk membership of the given flow ids.
+
+    Only the rows of `flow_ids` are read, so `first_chunk` and
+    `chunk_mask` can be memory-mapped. Returns
+        flow_in_chunks: (# of flows, n_chunks) bool, flow appears in chunk
+        flow_first_chunk: (# of flows,) first chunk the flow appears in
+    '''
+    flow_in_chunks = np.unpackbits(
+        chunk_mask[flow_ids], axis=1, count=n_chunks).astype(bool)
+    flow_first_chunk = np.asarray(first_chunk[flow_ids])
+
+    return flow_in_chunks, flow_first_chunk
+
+
+def build_flow_tags(flow_in_chunks, flow_first_chunk, chunk_id, split_name):
+    '''One-hot multi-chunk tags of every flow in chunk `chunk_id`.
+
+    Columns are [startFromThisChunk, chunk_0, ..., chunk_{n_chunks-1}],
+    each encoded as [1.0, 0.0] (false) or [0.0, 1.0] (true).
+    multichunk_dep_v1 only sets chunk_i for flows starting in this chunk;
+    multichunk_dep_v2 sets it for every flow.
+    '''
+    start_from_this_chunk = flow_first_chunk == chunk_id
+    if split_name == "multichunk_dep_v1":
+        chunk_bits = flow_in_chunks & start_from_this_chunk[:, None]
+    elif split_name == "multichunk_dep_v2":
+        chunk_bits = flow_in_chunks
+    else:
+        raise ValueError(f"Unknown split_name {split_name}!")
+
+    bits = np.concatenate(
+        (start_from_this_chunk[:, None], chunk_bits), axis=1)
+    flow_tags = np.empty((bits.shape[0], 2 * bits.shape[1]), dtype=float)
+    flow_tags[:, 0::2] = ~bits
+    flow_tags[:, 1::2] = bits
+
+    return flow_tags
+
+
 @ray.remote(scheduling_strategy="SPREAD", max_calls=1)
 def split_per_chunk(
     config,
@@ -198,31 +665,36 @@ def split_per_chunk(
     global_max_flow_len,
     chunk_id,
     data_out_dir,
-    flowkeys_chunkidx=None,
+    flow_chunk_index_folder=None,
+    flow_ids=None,
 ):
     split_name = config["split_name"]
+    train_data_format = getattr(config, "train_data_format", "npz")
+    if train_data_format not in ["npz", "npy"]:
+        raise ValueError(
+            f"Unknown train_data_format {train_data_format}! "
+            "Supported formats: ['npz', 'npy']")
+    # Field lists are shared between chunks and extended below
+    metadata_fields = copy.deepcopy(metadata_fields)
+    timeseries_fields = copy.deepcopy(timeseries_fields)
+    # Chunks handed off by path (see `save_chunk_columns`)
+    if isinstance(df_per_chunk, str):
+        df_per_chunk = load_chunk_columns(df_per_chunk)
     metadata_cols = [m for m in config["metadata"]]
 
     # Truncate groups with length greater than global_max_flow_len
-    def process_group(group):
-        if len(group) > global_max_flow_len:
-            processed_group = group.head(global_max_flow_len)
-        else:
-            processed_group = group
-        return processed_group
-    
-    def truncate_group(raw_df, metadata_cols):
-        grouped = raw_df.groupby([m.column for m in metadata_cols])
-        processed = grouped.apply(process_group)
-
-        # reset the index of the resulting DataFrame
-        processed = processed.reset_index(drop=True)
-
-        return processed
-    
     print("Before truncation, df_per_chunk:", df_per_chunk.shape)
-    df_per_chunk = truncate_group(df_per_chunk, metadata_cols)
+    kept_rows = truncated_flow_rows(
+        df_per_chunk,
+        flow_key_cols=[m.column for m in metadata_cols],
+        max_flow_len=global_max_flow_len)
+    df_per_chunk = df_per_chunk[kept_rows].reset_index(drop=True)
     print("After truncation, df_per_chunk:", df_per_chunk.shape)
+    # Flow ids of the rows, handed off by path w/ the chunk
+    if isinstance(flow_ids, str):
+        flow_ids = np.load(flow_ids, mmap_mode="r")
+    if flow_ids is not None:
+        flow_ids = np.asarray(flow_ids)[kept_rows]
 
     df_per_chunk, new_metadata_list = apply_per_field(
         original_df=df_per_chunk,
@@ -307,90 +779,44 @@ def split_per_chunk(
     # print("new_metadata_list:", new_metadata_list)
     # print("new_timeseries_list:", new_timeseries_list)
 
+    train_dtype, gen_flag_dtype = train_data_dtypes(
+        getattr(config, "train_data_dtype", "float32"))
     gk = df_per_chunk.groupby(new_metadata_list)
     data_attribute = np.array(list(gk.groups.keys()))
-    data_feature = []
-    data_gen_flag = []
-    flow_tags = []
-    for group_name, df_group in tqdm(gk):
-        # RESET INDEX TO MAKE IT START FROM ZERO
-        df_group = df_group.reset_index(drop=True)
-        data_feature.append(df_group[new_timeseries_list].to_numpy())
-        data_gen_flag.append(np.ones((len(df_group),), dtype=float) * 1.0)
-
-        attr_per_row = []
-        if config["n_chunks"] > 1:
-            if flowkeys_chunkidx is None:
-                raise ValueError(
-                    "Cross-chunk mechanism enabled, \
-                    cross-chunk flow stats not provided!")
-            ori_group_name = tuple(
-                df_group.iloc[0][[m.column for m in config["metadata"]]])
-
-            # MULTI-CHUNK TAGS: TO BE OPTIMIZED FOR PERFORMANCE
-            if str(ori_group_name) in flowkeys_chunkidx:  # sanity check
-                # flow starts from this chunk
-                if flowkeys_chunkidx[str(ori_group_name)][0] == chunk_id:
-                    # attr_per_row += list(
-                    # fields_dict["startFromThisChunk"].normalize(1.0))
-                    attr_per_row += [0.0, 1.0]
-                    # num_flows_startFromThisChunk += 1
-
-                    for i in range(config["n_chunks"]):
-                        if i in flowkeys_chunkidx[str(ori_group_name)]:
-                            # attr_per_row += list(fields_dict["chunk_{}".format(
-                            #     i)].normalize(1.0))
-                            attr_per_row += [0.0, 1.0]
-                        else:
-                            # attr_per_row += list(fields_dict["chunk_{}".format(
-                            #     i)].normalize(0.0))
-                            attr_per_row += [1.0, 0.0]
-
-                # flow does not start from this chunk
-                else:
-                    # attr_per_row += list(
-                    #     fields_dict["startFromThisChunk"].normalize(0.0))
-                    attr_per_row += [1.0, 0.0]
-                    if split_name == "multichunk_dep_v1":
-                        for i in range(config["n_chunks"]):
-                            # attr_per_row += list(fields_dict["chunk_{}".format(
-                            #     i)].normalize(0.0))
-                            attr_per_row += [1.0, 0.0]
-
-                    elif split_name == "multichunk_dep_v2":
-                        for i in range(config["n_chunks"]):
-                            if i in flowkeys_chunkidx[str(ori_group_name)]:
-                                # attr_per_row += list(
-                                #     fields_dict["chunk_{}".format(i)].normalize(1.0))
-                                attr_per_row += [0.0, 1.0]
-                            else:
-                                # attr_per_row += list(
-                                #     fields_dict["chunk_{}".format(i)].normalize(0.0))
-                                attr_per_row += [1.0, 0.0]
-                flow_tags.append(attr_per_row)
-            else:
-                raise ValueError(
-                    f"{ori_group_name} not found in the raw file!")
+    data_feature, data_gen_flag, flow_first_rows = build_flow_tensors(
+        df=df_per_chunk,
+        gk=gk,
+        timeseries_cols=new_timeseries_list,
+        max_flow_len=global_max_flow_len,
+        dtype=train_dtype,
+        gen_flag_dtype=gen_flag_dtype)
+
+    if config["n_chunks"] > 1:
+        if flow_chunk_index_folder is None or flow_ids is None:
+            raise ValueError(
+                "Cross-chunk mechanism enabled, \
+                cross-chunk flow stats not provided!")
+        first_chunk, chunk_mask = load_flow_chunk_index(
+            flow_chunk_index_folder)
+        flow_in_chunks, flow_first_chunk = lookup_flow_chunks(
+            flow_ids=flow_ids[flow_first_rows],
+            first_chunk=first_chunk,
+            chunk_mask=chunk_mask,
+            n_chunks=config["n_chunks"])
+        flow_tags = build_flow_tags(
+            flow_in_chunks=flow_in_chunks,
+            flow_first_chunk=flow_first_chunk,
+            chunk_id=chunk_id,
+            split_name=split_name)
     if config["n_chunks"] > 1:
         data_attribute = np.concatenate(
-            (data_attribute, np.array(flow_tags)), axis=1)
+            (data_attribute, flow_tags), axis=1)
     if config["timestamp"]["generation"] and \
             config["timestamp"]["encoding"] == "interarrival":
         data_attribute = np.concatenate(
             (data_attribute, np.array(flow_start_list).reshape(-1, 1)), axis=1)
 
-    data_attribute = np.asarray(data_attribute)
-    data_feature = np.stack(
-        [np.pad(
-            arr,
-            ((0, global_max_flow_len - arr.shape[0]), (0, 0)),
-            mode='constant',
-            constant_values=0) for arr in data_feature])
-    data_gen_flag = np.stack([np.pad(
-        arr,
-        ((0, global_max_flow_len - arr.shape[0])),
-        mode='constant',
-        constant_values=0) for arr in data_gen_flag])
+    data_attribute = np.asarray(data_attribute).astype(train_dtype, copy=False)
     print("data_attribute: {}, {}GB in memory".format(
         np.shape(data_attribute),
         data_attribute.size * data_attribute.itemsize / (10**9)))
@@ -403,13 +829,33 @@ def split_per_chunk(
 
     # Write files
     os.makedirs(data_out_dir, exist_ok=True)
-    df_per_chunk.to_csv(os.path.join(data_out_dir, "raw.csv"), index=False)
-    np.savez(
-        os.path.join(data_out_dir, "data_train.npz"),
-        data_attribute=data_attribute,
-        data_feature=data_feature,
-        data_gen_flag=data_gen_flag
-    )
+    raw_table = os.path.join(
+        data_out_dir,
+        "raw" + table_extension(getattr(config, "intermediate_format", "csv")))
+    write_table(df_per_chunk, raw_table)
+    remove_stale_tables(raw_table)
+    # The model loads `data_train/` if it exists, so the layout of an
+    # earlier run with the other format is removed
+    npz_file = os.path.join(data_out_dir, "data_train.npz")
+    npy_folder = os.path.join(data_out_dir, "data_train")
+    if train_data_format == "npz":
+        np.savez(
+            npz_file,
+            data_attribute=data_attribute,
+            data_feature=data_feature,
+            data_gen_flag=data_gen_flag
+        )
+        if os.path.isdir(npy_folder):
+            shutil.rmtree(npy_folder)
+    else:
+        # One uncompressed file per array, memory-mapped by the model
+        os.makedirs(npy_folder, exist_ok=True)
+        for name, array in [("data_attribute", data_attribute),
+                            ("data_feature", data_feature),
+                            ("data_gen_flag", data_gen_flag)]:
+            np.save(os.path.join(npy_folder, name + ".npy"), array)
+        if os.path.exists(npz_file):
+            os.remove(npz_file)
 
     with open(os.path.join(
             data_out_dir, 'data_attribute_output.pkl'), 'wb') as f:
@@ -52,6 +52,22 @@ def test_model(
             word=word)
 
 
+class CSVSentences(object):
+    '''Restartable iterable of word2vec sentences read from a CSV file in
+    batches of `batch_rows` rows, for traces that do not fit in memory.'''
+
+    def __init__(self, path, columns, batch_rows=1000000):
+        self.path = path
+        self.columns = columns
+        self.batch_rows = batch_rows
+
+    def __iter__(self):
+        for batch in pd.read_csv(
+                self.path, usecols=self.columns, chunksize=self.batch_rows):
+            for row in batch[self.columns].itertuples(index=False):
+                yield [str(word) for word in row]
+
+
 def word2vec_train(
     df,
     out_dir,
@@ -60,7 +76,8 @@ def word2vec_train(
     word2vec_size,
     annoy_n_trees,
     force_retrain=False,  # retrain from scratch
-    model_test=False
+    model_test=False,
+    sentences=None  # iterable of sentences, used instead of df if given
 ):
     model_path = os.path.join(
         out_dir,
@@ -71,11 +88,12 @@ def word2vec_train(
         model = Word2Vec.load(model_path)
     else:
         print("Training Word2Vec model from scratch...")
-        sentences = []
-        for row in range(0, len(df)):
-            sentence = [str(df.at[row, col])
-                        for col in [c.column for c in word2vec_cols]]
-            sentences.append(sentence)
+        if sentences is None:
+            sentences = []
+            for row in range(0, len(df)):
+                sentence = [str(df.at[row, col])
+                            for col in [c.column for c in word2vec_cols]]
+                sentences.append(sentence)
 
         model = Word2Vec(
             sentences=sentences,
@@ -86,7 +104,7 @@ def word2vec_train(
         model.save(model_path)
     print(f"Word2Vec model is saved at {model_path}")
 
-    if model_test:
+    if model_test and df is not None:
         test_model(
             df=df,
             model_path=model_path,
@@ -1,6 +1,6 @@
-from .remote import remote, get
+from .remote import remote, get, put
 from .config import config
 from .ray_functions import init, shutdown
 
 
-__all__ = ['config', 'init', 'shutdown', 'remote', 'get']
+__all__ = ['config', 'init', 'shutdown', 'remote', 'get', 'put']
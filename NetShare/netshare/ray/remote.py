@@ -53,3 +53,12 @@ def get(object_refs, **kwargs):
             return object_refs.get_result()
         elif isinstance(object_refs, list):
             return [object_ref.get_result() for object_ref in object_refs]
+
+
+def put(value, **kwargs):
+    if ray_config.enabled:
+        import ray
+        return ray.put(value, **kwargs)
+    else:
+        # Remote functions are called directly, so pass the value through.
+        return value
@@ -2,6 +2,11 @@ from .tee import Tee
 from .field import ContinuousField, DiscreteField, BitField, Word2VecField
 from .output import OutputType, Normalization, Output
 from .exec_cmd import exec_cmd
+from .table_io import write_table, read_table, find_table, table_extension, is_table
+from .table_io import remove_stale_tables
+from .train_data import train_data_dtypes
 
 __all__ = ['Tee', 'ContinuousField', 'DiscreteField', 'BitField',
-           'Word2VecField', 'OutputType', 'Normalization', 'Output', 'exec_cmd']
+           'Word2VecField', 'OutputType', 'Normalization', 'Output', 'exec_cmd',
+           'write_table', 'read_table', 'find_table', 'table_extension',
+           'is_table', 'remove_stale_tables', 'train_data_dtypes']
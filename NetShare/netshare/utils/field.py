@@ -1,13 +1,10 @@
-import os
-import json
 import numpy as np
 import pandas as pd
 from typing import Any, Dict, List
 from collections import defaultdict
-from annoy import AnnoyIndex
 
 from .output import Normalization, OutputType, Output
-from ..pre_post_processors.netshare.embedding_helper import get_vector, get_original_obj, get_original_objs
+from ..pre_post_processors.netshare.embedding_helper import get_word2vec_encoder, get_word2vec_decoder
 
 EPS = 1e-8
 
@@ -149,22 +146,51 @@ class BitField(Field):
 
         return bits
 
+    def normalize_array(self, decimal_x):
+        """Batch version of `normalize`.
+
+        Encodes a 1-D array of non-negative integers into a
+        (n, 2 * num_bits) float32 array where bit `b` (MSB first) occupies
+        columns [2b, 2b+1] as [1, 0] for zero and [0, 1] for one.
+        """
+        decimal_x = np.asarray(decimal_x).reshape(-1).astype(np.uint64)
+        shifts = np.arange(
+            self.num_bits - 1, -1, -1, dtype=np.uint64)
+        bits = ((decimal_x[:, None] >> shifts) & np.uint64(1)).astype(
+            np.float32)
+
+        norm_x = np.empty((bits.shape[0], self.dim_x), dtype=np.float32)
+        norm_x[:, 0::2] = 1.0 - bits
+        norm_x[:, 1::2] = bits
+
+        return norm_x
+
     def denormalize(self, bin_x):
-        if len(bin_x.shape) == 3:
-            # This is a timeseries field
-            a, b, c = bin_x.shape
-            if self.num_bits * 2 != c:
-                raise ValueError(
-                    f"Dimension is {c}. Expected dimension is {self.num_bits * 2}"
-                )
-            return self.denormalize(
-                bin_x.reshape(a * b, c)).to_numpy().reshape(
-                a, b)
-        df_bin = pd.DataFrame(bin_x)
-        chosen_bits = (df_bin > df_bin.shift(axis=1)).drop(
-            range(0, self.num_bits * 2, 2), axis=1
-        )
-        return chosen_bits.dot(1 << np.arange(self.num_bits - 1, -1, -1))
+        # bin_x: (n, 2 * num_bits) for session keys,
+        # (n, t, 2 * num_bits) for timeseries fields
+        bin_x = np.asarray(bin_x)
+        if bin_x.shape[-1] != self.num_bits * 2:
+            raise ValueError(
+                f"Dimension is {bin_x.shape[-1]}. "
+                f"Expected dimension is {self.num_bits * 2}"
+            )
+        # Each bit is the argmax of its [zero, one] pair (ties go to zero)
+        chosen_bits = bin_x[..., 1::2] > bin_x[..., 0::2]
+
+        # Left-pad to whole bytes, pack MSB first and accumulate per byte
+        pad_width = [(0, 0)] * (chosen_bits.ndim - 1) + \
+            [((-self.num_bits) % 8, 0)]
+        packed = np.packbits(
+            np.pad(chosen_bits, pad_width), axis=-1).astype(np.uint64)
+
+        decimal_x = np.zeros(bin_x.shape[:-1], dtype=np.uint64)
+        for i in range(packed.shape[-1]):
+            decimal_x <<= np.uint64(8)
+            decimal_x |= packed[..., i]
+
+        if self.num_bits < 64:
+            decimal_x = decimal_x.astype(np.int64)
+        return decimal_x
 
     def getOutputType(self):
         outputs = []
@@ -178,7 +204,7 @@ class BitField(Field):
 class Word2VecField(Field):
     def __init__(
             self, word2vec_size, pre_processed_data_folder, word2vec_type, *
-            args, **kwargs):
+            args, decode_backend="auto", decode_num_threads=1, **kwargs):
         super(Word2VecField, self).__init__(*args, **kwargs)
 
         self.word2vec_size = word2vec_size
@@ -186,38 +212,23 @@ class Word2VecField(Field):
         self.word2vec_type = word2vec_type
         self.dim_x = word2vec_size
         self.norm_option = Normalization.MINUSONE_ONE
+        self.decode_backend = decode_backend
+        self.decode_num_threads = decode_num_threads
 
     def normalize(self, x, embed_model):
-        return np.array(
-            [get_vector(embed_model, str(xi), norm_option=True) for xi in x]
-        )
+        return get_word2vec_encoder(embed_model).encode(x)
 
     def denormalize(self, norm_x):
-        # load Annoy and Dict
-        type_ann = AnnoyIndex(self.word2vec_size, 'angular')
-        type_ann.load(os.path.join(
-            self.preprocessed_data_folder,
-            f"{self.word2vec_type}_ann.ann"))
-        with open(os.path.join(self.preprocessed_data_folder, f"{self.word2vec_type}_dict.json"), 'r') as f:
-            type_dict = json.load(f)
-
-        if len(norm_x.shape) == 3:
-            # This is a timeseries field
-            return np.array(
-                [
-                    get_original_objs(
-                        ann=type_ann,
-                        vectors=x,
-                        dic={int(k): v for k, v in type_dict.items()}
-                    )
-                    for x in norm_x
-                ]
-            )
-        return np.asarray(get_original_objs(
-            ann=type_ann,
-            vectors=norm_x,
-            dic={int(k): v for k, v in type_dict.items()}
-        ))
+        # Annoy index and dict are loaded once per process and type
+        decoder = get_word2vec_decoder(
+            pre_processed_data_folder=self.preprocessed_data_folder,
+            word2vec_type=self.word2vec_type,
+            word2vec_size=self.word2vec_size,
+            backend=getattr(self, "decode_backend", "auto"),
+            num_threads=getattr(self, "decode_num_threads", 1))
+
+        # (n, dim_x) for session keys, (n, t, dim_x) for timeseries fields
+        return decoder.decode(norm_x)
 
     def getOutputType(self):
         return Output(
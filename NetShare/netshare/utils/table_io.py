@@ -0,0 +1,91 @@
+import os
+
+import pandas as pd
+
+# format -> file extension
+TABLE_FORMATS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "pickle": ".pkl",
+}
+
+
+def table_extension(file_format):
+    if file_format not in TABLE_FORMATS:
+        raise ValueError(
+            f"Unknown table format {file_format}! "
+            f"Supported formats: {list(TABLE_FORMATS.keys())}")
+    return TABLE_FORMATS[file_format]
+
+
+def table_format(path):
+    ext = os.path.splitext(path)[1]
+    for file_format, format_ext in TABLE_FORMATS.items():
+        if ext == format_ext:
+            return file_format
+    raise ValueError(f"Unknown table file extension {ext}!")
+
+
+def is_table(path, file_format=None):
+    '''Whether `path` is a table file (of `file_format` if given).'''
+    ext = os.path.splitext(path)[1]
+    if file_format is not None:
+        return ext == table_extension(file_format)
+    return ext in TABLE_FORMATS.values()
+
+
+def write_table(df, path, file_format=None):
+    '''Write `df` to `path`, w/o the index.
+
+    `file_format` is inferred from the extension of `path` if not given.
+    Parquet and Feather need the optional `pyarrow` dependency.
+    '''
+    if file_format is None:
+        file_format = table_format(path)
+    table_extension(file_format)
+    if file_format == "csv":
+        df.to_csv(path, index=False)
+    elif file_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif file_format == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    elif file_format == "pickle":
+        df.reset_index(drop=True).to_pickle(path)
+
+
+def read_table(path, columns=None):
+    '''Read a table written by `write_table`, only `columns` if given.'''
+    file_format = table_format(path)
+    if file_format == "csv":
+        return pd.read_csv(path, usecols=columns)[columns] \
+            if columns is not None else pd.read_csv(path)
+    elif file_format == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    elif file_format == "feather":
+        return pd.read_feather(path, columns=columns)
+    elif file_format == "pickle":
+        df = pd.read_pickle(path)
+        return df[columns] if columns is not None else df
+
+
+def remove_stale_tables(path):
+    '''Remove the tables named as `path` in the other formats.
+
+    Call it after writing `path`, so that `find_table` can't pick up a table
+    of an earlier run with another `intermediate_format`.
+    '''
+    stem = os.path.splitext(path)[0]
+    for ext in TABLE_FORMATS.values():
+        if stem + ext != path and os.path.exists(stem + ext):
+            os.remove(stem + ext)
+
+
+def find_table(folder, name):
+    '''Path of table `name` (w/o extension) in `folder`, in any format.'''
+    for ext in TABLE_FORMATS.values():
+        path = os.path.join(folder, name + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(
+        f"No table {name} ({'/'.join(TABLE_FORMATS.values())}) in {folder}!")
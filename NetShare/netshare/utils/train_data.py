@@ -0,0 +1,21 @@
+import numpy as np
+
+# dtype -> (dtype of data_feature/data_attribute, dtype of data_gen_flag)
+TRAIN_DATA_DTYPES = {
+    "float64": (np.float64, np.float64),
+    "float32": (np.float32, np.uint8),
+}
+
+
+def train_data_dtypes(train_data_dtype):
+    '''dtypes of the training arrays written by the pre-processors.
+
+    "float32" (the default) matches what the model trains on (the gen flags
+    are 0/1 and stored as uint8); "float64" keeps the full precision of the
+    normalized values.
+    '''
+    if train_data_dtype not in TRAIN_DATA_DTYPES:
+        raise ValueError(
+            f"Unknown train_data_dtype {train_data_dtype}! "
+            f"Supported dtypes: {list(TRAIN_DATA_DTYPES.keys())}")
+    return TRAIN_DATA_DTYPES[train_data_dtype]
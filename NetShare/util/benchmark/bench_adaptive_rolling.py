@@ -0,0 +1,133 @@
+"""Benchmark for generating with adaptive rolling (DoppelGANger, PyTorch).
+
+Builds a `DoppelGANgerGenerator` whose sequences end with probability
+1 / `--mean_steps` at every step (the first LSTM unit follows the first
+feature noise, and the gen flag heads threshold it), so that the lengths of
+a batch are geometric: most sequences are short, the longest ones run for
+many steps. Generates with the step-by-step loop over the whole batch
+(`rolling_block_size=None`) and with the block-wise engine for several
+`rolling_block_size`, checks that the features are the same and reports the
+throughput in samples/s.
+
+    python3 util/benchmark/bench_adaptive_rolling.py --batch_size 1000 \\
+        --mean_steps 10
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import torch
+
+from netshare.utils import Normalization, Output, OutputType
+from netshare.models.doppelganger_torch.network import DoppelGANgerGenerator
+
+
+def make_generator(args, rolling_block_size):
+    feature_outputs = [
+        Output(type_=OutputType.CONTINUOUS, dim=1,
+               normalization=Normalization.ZERO_ONE),
+        Output(type_=OutputType.DISCRETE, dim=4),
+        Output(type_=OutputType.DISCRETE, dim=2, is_gen_flag=True)]
+    attribute_outputs = [Output(type_=OutputType.DISCRETE, dim=8)]
+    return DoppelGANgerGenerator(
+        attr_latent_dim=5,
+        feature_latent_dim=5,
+        feature_outputs=feature_outputs,
+        attribute_outputs=attribute_outputs,
+        real_attribute_mask=[True] * len(attribute_outputs),
+        sample_len=args.sample_len,
+        feature_num_units=args.num_units,
+        batch_size=args.batch_size,
+        use_adaptive_rolling=True,
+        rolling_block_size=rolling_block_size)
+
+
+@torch.no_grad()
+def set_geometric_lengths(generator, mean_steps, scale=100.0):
+    # LSTM unit 0: input gate open, forget gate closed, output gate open,
+    # cell input tanh(first feature noise), i.e. h = tanh(tanh(noise))
+    lstm = generator.lstm_module
+    units = generator.feature_num_units
+    noise_col = generator.real_attribute_out_dim + \
+        generator.addi_attribute_out_dim
+    for gate in range(4):
+        lstm.weight_ih_l0[gate * units].zero_()
+        lstm.weight_hh_l0[gate * units].zero_()
+        lstm.bias_hh_l0[gate * units] = 0.0
+    lstm.bias_ih_l0[0] = 10.0
+    lstm.bias_ih_l0[units] = -10.0
+    lstm.bias_ih_l0[2 * units] = 0.0
+    lstm.bias_ih_l0[3 * units] = 10.0
+    lstm.weight_ih_l0[2 * units, noise_col] = 1.0
+
+    # Continue (gen flag > 0.5) iff the noise is above its 1 / mean_steps
+    # quantile
+    threshold = np.tanh(np.tanh(
+        statistics.NormalDist().inv_cdf(1.0 / mean_steps)))
+    feature_len = len(generator.feature_outputs)
+    for i, layer in enumerate(generator.feature_gen_last_layer):
+        if i % feature_len == feature_len - 1:
+            layer[0].weight.zero_()
+            layer[0].weight[0, 0] = scale
+            layer[0].bias.copy_(torch.tensor([-scale * threshold, 0.0]))
+
+
+def make_inputs(args, generator):
+    torch.manual_seed(0)
+    steps = args.max_sequence_len // args.sample_len
+    shape = (generator.feature_num_layers, args.batch_size,
+             generator.feature_num_units)
+    return (
+        torch.randn(args.batch_size, 5),
+        None,
+        torch.randn(args.batch_size, steps, 5),
+        torch.randn(shape),
+        torch.randn(shape))
+
+
+def lengths(feature):
+    gen_flag = torch.cat(
+        (feature[:, :, -2] > 0.5,
+         torch.zeros(feature.size(0), 1, dtype=torch.bool)), dim=1)
+    return torch.argmin(gen_flag.int(), dim=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch_size", type=int, default=1000)
+    parser.add_argument("--sample_len", type=int, default=10)
+    parser.add_argument("--max_sequence_len", type=int, default=2000)
+    parser.add_argument("--num_units", type=int, default=100)
+    parser.add_argument("--mean_steps", type=float, default=10)
+    parser.add_argument("--num_batches", type=int, default=5)
+    args = parser.parse_args()
+    print("# of threads: {}".format(torch.get_num_threads()))
+
+    torch.manual_seed(0)
+    generator = make_generator(args, None)
+    set_geometric_lengths(generator, args.mean_steps)
+    generator.eval()
+    inputs = make_inputs(args, generator)
+
+    print("{:>20} {:>12}".format("rolling_block_size", "samples/s"))
+    reference = None
+    for rolling_block_size in [None, 1, 4, 16]:
+        generator.rolling_block_size = rolling_block_size
+        with torch.no_grad():
+            generator(*inputs)
+        start = time.time()
+        with torch.no_grad():
+            for _ in range(args.num_batches):
+                _, _, feature = generator(*inputs)
+        speed = args.num_batches * args.batch_size / (time.time() - start)
+        if reference is None:
+            reference = feature
+            sequence_lengths = lengths(feature).float()
+            print("lengths: mean {:.1f}, max {:.0f} of {}".format(
+                sequence_lengths.mean(), sequence_lengths.max(),
+                feature.size(1)))
+        elif not torch.allclose(reference, feature, atol=1e-5):
+            raise ValueError("The block-wise engine generates different "
+                             "features!")
+        print("{:>20} {:>12.0f}".format(str(rolling_block_size), speed))
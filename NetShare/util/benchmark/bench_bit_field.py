@@ -0,0 +1,83 @@
+"""Benchmark for BitField encoding/decoding.
+
+Compares the row-wise `BitField.normalize` used by the original
+`apply_per_field` against the batch `BitField.normalize_array`, and the
+original pandas shift/dot `denormalize` against the NumPy one, for both
+session key (2-D) and timeseries (3-D) inputs. Every variant is checked
+for parity before timings are reported.
+
+    python3 util/benchmark/bench_bit_field.py --num_rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from netshare.utils import BitField
+
+
+def encode_per_row(field, df, column):
+    return df.apply(lambda row: field.normalize(
+        row[column]), axis='columns', result_type='expand').to_numpy()
+
+
+def encode_batch(field, df, column):
+    return field.normalize_array(df[column].to_numpy())
+
+
+def decode_pandas(field, bin_x):
+    # Reference: BitField.denormalize before the NumPy rewrite
+    if len(bin_x.shape) == 3:
+        a, b, c = bin_x.shape
+        return decode_pandas(
+            field, bin_x.reshape(a * b, c)).to_numpy().reshape(a, b)
+    df_bin = pd.DataFrame(bin_x)
+    chosen_bits = (df_bin > df_bin.shift(axis=1)).drop(
+        range(0, field.num_bits * 2, 2), axis=1
+    )
+    return chosen_bits.dot(1 << np.arange(field.num_bits - 1, -1, -1))
+
+
+def timeit(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_rows", type=int, default=100000)
+    parser.add_argument("--num_bits", type=int, default=32)
+    parser.add_argument("--max_flow_len", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    df = pd.DataFrame({"srcip": rng.integers(
+        0, 2 ** args.num_bits, size=args.num_rows, dtype=np.uint64)})
+    field = BitField(name="srcip", num_bits=args.num_bits)
+
+    per_row, per_row_time = timeit(encode_per_row, field, df, "srcip")
+    batch, batch_time = timeit(encode_batch, field, df, "srcip")
+    if not np.array_equal(per_row.astype(np.float32), batch):
+        raise ValueError("normalize_array does not match normalize!")
+
+    print("# of rows: {}, # of bits: {}".format(args.num_rows, args.num_bits))
+    print("normalize (per row): {:.3f}s".format(per_row_time))
+    print("normalize_array (batch): {:.3f}s ({:.1f}x)".format(
+        batch_time, per_row_time / max(batch_time, 1e-9)))
+
+    # Generator outputs are soft, not one-hot
+    soft_2d = rng.random((args.num_rows, 2 * args.num_bits))
+    soft_3d = rng.random(
+        (args.num_rows // args.max_flow_len,
+         args.max_flow_len,
+         2 * args.num_bits))
+    for name, bin_x in [("2-D", soft_2d), ("3-D", soft_3d), ("one-hot", batch)]:
+        ref, ref_time = timeit(decode_pandas, field, bin_x)
+        new, new_time = timeit(field.denormalize, bin_x)
+        if not np.array_equal(np.asarray(ref), new):
+            raise ValueError(f"denormalize ({name}) does not match pandas!")
+        print("denormalize {} pandas: {:.3f}s, numpy: {:.3f}s ({:.1f}x)".format(
+            name, ref_time, new_time, ref_time / max(new_time, 1e-9)))
@@ -0,0 +1,117 @@
+"""CPU benchmark for the feature output heads of the DoppelGANger generator.
+
+Builds a `DoppelGANgerGenerator` with `--num_features` feature outputs
+(alternately continuous and discrete) in the per-head layout
+(`fused_feature_head=False`, one Linear+activation per output and step of
+`sample_len`), loads its state dict into a generator with the fused head
+(`fused_feature_head=True`), checks that both generate the same features and
+reports the throughput in samples/s of generation (w/ and w/o adaptive
+rolling) and of a forward+backward pass.
+
+    python3 util/benchmark/bench_feature_head.py --num_features 20 \\
+        --sample_len 10
+"""
+import argparse
+import time
+
+import torch
+
+from netshare.utils import Normalization, Output, OutputType
+from netshare.models.doppelganger_torch.network import DoppelGANgerGenerator
+
+
+def make_outputs(num_features):
+    feature_outputs = []
+    for i in range(num_features):
+        if i % 2 == 0:
+            feature_outputs.append(Output(
+                type_=OutputType.CONTINUOUS, dim=1,
+                normalization=Normalization.ZERO_ONE))
+        else:
+            feature_outputs.append(Output(
+                type_=OutputType.DISCRETE, dim=2 + i % 5))
+    feature_outputs.append(Output(
+        type_=OutputType.DISCRETE, dim=2, is_gen_flag=True))
+    attribute_outputs = [Output(type_=OutputType.DISCRETE, dim=8)]
+    return feature_outputs, attribute_outputs
+
+
+def make_generator(args, feature_outputs, attribute_outputs,
+                   use_adaptive_rolling, fused_feature_head):
+    return DoppelGANgerGenerator(
+        attr_latent_dim=5,
+        feature_latent_dim=5,
+        feature_outputs=feature_outputs,
+        attribute_outputs=attribute_outputs,
+        real_attribute_mask=[True] * len(attribute_outputs),
+        sample_len=args.sample_len,
+        feature_num_units=args.num_units,
+        batch_size=args.batch_size,
+        use_adaptive_rolling=use_adaptive_rolling,
+        fused_feature_head=fused_feature_head)
+
+
+def make_inputs(args, generator):
+    torch.manual_seed(0)
+    steps = args.max_sequence_len // args.sample_len
+    return (
+        torch.randn(args.batch_size, 5),
+        None,
+        torch.randn(args.batch_size, steps, 5),
+        torch.zeros(1, args.batch_size, generator.feature_num_units),
+        torch.zeros(1, args.batch_size, generator.feature_num_units))
+
+
+def throughput(generator, inputs, num_batches, backward):
+    start = time.time()
+    for _ in range(num_batches):
+        if backward:
+            generator.zero_grad()
+            _, _, feature = generator(*inputs)
+            feature.sum().backward()
+        else:
+            with torch.no_grad():
+                generator(*inputs)
+    return num_batches * inputs[0].size(0) / (time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_features", type=int, default=20)
+    parser.add_argument("--sample_len", type=int, default=10)
+    parser.add_argument("--max_sequence_len", type=int, default=500)
+    parser.add_argument("--num_units", type=int, default=100)
+    parser.add_argument("--batch_size", type=int, default=100)
+    parser.add_argument("--num_batches", type=int, default=20)
+    args = parser.parse_args()
+    print("# of threads: {}".format(torch.get_num_threads()))
+
+    feature_outputs, attribute_outputs = make_outputs(args.num_features)
+    print("{:>18} {:>12} {:>14}".format(
+        "pass", "per-head/s", "fused/s"))
+    for name, use_adaptive_rolling, backward in [
+            ("generate", False, False),
+            ("generate rolling", True, False),
+            ("forward+backward", False, True)]:
+        per_head = make_generator(
+            args, feature_outputs, attribute_outputs, use_adaptive_rolling,
+            fused_feature_head=False)
+        fused = make_generator(
+            args, feature_outputs, attribute_outputs, use_adaptive_rolling,
+            fused_feature_head=True)
+        fused.load_state_dict(per_head.state_dict())
+        per_head.eval()
+        fused.eval()
+        inputs = make_inputs(args, per_head)
+
+        with torch.no_grad():
+            _, _, per_head_feature = per_head(*inputs)
+            _, _, fused_feature = fused(*inputs)
+        if not torch.allclose(per_head_feature, fused_feature, atol=1e-5):
+            raise ValueError("The fused head generates different features!")
+
+        per_head_speed = throughput(
+            per_head, inputs, args.num_batches, backward)
+        fused_speed = throughput(fused, inputs, args.num_batches, backward)
+        print("{:>18} {:>12.0f} {:>14.0f}".format(
+            name, per_head_speed, fused_speed))
@@ -0,0 +1,197 @@
+"""Benchmark for loading the DoppelGANger (PyTorch) training data.
+
+Writes random training data in both layouts written by `split_per_chunk`
+(`data_train.npz` and the memory-mapped `data_train/*.npy`), and loads it
+the way the model used to (`load_data` below + `normalize_per_sample` +
+`add_gen_flag` + `torch.Tensor`) and with `load_train_data` +
+`torch.as_tensor`, each in a fresh process so that peak RSS is measured in
+isolation. The training tensors are checked to be identical for each
+`train_data_dtype` the data is written in.
+
+    python3 util/benchmark/bench_load_train_data.py --num_samples 20000 \\
+        --max_flow_len 1000
+"""
+import argparse
+import hashlib
+import math
+import multiprocessing
+import os
+import pickle
+import resource
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from netshare.utils import Normalization, Output, OutputType, \
+    train_data_dtypes
+from netshare.models.doppelganger_torch.load_data import load_train_data
+from netshare.models.doppelganger_torch.util import add_gen_flag, \
+    normalize_per_sample
+
+
+def load_data(path, sample_len, flag="train"):
+    # Reference: how the model loaded data_{flag}.npz before
+    # `load_train_data`
+    data_npz = np.load(os.path.join(path, "data_{}.npz".format(flag)))
+    with open(os.path.join(path, "data_feature_output.pkl"), "rb") as f:
+        data_feature_outputs = pickle.load(f)
+    with open(os.path.join(path, "data_attribute_output.pkl"), "rb") as f:
+        data_attribute_outputs = pickle.load(f)
+
+    data_feature = data_npz["data_feature"]
+    data_attribute = data_npz["data_attribute"]
+    data_gen_flag = data_npz["data_gen_flag"]
+
+    # Append data_feature and data_gen_flag to multiple of sample_len
+    timeseries_len = data_feature.shape[1]
+    ceil_timeseries_len = math.ceil(timeseries_len / sample_len) * sample_len
+    data_feature = np.pad(
+        data_feature,
+        pad_width=((0, 0),
+                   (0, ceil_timeseries_len - timeseries_len),
+                   (0, 0)),
+        mode='constant', constant_values=0)
+    data_gen_flag = np.pad(
+        data_gen_flag,
+        pad_width=((0, 0),
+                   (0, ceil_timeseries_len - timeseries_len)),
+        mode='constant', constant_values=0)
+
+    return (
+        data_feature,
+        data_attribute,
+        data_gen_flag,
+        data_feature_outputs,
+        data_attribute_outputs,
+    )
+
+
+def write_data(folder, num_samples, max_flow_len, train_data_dtype,
+               seed=0):
+    train_dtype, gen_flag_dtype = train_data_dtypes(train_data_dtype)
+    rng = np.random.default_rng(seed)
+    data_attribute_outputs = [Output(type_=OutputType.DISCRETE, dim=8)]
+    data_attribute = np.eye(8)[rng.integers(0, 8, num_samples)]
+    data_feature_outputs = [
+        Output(type_=OutputType.CONTINUOUS, dim=1,
+               normalization=Normalization.ZERO_ONE),
+        Output(type_=OutputType.CONTINUOUS, dim=1,
+               normalization=Normalization.MINUSONE_ONE),
+        Output(type_=OutputType.DISCRETE, dim=3)]
+    lengths = rng.integers(1, max_flow_len + 1, num_samples)
+    data_gen_flag = (np.arange(max_flow_len)[None, :] <
+                     lengths[:, None]).astype(float)
+    data_feature = np.concatenate([
+        rng.random((num_samples, max_flow_len, 2)),
+        np.eye(3)[rng.integers(0, 3, (num_samples, max_flow_len))]],
+        axis=2) * data_gen_flag[:, :, None]
+    data_attribute = data_attribute.astype(train_dtype)
+    data_feature = data_feature.astype(train_dtype)
+    data_gen_flag = data_gen_flag.astype(gen_flag_dtype)
+
+    np.savez(os.path.join(folder, "data_train.npz"),
+             data_attribute=data_attribute, data_feature=data_feature,
+             data_gen_flag=data_gen_flag)
+    os.makedirs(os.path.join(folder, "npy", "data_train"))
+    for name, array in [("data_attribute", data_attribute),
+                        ("data_feature", data_feature),
+                        ("data_gen_flag", data_gen_flag)]:
+        np.save(os.path.join(folder, "npy", "data_train", name + ".npy"),
+                array)
+    for path in [folder, os.path.join(folder, "npy")]:
+        with open(os.path.join(path, "data_feature_output.pkl"), "wb") as f:
+            pickle.dump(data_feature_outputs, f)
+        with open(os.path.join(path, "data_attribute_output.pkl"), "wb") as f:
+            pickle.dump(data_attribute_outputs, f)
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def anon_rss_mb():
+    # w/o the (reclaimable) pages of memory-mapped files
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def digest(tensors):
+    return hashlib.sha1(
+        b"".join(t.numpy().tobytes() for t in tensors)).hexdigest()
+
+
+def run(method, folder, sample_len, queue):
+    rss_before = max_rss_mb()
+    start = time.time()
+    if method == "load_data":
+        data_feature, data_attribute, data_gen_flag, data_feature_outputs, \
+            data_attribute_outputs = load_data(folder, sample_len)
+        data_feature, data_attribute, data_attribute_outputs, _ = \
+            normalize_per_sample(
+                data_feature, data_attribute, data_feature_outputs,
+                data_attribute_outputs)
+        data_feature, data_feature_outputs = add_gen_flag(
+            data_feature, data_gen_flag, data_feature_outputs, sample_len)
+        tensors = (torch.Tensor(data_attribute), torch.Tensor(data_feature))
+    else:
+        data_feature, data_attribute, _, _, _, _ = load_train_data(
+            folder, sample_len, self_norm=True)
+        tensors = (torch.as_tensor(data_attribute, dtype=torch.float32),
+                   torch.as_tensor(data_feature, dtype=torch.float32))
+    wall_time, rss_peak, rss_anon = time.time() - start, max_rss_mb(), \
+        anon_rss_mb()
+    queue.put((wall_time, rss_before, rss_peak, rss_anon, digest(tensors)))
+
+
+def folder_size_mb(folder):
+    return sum(os.path.getsize(os.path.join(folder, name))
+               for name in os.listdir(folder)) / 2**20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=20000)
+    parser.add_argument("--max_flow_len", type=int, default=1000)
+    parser.add_argument("--sample_len", type=int, default=10)
+    args = parser.parse_args()
+
+    print("{:>8} {:>16} {:>8} {:>10} {:>10} {:>14} {:>12} {:>14}".format(
+        "dtype", "method", "layout", "disk (MB)", "time (s)",
+        "peak RSS (MB)", "delta (MB)", "anon RSS (MB)"))
+    for train_data_dtype in ["float64", "float32"]:
+        with tempfile.TemporaryDirectory() as folder:
+            write_data(folder, args.num_samples, args.max_flow_len,
+                       train_data_dtype)
+            disk_sizes = {
+                "npz": os.path.getsize(
+                    os.path.join(folder, "data_train.npz")) / 2**20,
+                "npy": folder_size_mb(
+                    os.path.join(folder, "npy", "data_train"))}
+            digests = set()
+            for method, layout in [("load_data", "npz"),
+                                   ("load_train_data", "npz"),
+                                   ("load_train_data", "npy")]:
+                queue = multiprocessing.Queue()
+                p = multiprocessing.Process(
+                    target=run,
+                    args=(method,
+                          folder if layout == "npz"
+                          else os.path.join(folder, "npy"),
+                          args.sample_len, queue))
+                p.start()
+                wall_time, rss_before, rss_peak, rss_anon, tensors_digest = \
+                    queue.get()
+                p.join()
+                digests.add(tensors_digest)
+                print("{:>8} {:>16} {:>8} {:>10.1f} {:>10.2f} {:>14.1f} "
+                      "{:>12.1f} {:>14.1f}".format(
+                          train_data_dtype, method, layout,
+                          disk_sizes[layout], wall_time, rss_peak,
+                          rss_peak - rss_before, rss_anon))
+            if len(digests) != 1:
+                raise ValueError("The training tensors are not identical!")
@@ -0,0 +1,139 @@
+"""Benchmark for the pure-NumPy PCAP parser.
+
+Writes a synthetic Ethernet/IPv4 TCP+UDP trace and reports the time to
+parse it with `pcap2df` for different numbers of parts, next to the cost
+of the CSV round trip (`to_csv` + `read_csv`) that the `main.c` path adds
+on top of parsing. Every split is checked against the single-part parse.
+
+With `--walk_only`, only the record walk of every part
+(`find_record_offsets`, the sequential part of the parser) is timed, so
+that traces larger than memory can be measured, e.g. 50M packets:
+
+    python3 util/benchmark/bench_pcap_parser.py --num_pkts 1000000
+    python3 util/benchmark/bench_pcap_parser.py --num_pkts 50000000 \\
+        --max_payload_len 64 --n_parts 1 16 --walk_only
+"""
+import argparse
+import mmap
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import netshare.ray as ray
+from netshare.pre_post_processors.netshare.pcap_parser import \
+    PCAP_COLUMNS, find_record_offsets, parse_pcap_part, read_pcap_header, \
+    split_pcap
+
+
+def write_pcap(path, num_pkts, max_payload_len=1400, batch_size=1000000,
+               seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "wb") as f:
+        f.write(b"\xd4\xc3\xb2\xa1\x02\x00\x04\x00" + b"\x00" * 8 +
+                (65535).to_bytes(4, "little") + (1).to_bytes(4, "little"))
+        for batch_start in range(0, num_pkts, batch_size):
+            write_records(
+                f, rng, min(batch_size, num_pkts - batch_start),
+                max_payload_len,
+                (1600000000 + batch_start // batch_size * 1000) * 10**6)
+
+
+def write_records(f, rng, num_pkts, max_payload_len, start_ts):
+    is_tcp = rng.random(num_pkts) < 0.5
+    l4_len = np.where(is_tcp, 20, 8)
+    payload_len = rng.integers(0, max_payload_len, size=num_pkts)
+    incl_len = 14 + 20 + l4_len + payload_len
+    record_start = np.concatenate([[0], np.cumsum(16 + incl_len)[:-1]])
+
+    buf = np.zeros(np.sum(16 + incl_len), dtype=np.uint8)
+
+    def put(offsets, values, n_bytes, byteorder):
+        for i in range(n_bytes):
+            shift = 8 * (i if byteorder == "little" else n_bytes - 1 - i)
+            buf[offsets + i] = (values >> shift) & 0xFF
+
+    ts = start_ts + np.sort(rng.integers(0, 10**9, num_pkts))
+    put(record_start, ts // 10**6, 4, "little")
+    put(record_start + 4, ts % 10**6, 4, "little")
+    put(record_start + 8, incl_len, 4, "little")
+    put(record_start + 12, incl_len, 4, "little")
+
+    eth = record_start + 16
+    put(eth + 12, np.full(num_pkts, 0x0800), 2, "big")
+    ip = eth + 14
+    buf[ip] = 0x45
+    put(ip + 2, incl_len - 14, 2, "big")
+    put(ip + 4, rng.integers(0, 65536, num_pkts), 2, "big")
+    buf[ip + 8] = rng.integers(1, 256, num_pkts)
+    buf[ip + 9] = np.where(is_tcp, 6, 17)
+    put(ip + 12, rng.integers(0, 2**32, num_pkts), 4, "big")
+    put(ip + 16, rng.integers(0, 2**32, num_pkts), 4, "big")
+    put(ip + 20, rng.integers(0, 65536, num_pkts), 2, "big")
+    put(ip + 22, rng.integers(0, 65536, num_pkts), 2, "big")
+    buf.tofile(f)
+
+
+def walk(path, n_parts):
+    header = read_pcap_header(path)
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return sum(
+            len(find_record_offsets(mm, header, int(start), int(stop)))
+            for start, stop in split_pcap(path, n_parts, min_part_size=1))
+
+
+def parse(path, n_parts):
+    parts = [parse_pcap_part(path, int(start), int(stop))[0]
+             for start, stop in split_pcap(path, n_parts, min_part_size=1)]
+    return pd.concat(
+        [pd.DataFrame(part, columns=PCAP_COLUMNS) for part in parts],
+        ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_pkts", type=int, default=1000000)
+    parser.add_argument("--n_parts", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--max_payload_len", type=int, default=1400)
+    parser.add_argument("--walk_only", action="store_true")
+    args = parser.parse_args()
+    ray.config.enabled = False
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "trace.pcap")
+        write_pcap(path, args.num_pkts, args.max_payload_len)
+        print("# of packets: {}, file size: {:.1f} MB".format(
+            args.num_pkts, os.path.getsize(path) / 2**20))
+
+        if args.walk_only:
+            for n_parts in args.n_parts:
+                start = time.time()
+                if walk(path, n_parts) != args.num_pkts:
+                    raise ValueError("Not all records were found!")
+                elapsed = time.time() - start
+                print("record walk ({} parts, sequential): {:.2f}s, "
+                      "{:.0f}ns per record".format(
+                          n_parts, elapsed, elapsed / args.num_pkts * 1e9))
+        else:
+            reference = None
+            for n_parts in args.n_parts:
+                start = time.time()
+                df = parse(path, n_parts)
+                print("parse ({} parts, sequential): {:.2f}s".format(
+                    n_parts, time.time() - start))
+                if reference is None:
+                    reference = df
+                else:
+                    pd.testing.assert_frame_equal(reference, df)
+            if len(reference) != args.num_pkts:
+                raise ValueError("Not all packets were parsed!")
+
+            csv_file = os.path.join(tmp_dir, "trace.csv")
+            start = time.time()
+            reference.to_csv(csv_file, index=False)
+            pd.read_csv(csv_file)
+            print("CSV round trip (to_csv + read_csv): {:.2f}s".format(
+                time.time() - start))
@@ -0,0 +1,130 @@
+"""Benchmark for the copy-free mode of the timeseries `QualityReport`.
+
+Runs `QualityReport.generate` on a synthetic packet trace with the
+default per-metric/per-target deep copies (`copy_data=True`) and with
+shared read-only views (`copy_data=False`), each in a fresh process so
+that peak RSS is measured in isolation, and checks that both give the
+same scores.
+
+    python3 util/benchmark/bench_quality_report_copies.py --sizes 1e5 1e6
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from sdmetrics.reports.timeseries import QualityReport
+
+ATTRIBUTES = ["srcip", "dstip", "srcport", "dstport", "proto"]
+FEATURES = ["pkt_len", "tos", "ttl", "flag"]
+
+METADATA = {
+    "fields": {
+        **{col: {"type": "categorical"} for col in ATTRIBUTES},
+        "time": {"type": "datetime"},
+        "pkt_len": {"type": "numerical"},
+        "tos": {"type": "categorical"},
+        "ttl": {"type": "numerical"},
+        "flag": {"type": "categorical"},
+    },
+    "entity_columns": ATTRIBUTES,
+    "context_columns": [],
+    "sequence_index": "time",
+}
+
+
+def make_config():
+    configs = {"comparison_type": "quantitative"}
+    return {"metrics": {"fidelity": [
+        {"Single attribute distributional similarity": {
+            "class": "AttrDistSimilarity",
+            "target_list": [[col] for col in ATTRIBUTES],
+            "configs": configs}},
+        {"Single feature distributional similarity": {
+            "class": "FeatureDistSimilarity",
+            "target_list": [[col] for col in FEATURES + ["time"]],
+            "configs": configs}},
+        {"Session length distributional similarity": {
+            "class": "SessionLengthDistSimilarity",
+            "configs": configs}},
+        {"Interarrival distributional similarity": {
+            "class": "InterarrivalDistSimilarity",
+            "configs": configs}},
+    ]}}
+
+
+def make_trace(num_rows, avg_flow_len, seed):
+    rng = np.random.default_rng(seed)
+    num_flows = max(1, num_rows // avg_flow_len)
+    flow_id = rng.integers(0, num_flows, num_rows)
+    return pd.DataFrame({
+        "srcip": flow_id * 7919 % (2 ** 32),
+        "dstip": flow_id * 104729 % (2 ** 32),
+        "srcport": flow_id % 65536,
+        "dstport": flow_id * 31 % 1024,
+        "proto": np.array(["TCP", "UDP"], dtype=object)[flow_id % 2],
+        "time": pd.to_datetime(
+            np.sort(rng.integers(0, 3600 * 10**6, num_rows)), unit="us"),
+        "pkt_len": rng.integers(40, 1500, num_rows).astype(float),
+        "tos": rng.integers(0, 4, num_rows),
+        "ttl": rng.integers(1, 255, num_rows),
+        "flag": rng.integers(0, 3, num_rows),
+    })
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def scores(dict_metric_scores):
+    flat_scores = []
+    for value in dict_metric_scores.values():
+        if isinstance(value, list):
+            flat_scores.append(value[0][0])
+        else:
+            flat_scores += scores(value)
+    return flat_scores
+
+
+def run(copy_data, num_rows, avg_flow_len, queue):
+    real_data = make_trace(num_rows, avg_flow_len, seed=0)
+    synthetic_data = make_trace(num_rows, avg_flow_len, seed=1)
+    report = QualityReport(config_dict=make_config())
+    rss_before = max_rss_mb()
+
+    start = time.time()
+    report.generate(real_data, synthetic_data, METADATA, copy_data=copy_data)
+    queue.put((time.time() - start, rss_before, max_rss_mb(),
+               scores(report.dict_metric_scores)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+",
+                        default=[1e5, 1e6])
+    parser.add_argument("--avg_flow_len", type=int, default=20)
+    args = parser.parse_args()
+
+    print("{:>12} {:>10} {:>10} {:>14} {:>12}".format(
+        "# of rows", "copy_data", "time (s)", "peak RSS (MB)",
+        "delta (MB)"))
+    for size in args.sizes:
+        results = {}
+        for copy_data in [True, False]:
+            queue = multiprocessing.Queue()
+            p = multiprocessing.Process(
+                target=run,
+                args=(copy_data, int(size), args.avg_flow_len, queue))
+            p.start()
+            wall_time, rss_before, rss_peak, results[copy_data] = \
+                queue.get()
+            p.join()
+            print("{:>12} {:>10} {:>10.2f} {:>14.1f} {:>12.1f}".format(
+                int(size), str(copy_data), wall_time, rss_peak,
+                rss_peak - rss_before))
+        if not np.allclose(results[True], results[False]):
+            raise ValueError(
+                f"copy_data=False changes the scores at {int(size)} rows!")
@@ -0,0 +1,50 @@
+"""Benchmark for the parallel executors of the timeseries `QualityReport`.
+
+Runs `QualityReport.generate` on a synthetic packet trace (see
+`bench_quality_report_copies.py`) one metric/target after another and
+with the thread/process pool executors, and checks that all of them give
+the same scores in the same order.
+
+    python3 util/benchmark/bench_quality_report_executor.py --sizes 1e5 1e6
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from sdmetrics.reports.timeseries import QualityReport
+
+from bench_quality_report_copies import METADATA, make_config, make_trace, \
+    scores
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+",
+                        default=[1e5, 1e6])
+    parser.add_argument("--avg_flow_len", type=int, default=20)
+    parser.add_argument("--max_workers", type=int, default=None)
+    args = parser.parse_args()
+    print("# of CPUs: {}".format(os.cpu_count()))
+
+    print("{:>12} {:>10} {:>10}".format("# of rows", "executor", "time (s)"))
+    for size in args.sizes:
+        real_data = make_trace(int(size), args.avg_flow_len, seed=0)
+        synthetic_data = make_trace(int(size), args.avg_flow_len, seed=1)
+        report = QualityReport(config_dict=make_config())
+
+        reference = None
+        for executor in [None, "thread", "process"]:
+            start = time.time()
+            report.generate(real_data, synthetic_data, METADATA,
+                            copy_data=False, executor=executor,
+                            max_workers=args.max_workers)
+            print("{:>12} {:>10} {:>10.2f}".format(
+                int(size), str(executor), time.time() - start))
+            if reference is None:
+                reference = scores(report.dict_metric_scores)
+            elif not np.allclose(
+                    reference, scores(report.dict_metric_scores)):
+                raise ValueError(
+                    f"executor={executor} changes the scores at "
+                    f"{int(size)} rows!")
@@ -0,0 +1,150 @@
+"""Benchmark for the training data loaders of DoppelGANger (PyTorch).
+
+Trains a small DoppelGANger on random data with the torch `DataLoader`
+(2 worker processes, `data_loader="dataloader"`) and with the in-process
+`TensorBatchLoader` (`data_loader="tensor"`), and reports the training
+throughput in samples/s. The throughput of the loaders alone (iterating
+over the batches w/o any model step) is reported as well.
+
+    python3 util/benchmark/bench_train_loader.py --num_samples 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from netshare.utils import Normalization, Output, OutputType
+from netshare.models.doppelganger_torch.batch_loader import \
+    TensorBatchLoader
+from netshare.models.doppelganger_torch.doppelganger import DoppelGANger
+from netshare.models.doppelganger_torch.util import add_gen_flag
+
+
+def make_data(num_samples, max_sequence_len, seed=0):
+    rng = np.random.default_rng(seed)
+    data_attribute_outputs = [
+        Output(type_=OutputType.DISCRETE, dim=8),
+        Output(type_=OutputType.CONTINUOUS, dim=1,
+               normalization=Normalization.ZERO_ONE)]
+    data_attribute = np.concatenate([
+        np.eye(8)[rng.integers(0, 8, num_samples)],
+        rng.random((num_samples, 1))], axis=1)
+
+    data_feature_outputs = [
+        Output(type_=OutputType.CONTINUOUS, dim=4,
+               normalization=Normalization.ZERO_ONE)]
+    data_feature = rng.random((num_samples, max_sequence_len, 4))
+    lengths = rng.integers(1, max_sequence_len + 1, num_samples)
+    data_gen_flag = (np.arange(max_sequence_len)[None, :] <
+                     lengths[:, None]).astype(float)
+    data_feature = data_feature * data_gen_flag[:, :, None]
+    return data_attribute, data_attribute_outputs, data_feature, \
+        data_feature_outputs, data_gen_flag
+
+
+def make_model(work_dir, data_loader, args, data_attribute_outputs,
+               data_feature_outputs, max_sequence_len):
+    checkpoint_dir = os.path.join(work_dir, data_loader, "checkpoint")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    return DoppelGANger(
+        checkpoint_dir=checkpoint_dir,
+        sample_dir=None,
+        time_path=os.path.join(work_dir, data_loader, "time.txt"),
+        batch_size=args.batch_size,
+        real_attribute_mask=[True] * len(data_attribute_outputs),
+        max_sequence_len=max_sequence_len,
+        sample_len=args.sample_len,
+        data_feature_outputs=data_feature_outputs,
+        data_attribute_outputs=data_attribute_outputs,
+        vis_freq=10**9,
+        vis_num_sample=5,
+        d_rounds=1,
+        g_rounds=1,
+        d_gp_coe=10.0,
+        num_packing=1,
+        use_attr_discriminator=True,
+        attr_d_gp_coe=10.0,
+        g_attr_d_coe=1.0,
+        epoch_checkpoint_freq=10**9,
+        attribute_latent_dim=5,
+        feature_latent_dim=5,
+        g_lr=0.0001,
+        g_beta1=0.5,
+        d_lr=0.0001,
+        d_beta1=0.5,
+        attr_d_lr=0.0001,
+        attr_d_beta1=0.5,
+        adam_eps=1e-8,
+        adam_amsgrad=False,
+        generator_attribute_num_units=args.num_units,
+        generator_attribute_num_layers=2,
+        generator_feature_num_units=args.num_units,
+        generator_feature_num_layers=1,
+        use_adaptive_rolling=False,
+        discriminator_num_layers=2,
+        discriminator_num_units=args.num_units,
+        attr_discriminator_num_layers=2,
+        attr_discriminator_num_units=args.num_units,
+        data_loader=data_loader)
+
+
+def loader_throughput(loader, num_epochs):
+    num_samples = 0
+    start = time.time()
+    for _ in range(num_epochs):
+        for real_attribute, real_feature in loader:
+            num_samples += real_attribute.size(0)
+    return num_samples / (time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=20000)
+    parser.add_argument("--max_sequence_len", type=int, default=50)
+    parser.add_argument("--sample_len", type=int, default=10)
+    parser.add_argument("--batch_size", type=int, default=100)
+    parser.add_argument("--num_units", type=int, default=64)
+    parser.add_argument("--epochs", type=int, default=1)
+    args = parser.parse_args()
+    print("# of threads: {}".format(torch.get_num_threads()))
+
+    (data_attribute, data_attribute_outputs, data_feature,
+     data_feature_outputs, data_gen_flag) = make_data(
+        args.num_samples, args.max_sequence_len)
+    data_feature, data_feature_outputs = add_gen_flag(
+        data_feature, data_gen_flag, data_feature_outputs, args.sample_len)
+
+    tensors = (torch.Tensor(data_attribute), torch.Tensor(data_feature))
+    loaders = {
+        "dataloader": DataLoader(
+            TensorDataset(*tensors), batch_size=args.batch_size,
+            shuffle=True, num_workers=2, pin_memory=True, drop_last=True,
+            prefetch_factor=3, persistent_workers=True),
+        "tensor": TensorBatchLoader(
+            tensors, batch_size=args.batch_size, shuffle=True,
+            drop_last=True),
+    }
+    print("{:>12} {:>22} {:>22}".format(
+        "data_loader", "loader only (samples/s)", "training (samples/s)"))
+    with tempfile.TemporaryDirectory() as work_dir:
+        for data_loader, loader in loaders.items():
+            loader_speed = loader_throughput(loader, args.epochs)
+
+            torch.manual_seed(0)
+            dg = make_model(
+                work_dir, data_loader, args, data_attribute_outputs,
+                list(data_feature_outputs), data_feature.shape[1])
+            start = time.time()
+            dg.train(
+                epochs=args.epochs,
+                data_feature=data_feature,
+                data_attribute=data_attribute,
+                data_gen_flag=data_gen_flag)
+            train_speed = args.epochs * len(loader) * args.batch_size / \
+                (time.time() - start)
+            print("{:>12} {:>22.0f} {:>22.0f}".format(
+                data_loader, loader_speed, train_speed))
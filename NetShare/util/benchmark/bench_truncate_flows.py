@@ -0,0 +1,95 @@
+"""Benchmark for per-flow truncation in `split_per_chunk`.
+
+Compares the original `groupby(...).apply(group.head(max_flow_len))`
+truncation against the `cumcount() < max_flow_len` mask of
+`truncate_flows` on synthetic chunks. Each (variant, size) pair runs in a
+fresh process so that peak RSS is measured in isolation.
+
+    python3 util/benchmark/bench_truncate_flows.py --sizes 1e5 1e6 1e7 1e8
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from netshare.pre_post_processors.netshare.preprocess_helper import \
+    truncate_flows
+
+
+def make_chunk(num_rows, avg_flow_len, seed=0):
+    rng = np.random.default_rng(seed)
+    num_flows = max(1, num_rows // avg_flow_len)
+    # heavy-tailed flow sizes, as in packet traces
+    flow_id = np.minimum(
+        rng.zipf(1.3, size=num_rows), num_flows).astype(np.int64)
+    return pd.DataFrame({
+        "srcip": flow_id * 7919 % (2 ** 32),
+        "dstip": flow_id * 104729 % (2 ** 32),
+        "proto": flow_id % 3,
+        "time": np.sort(rng.random(num_rows)),
+        "pkt_len": rng.integers(40, 1500, size=num_rows).astype(float),
+    })
+
+
+def truncate_flows_apply(df, flow_key_cols, max_flow_len):
+    # Reference: truncate_group before the cumcount rewrite
+    def process_group(group):
+        if len(group) > max_flow_len:
+            return group.head(max_flow_len)
+        return group
+    return df.groupby(flow_key_cols).apply(
+        process_group).reset_index(drop=True)
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(variant, num_rows, avg_flow_len, max_flow_len, queue):
+    df = make_chunk(num_rows, avg_flow_len)
+    rss_before = max_rss_mb()
+    truncate = truncate_flows if variant == "cumcount" \
+        else truncate_flows_apply
+
+    start = time.time()
+    truncated = truncate(df, ["srcip", "dstip", "proto"], max_flow_len)
+    queue.put((
+        time.time() - start, rss_before, max_rss_mb(),
+        len(truncated), int(truncated["pkt_len"].sum())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+",
+                        default=[1e5, 1e6, 1e7])
+    parser.add_argument("--avg_flow_len", type=int, default=20)
+    parser.add_argument("--max_flow_len", type=int, default=100)
+    parser.add_argument("--variants", nargs="+",
+                        default=["apply", "cumcount"])
+    args = parser.parse_args()
+
+    print("{:>12} {:>10} {:>10} {:>14} {:>12}".format(
+        "# of rows", "variant", "time (s)", "peak RSS (MB)",
+        "delta (MB)"))
+    for size in args.sizes:
+        results = {}
+        for variant in args.variants:
+            queue = multiprocessing.Queue()
+            p = multiprocessing.Process(
+                target=run,
+                args=(variant, int(size), args.avg_flow_len,
+                      args.max_flow_len, queue))
+            p.start()
+            wall_time, rss_before, rss_peak, num_rows, checksum = \
+                queue.get()
+            p.join()
+            results[variant] = (num_rows, checksum)
+            print("{:>12} {:>10} {:>10.2f} {:>14.1f} {:>12.1f}".format(
+                int(size), variant, wall_time, rss_peak,
+                rss_peak - rss_before))
+        if len(set(results.values())) > 1:
+            raise ValueError(
+                f"Truncation variants disagree at {int(size)} rows!")
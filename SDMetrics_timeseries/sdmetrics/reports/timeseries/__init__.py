@@ -1,7 +1,8 @@
-from sdmetrics.reports.timeseries.quality_report import QualityReport
+from sdmetrics.reports.timeseries.quality_report import QualityReport, ReferenceProfile
 from sdmetrics.reports.timeseries.single_dataset_vis import SingleDatasetVisualize
 
 __all__ = [
     'QualityReport',
+    'ReferenceProfile',
     'SingleDatasetVisualize'
 ]
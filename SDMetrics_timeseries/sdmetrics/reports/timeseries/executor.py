@@ -0,0 +1,174 @@
+"""Parallel execution of the metrics of a timeseries quality report.
+
+Every (metric, target) of a ``QualityReport`` is an independent job:
+
+- ``"thread"``: the jobs run in a thread pool and share the data. This pays
+  off for metrics that spend their time in NumPy/pandas code that releases
+  the GIL.
+- ``"process"``: the jobs run in a process pool. The NumPy columns of the
+  data are put in shared memory once, and every worker maps them as
+  read-only views. The other columns (e.g., object columns) are pickled
+  once per worker by the pool initializer instead of once per job.
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+EXECUTORS = [None, "thread", "process"]
+
+
+def compute_metric(metric_class, real_data, synthetic_data, metadata,
+                   target, configs, copy_data=True):
+    """Score one metric/target as ``QualityReport.generate`` does.
+
+    Returns:
+        The metric output with the best/worst scores inserted.
+    """
+    metric_class_instance = metric_class()
+    kwargs = {} if target is None else {"target": target}
+    if copy_data:
+        real_data = real_data.copy(deep=True)
+        synthetic_data = synthetic_data.copy(deep=True)
+    return metric_class_instance._insert_best_worst_score_metrics_output(
+        metric_class_instance.compute(
+            real_data, synthetic_data, metadata, configs=configs, **kwargs))
+
+
+class SharedFrame:
+    """A ``pandas.DataFrame`` with its NumPy columns in shared memory.
+
+    The instance is picklable: ``to_frame`` rebuilds the DataFrame in any
+    process, with the shared columns as read-only views. The views are only
+    valid as long as the instance they were built from is alive.
+    """
+
+    def __init__(self, data):
+        self.index = data.index
+        # [(column, (shared memory name, dtype, shape) or pandas.Series)]
+        self.columns = []
+        self._shms = []
+        for col in data.columns:
+            if not isinstance(data[col].dtype, np.dtype) or \
+                    data[col].dtype.hasobject or len(data) == 0:
+                self.columns.append((col, data[col]))
+                continue
+            values = data[col].to_numpy()
+            shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+            self._shms.append(shm)
+            np.ndarray(values.shape, dtype=values.dtype,
+                       buffer=shm.buf)[:] = values
+            self.columns.append(
+                (col, (shm.name, values.dtype.str, values.shape)))
+
+    def __getstate__(self):
+        # the shared memory blocks are owned by the creating process
+        state = self.__dict__.copy()
+        state["_shms"] = []
+        return state
+
+    def to_frame(self):
+        columns = OrderedDict()
+        for col, value in self.columns:
+            if isinstance(value, pd.Series):
+                columns[col] = value
+                continue
+            name, dtype, shape = value
+            shm = shared_memory.SharedMemory(name=name)
+            self._shms.append(shm)
+            values = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            values.flags.writeable = False
+            columns[col] = values
+
+        return pd.DataFrame(columns, index=self.index, copy=False)
+
+    def unlink(self):
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
+
+
+# (real_data, synthetic_data, metadata, copy_data, shared frames) of a
+# process pool worker; the shared frames keep the shared memory mapped
+_worker_state = None
+
+
+def _init_worker(real_data, synthetic_data, metadata, copy_data):
+    global _worker_state
+    _worker_state = (real_data.to_frame(), synthetic_data.to_frame(),
+                     metadata, copy_data, (real_data, synthetic_data))
+
+
+def _compute_metric_in_worker(metric_class, target, configs):
+    real_data, synthetic_data, metadata, copy_data, _ = _worker_state
+    return compute_metric(metric_class, real_data, synthetic_data, metadata,
+                          target, configs, copy_data)
+
+
+def _job_class(metric_class):
+    # Metrics set their best/worst values (`min_value`/`max_value`) on the
+    # class, depending on the target. A throwaway subclass per job keeps
+    # concurrent jobs of the same metric from overwriting each other's.
+    return type(metric_class.__name__, (metric_class,), {})
+
+
+def run_metrics(jobs, real_data, synthetic_data, metadata, copy_data=True,
+                executor=None, max_workers=None):
+    """Score the (metric_class, target, configs) `jobs`.
+
+    Args:
+        jobs (list[tuple]):
+            (metric_class, target, configs) of every metric/target.
+        real_data (pandas.DataFrame):
+            The real data.
+        synthetic_data (pandas.DataFrame):
+            The synthetic data.
+        metadata (dict):
+            TimeSeries metadata dict.
+        copy_data (bool):
+            Whether every job gets deep copies of the data.
+        executor (str):
+            None (sequential), ``"thread"`` or ``"process"``.
+        max_workers (int):
+            Size of the pool. Defaults to the pool's own default.
+
+    Returns:
+        list:
+            The output of every job, in the order of `jobs`.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor {executor}! Supported executors: {EXECUTORS}")
+
+    if executor is None:
+        return [compute_metric(metric_class, real_data, synthetic_data,
+                               metadata, target, configs, copy_data)
+                for metric_class, target, configs in jobs]
+
+    if executor == "thread":
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(compute_metric, _job_class(metric_class),
+                            real_data, synthetic_data, metadata, target,
+                            configs, copy_data)
+                for metric_class, target, configs in jobs]
+            return [future.result() for future in futures]
+
+    shared_real_data = SharedFrame(real_data)
+    try:
+        shared_synthetic_data = SharedFrame(synthetic_data)
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=max_workers, initializer=_init_worker,
+                    initargs=(shared_real_data, shared_synthetic_data,
+                              metadata, copy_data)) as pool:
+                futures = [pool.submit(_compute_metric_in_worker, *job)
+                           for job in jobs]
+                return [future.result() for future in futures]
+        finally:
+            shared_synthetic_data.unlink()
+    finally:
+        shared_real_data.unlink()
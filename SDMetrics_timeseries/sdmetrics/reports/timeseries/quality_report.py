@@ -12,6 +12,8 @@ import pprint
 import copy
 import json
 
+import numpy as np
+import pandas as pd
 
 from dash import dcc, html
 from dash.dependencies import Input, Output
@@ -19,6 +21,61 @@ from tqdm import tqdm
 from config_io import Config
 from collections import OrderedDict
 
+from sdmetrics.reports.timeseries.executor import run_metrics
+
+
+def _datetime_cols(metadata):
+    if metadata is None:
+        return []
+    return [col for col, field in metadata['fields'].items()
+            if field['type'] == 'datetime']
+
+
+def _datetime_as_numerical(metadata):
+    # metadata w/ the datetime fields typed as numerical
+    if len(_datetime_cols(metadata)) == 0:
+        return metadata
+    metadata = copy.deepcopy(metadata)
+    for col in _datetime_cols(metadata):
+        metadata['fields'][col]['type'] = 'numerical'
+    return metadata
+
+
+def _read_only_view(data, metadata):
+    """`data` w/ its columns as read-only views (no copy), except for the
+    datetime columns of `metadata` that are converted to unix timestamps
+    (unit: second)."""
+    datetime_cols = _datetime_cols(metadata)
+    columns = OrderedDict()
+    for col in data.columns:
+        if col in datetime_cols:
+            values = (pd.to_datetime(data[col]).astype(int) / 10**9
+                      ).to_numpy()
+        elif isinstance(data[col].dtype, np.dtype):
+            values = data[col].to_numpy().view()
+        else:
+            # extension arrays (e.g., pandas categorical) are shared as is
+            columns[col] = data[col]
+            continue
+        values.flags.writeable = False
+        columns[col] = values
+
+    return pd.DataFrame(columns, index=data.index, copy=False)
+
+
+class ReferenceProfile:
+    """Real-data statistics of every metric/target of a ``QualityReport``.
+
+    Built by ``QualityReport.build_profile``.
+    """
+
+    def __init__(self, metadata):
+        self.metadata = metadata
+        # (metric_type, metric_name, str(target)) -> metric profile, or None
+        # for metrics that are computed on `real_data`
+        self.metric_profiles = OrderedDict()
+        self.real_data = None
+
 
 class QualityReport:
     def __init__(self, config_file=None, config_dict=None):
@@ -156,50 +213,151 @@ class QualityReport:
         with open(save_path, 'w') as json_file:
             json.dump(metrics_copy, json_file)
 
-    def generate(self, real_data, synthetic_data, metadata, out=sys.stdout):
-        self.dict_metric_scores = OrderedDict()
-
+    def _iter_metrics(self):
+        # (metric_type, metric_name, metric_class, target, configs) for
+        # every metric/target of the config; target is None for metrics
+        # that do not have `target` (e.g., session length)
         for metric_type, metrics in self._config["metrics"].items():
             # fidelity/privacy
             metric_module = importlib.import_module(
                 f"sdmetrics.timeseries.{metric_type}"
             )
-            self.dict_metric_scores[metric_type] = OrderedDict()
             for metric_dict in metrics:
                 metric_name = list(metric_dict.keys())[0]
                 metric_config = list(metric_dict.values())[0]
                 metric_class = getattr(metric_module, metric_config["class"])
-                metric_class_instance = metric_class()
-
-                # Metrics that do not have `target` (e.g., session length)
+                configs = getattr(metric_config, "configs", None)
                 if "target_list" not in metric_config:
-                    _real_data = real_data.copy(deep=True)
-                    _synthetic_data = synthetic_data.copy(deep=True)
-                    self.dict_metric_scores[metric_type][
-                        metric_name
-                    ] = metric_class_instance._insert_best_worst_score_metrics_output(
-                        metric_class_instance.compute(
-                            _real_data, _synthetic_data, metadata,
-                            configs=getattr(metric_config, "configs", None)
-                        )
-                    )
-
-                # Metrics that have `target` (e.g., single attribute distributional similarity)
+                    yield metric_type, metric_name, metric_class, None, configs
                 else:
-                    if metric_name not in self.dict_metric_scores[metric_type]:
-                        self.dict_metric_scores[metric_type][metric_name] = OrderedDict(
-                        )
                     for target in metric_config["target_list"]:
-                        _real_data = real_data.copy(deep=True)
-                        _synthetic_data = synthetic_data.copy(deep=True)
-                        self.dict_metric_scores[metric_type][metric_name][
-                            str(target)
-                        ] = metric_class_instance._insert_best_worst_score_metrics_output(
-                            metric_class_instance.compute(
-                                _real_data, _synthetic_data, metadata, target=target,
-                                configs=getattr(metric_config, "configs", None)
-                            )
-                        )
+                        yield (metric_type, metric_name, metric_class,
+                               target, configs)
+
+    def _reset_scores(self):
+        self.dict_metric_scores = OrderedDict(
+            (metric_type, OrderedDict())
+            for metric_type in self._config["metrics"].keys())
+
+    def _set_score(self, metric_type, metric_name, target, score):
+        if target is None:
+            self.dict_metric_scores[metric_type][metric_name] = score
+        else:
+            if metric_name not in self.dict_metric_scores[metric_type]:
+                self.dict_metric_scores[metric_type][metric_name] = \
+                    OrderedDict()
+            self.dict_metric_scores[metric_type][metric_name][
+                str(target)] = score
+
+    def generate(self, real_data, synthetic_data, metadata, out=sys.stdout,
+                 copy_data=True, executor=None, max_workers=None):
+        """Compute every metric/target of the config.
+
+        Args:
+            real_data (pandas.DataFrame):
+                The real data.
+            synthetic_data (pandas.DataFrame):
+                The synthetic data.
+            metadata (dict):
+                TimeSeries metadata dict.
+            copy_data (bool):
+                If True, every metric/target gets deep copies of the data.
+                If False, all metrics share read-only views of the data,
+                with the datetime columns converted to unix timestamps
+                (unit: second) once up front (and scored as numerical).
+            executor (str):
+                How the metrics/targets are scheduled: None (one after
+                another), ``"thread"`` (thread pool) or ``"process"``
+                (process pool, with the data in shared memory). See
+                ``sdmetrics.reports.timeseries.executor``. The order of
+                ``dict_metric_scores`` does not depend on the executor.
+            max_workers (int):
+                Size of the thread/process pool.
+        """
+        self._reset_scores()
+
+        if not copy_data:
+            real_data = _read_only_view(real_data, metadata)
+            synthetic_data = _read_only_view(synthetic_data, metadata)
+            metadata = _datetime_as_numerical(metadata)
+
+        metrics = list(self._iter_metrics())
+        scores = run_metrics(
+            [(metric_class, target, configs)
+             for _, _, metric_class, target, configs in metrics],
+            real_data, synthetic_data, metadata, copy_data=copy_data,
+            executor=executor, max_workers=max_workers)
+        for (metric_type, metric_name, _, target, _), score in \
+                zip(metrics, scores):
+            self._set_score(metric_type, metric_name, target, score)
+
+    def build_profile(self, real_data, metadata):
+        """Precompute the real-data side of every metric/target.
+
+        Args:
+            real_data (pandas.DataFrame):
+                The real data.
+            metadata (dict):
+                TimeSeries metadata dict.
+
+        Returns:
+            ReferenceProfile:
+                To be passed to ``score_against``, to compare several
+                synthetic datasets with the same real data.
+        """
+        profile = ReferenceProfile(metadata)
+        for metric_type, metric_name, metric_class, target, configs in \
+                self._iter_metrics():
+            kwargs = {} if target is None else {"target": target}
+            try:
+                metric_profile = metric_class.profile(
+                    real_data, metadata, configs=configs, **kwargs)
+            except NotImplementedError:
+                # scored with `compute` on the real data
+                metric_profile = None
+                profile.real_data = real_data
+            profile.metric_profiles[
+                (metric_type, metric_name, str(target))] = metric_profile
+
+        return profile
+
+    def score_against(self, profile, synthetic_data):
+        """Same as ``generate``, with the real data of ``profile``.
+
+        Only the synthetic side of the metrics is computed.
+
+        Args:
+            profile (ReferenceProfile):
+                Built by ``build_profile`` with the same report config.
+            synthetic_data (pandas.DataFrame):
+                The synthetic data.
+        """
+        self._reset_scores()
+
+        for metric_type, metric_name, metric_class, target, configs in \
+                self._iter_metrics():
+            metric_class_instance = metric_class()
+            kwargs = {} if target is None else {"target": target}
+            key = (metric_type, metric_name, str(target))
+            if key not in profile.metric_profiles:
+                raise ValueError(
+                    f"Metric {key} is not in the profile! The profile has to "
+                    "be built with the same report config.")
+
+            metric_profile = profile.metric_profiles[key]
+            if metric_profile is None:
+                score = metric_class_instance.compute(
+                    profile.real_data.copy(deep=True),
+                    synthetic_data.copy(deep=True), profile.metadata,
+                    configs=configs, **kwargs)
+            else:
+                score = metric_class_instance.score_against(
+                    metric_profile, synthetic_data, profile.metadata,
+                    configs=configs, **kwargs)
+            self._set_score(
+                metric_type, metric_name, target,
+                metric_class_instance._insert_best_worst_score_metrics_output(
+                    score))
 
     def save(self, filepath):
         """Save this report instance to the given path using pickle.
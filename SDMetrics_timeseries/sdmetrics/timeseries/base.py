@@ -1,5 +1,6 @@
 """Base Time Series metric class."""
 
+import weakref
 from operator import attrgetter
 
 from sdmetrics.base import BaseMetric
@@ -9,6 +10,97 @@ from sdmetrics.goal import Goal
 import numpy as np
 
 
+class SequenceTensor:
+    """The rows of a table grouped into one sequence per entity.
+
+    The sequences are in the order of ``data.groupby(attribute_cols)``, and
+    the rows of each sequence are (stably) sorted by the sequence index.
+    The layout is ragged (CSR): sequence ``i`` is made of the rows
+    ``order[offsets[i]:offsets[i + 1]]`` of the table.
+
+    Attributes:
+        order (numpy.ndarray):
+            Positions of the rows of the table, sequence after sequence.
+            Rows with a missing attribute are left out, as by ``groupby``.
+        offsets (numpy.ndarray):
+            Start of every sequence in ``order``, and the total length.
+        lengths (numpy.ndarray):
+            Length of every sequence.
+        attributes (pandas.DataFrame):
+            Attribute values of every sequence.
+    """
+
+    def __init__(self, data, attribute_cols, sequence_index=None):
+        codes = data.groupby(attribute_cols).ngroup().to_numpy()
+        positions = np.flatnonzero(~np.isnan(codes)) \
+            if codes.dtype.kind == 'f' else np.arange(len(codes))
+        codes = codes[positions].astype(np.int64)
+        if sequence_index is None:
+            sorted_positions = np.argsort(codes, kind='stable')
+        else:
+            sorted_positions = np.lexsort(
+                (data[sequence_index].to_numpy()[positions], codes))
+        self.order = positions[sorted_positions]
+
+        _, self.lengths = np.unique(
+            codes[sorted_positions], return_counts=True)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)])
+        self.attributes = data[attribute_cols].iloc[
+            self.order[self.offsets[:-1]]].reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def values(self, column):
+        """Values of `column` (aligned w/ the table), sequence after
+        sequence."""
+        return np.asarray(column)[self.order]
+
+    def diff(self, column):
+        """Differences between consecutive values of `column` within every
+        sequence, sequence after sequence."""
+        values = self.values(column)
+        within = np.ones(max(len(values) - 1, 0), dtype=bool)
+        within[self.offsets[1:-1] - 1] = False
+        return np.diff(values)[within]
+
+    def padded(self, column, max_length=None):
+        """Values of `column` as a (# of sequences, max_length, ...) array,
+        w/ every sequence zero-padded to `max_length` (default: the longest
+        sequence)."""
+        values = self.values(column)
+        if max_length is None:
+            max_length = max(self.lengths, default=0)
+        tensor = np.zeros(
+            (len(self), max_length) + values.shape[1:], dtype=values.dtype)
+        tensor[np.repeat(np.arange(len(self)), self.lengths),
+               np.arange(len(values)) - np.repeat(
+                   self.offsets[:-1], self.lengths)] = values
+        return tensor
+
+
+# (id(data), attribute columns, sequence index) -> (weakref to data,
+# SequenceTensor); entries are dropped with the data
+_SEQUENCE_TENSORS = {}
+
+
+def sequence_tensor(data, attribute_cols, sequence_index=None):
+    """``SequenceTensor`` of `data`, cached as long as `data` is alive.
+
+    The cache assumes that `data` is not modified in between, which holds
+    for the (read-only) data shared by the metrics of a quality report.
+    """
+    key = (id(data), tuple(attribute_cols), sequence_index)
+    cached = _SEQUENCE_TENSORS.get(key)
+    if cached is not None and cached[0]() is data:
+        return cached[1]
+
+    tensor = SequenceTensor(data, attribute_cols, sequence_index)
+    _SEQUENCE_TENSORS[key] = (weakref.ref(data), tensor)
+    weakref.finalize(data, _SEQUENCE_TENSORS.pop, key, None)
+    return tensor
+
+
 class TimeSeriesMetric(BaseMetric):
     """Base class for metrics that apply to time series.
 
@@ -27,6 +119,8 @@ class TimeSeriesMetric(BaseMetric):
     goal = None
     min_value = None
     max_value = None
+    # 'attribute' or 'feature': the columns `target` has to list
+    _target_kind = None
 
     _DTYPES_TO_TYPES = {
         'i': {
@@ -77,30 +171,51 @@ class TimeSeriesMetric(BaseMetric):
 
         return attribute_cols, feature_cols
 
+    @classmethod
+    def _validate_target(cls, metadata, target):
+        description = {'attribute': 'an attribute', 'feature': 'a feature'}
+        if not all(isinstance(s, str) for s in target):
+            raise ValueError(
+                'target has to be a list of strings where each string '
+                f"specifies {description.get(cls._target_kind, 'a')} column.")
+        if cls._target_kind is None:
+            return
+
+        attribute_cols, feature_cols = \
+            cls._get_attribute_feature_cols(metadata)
+        columns = attribute_cols if cls._target_kind == 'attribute' \
+            else feature_cols
+        for col in target:
+            if col not in columns:
+                raise ValueError(
+                    f'Column {col} is not {description[cls._target_kind]}.')
+
+    @classmethod
+    def _sequence_tensor(cls, data, metadata):
+        """Cached ``SequenceTensor`` of `data`, w/ one sequence per
+        attribute values, ordered by the sequence index (if in `data`)."""
+        attribute_cols = metadata['entity_columns'] + \
+            metadata['context_columns']
+        sequence_index = metadata.get('sequence_index')
+        if sequence_index not in data.columns:
+            sequence_index = None
+        return sequence_tensor(data, attribute_cols, sequence_index)
+
     @classmethod
     def _load_attribute_feature(cls, data, metadata=None, entity_columns=None):
         '''Construct `data_attribute` and `data_feature`'''
         attribute_cols = metadata['entity_columns'] + metadata['context_columns']
         feature_cols = list(set(data.columns) - set(attribute_cols))
+        tensor = cls._sequence_tensor(data, metadata)
 
-        gk = data.groupby(attribute_cols)
         # data_attribute
-        data_attribute = np.array(list(gk.groups.keys()))
+        attributes = tensor.attributes.to_numpy()
+        data_attribute = np.array(
+            attributes[:, 0].tolist() if len(attribute_cols) == 1
+            else attributes.tolist())
 
         # data_feature
-        max_sample_len = max(gk.size().values)
-        data_feature = []
-        for group_name, df_group in gk:
-            df_numpy = np.pad(
-                np.expand_dims(
-                    df_group[feature_cols].to_numpy(), axis=0),
-                pad_width=(
-                    (0, 0), (0, max_sample_len-len(df_group)), (0, 0)),
-                mode="constant",
-                constant_values=0
-            )
-            data_feature.append(df_numpy)
-        data_feature = np.concatenate(data_feature, axis=0)
+        data_feature = tensor.padded(data[feature_cols].to_numpy())
 
         # data_gen_flag: indicating timeseries with unequal length
         data_gen_flag = (np.count_nonzero(
@@ -159,3 +274,44 @@ class TimeSeriesMetric(BaseMetric):
                 Metric output: [(cur_score, best_score, worst_score), fig]
         """
         raise NotImplementedError()
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                **kwargs):
+        """Precompute the real-data side of this metric.
+
+        Args:
+            real_data (pandas.DataFrame):
+                The values from the real dataset, passed as a pandas.DataFrame.
+            metadata (dict):
+                TimeSeries metadata dict.
+            entity_columns (list[str]):
+                Names of the columns which identify different time series
+                sequences.
+            **kwargs:
+                `target` and `configs`, as passed to `compute`.
+
+        Returns:
+            dict:
+                Real-data statistics to be passed to `score_against`, so
+                that several synthetic datasets can be compared with the same
+                real dataset without recomputing them.
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, **kwargs):
+        """Compute this metric against a real-data `profile`.
+
+        Equivalent to `compute` on the real data the `profile` was built
+        from, but only computes the synthetic side.
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def _profile_schema(cls, real_data, metadata=None, entity_columns=None):
+        # Empty frame with the columns/dtypes of real_data, so that the
+        # synthetic data can be validated against the profile
+        cls._validate_inputs(real_data, real_data, metadata, entity_columns)
+        return real_data.iloc[:0]
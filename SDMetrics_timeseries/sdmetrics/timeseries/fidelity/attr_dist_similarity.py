@@ -5,7 +5,7 @@ from typing import List
 
 from sdmetrics.goal import Goal
 from sdmetrics.timeseries.base import TimeSeriesMetric
-from sdmetrics.timeseries.utils import distribution_similarity
+from sdmetrics.timeseries.utils import distribution_similarity, distribution_stats
 
 
 class AttrDistSimilarity(TimeSeriesMetric):
@@ -13,20 +13,41 @@ class AttrDistSimilarity(TimeSeriesMetric):
 
     name = "Attribute distributional similarity"
     goal = Goal.MINIMIZE
+    _target_kind = 'attribute'
 
     @classmethod
     def compute(cls, real_data, synthetic_data, metadata=None,
                 entity_columns=None, target=None, configs=None):
-        if not all(isinstance(s, str) for s in target):
-            raise ValueError(
-                "target has to be a list of strings where each string specifies an attribute column.")
-
         _, entity_columns = cls._validate_inputs(
             real_data, synthetic_data, metadata, entity_columns)
-        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
-        for col in target:
-            if col not in attribute_cols:
-                raise ValueError(f"Column {col} is not an attribute.")
+
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns,
+                        target=target, configs=configs),
+            synthetic_data, metadata, entity_columns,
+            target=target, configs=configs)
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                target=None, configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+
+        real_columns = real_data[target].to_numpy().reshape(-1, len(target))
+        return {
+            'schema': schema,
+            'real_columns': real_columns,
+            'real_stats': distribution_stats(
+                real_columns,
+                [metadata['fields'][col]['type'] for col in target])
+        }
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
 
         if metadata['fields'][target[0]]['type'] in ['numerical', 'datetime']:
             cls.min_value = 0.0
@@ -35,14 +56,14 @@ class AttrDistSimilarity(TimeSeriesMetric):
             cls.min_value = 0.0
             cls.max_value = 1.0
 
-        real_columns = real_data[target].to_numpy().reshape(-1, len(target))
         synthetic_columns = synthetic_data[target].to_numpy(
         ).reshape(-1, len(target))
 
         return distribution_similarity(
-            real_data=real_columns,
+            real_data=profile['real_columns'],
             synthetic_data=synthetic_columns,
             column_names=target,
             data_type=[metadata['fields'][col]['type'] for col in target],
             comparison_type=getattr(configs, 'comparison_type', 'both'),
-            categorical_mapping=getattr(configs, 'categorical_mapping', True))
+            categorical_mapping=getattr(configs, 'categorical_mapping', True),
+            real_stats=profile['real_stats'])
@@ -13,16 +13,11 @@ class CrossFeatureCorrelation(TimeSeriesMetric):
     goal = Goal.MAXIMIZE
     min_value = 0.0
     max_value = 1.0
+    _target_kind = 'feature'
 
     @classmethod
-    def compute(cls, real_data, synthetic_data, metadata=None,
-                entity_columns=None, target=None, configs=None):
-        _, entity_columns = cls._validate_inputs(
-            real_data, synthetic_data, metadata, entity_columns)
-
-        if not all(isinstance(s, str) for s in target):
-            raise ValueError(
-                "target has to be a list of strings where each string specifies an attribute column.")
+    def _validate_target(cls, metadata, target):
+        super()._validate_target(metadata, target)
         assert len(target) == 2, \
             "`target` is expected to be a list including two elements representing two columns."
 
@@ -32,15 +27,43 @@ class CrossFeatureCorrelation(TimeSeriesMetric):
             f"column {column_1} should be numerical"
         assert metadata['fields'][column_2]['type'] in ['numerical'], \
             f"column {column_2} should be numerical"
-        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
-        for col in target:
-            if col not in feature_cols:
-                raise ValueError(f"Column {col} is not a feature.")
-
-        real_corr = pearson_corr(real_data[column_1].to_numpy(
-        ), real_data[column_2].to_numpy())
-        synthetic_corr = pearson_corr(
-            synthetic_data[column_1].to_numpy(),
-            synthetic_data[column_2].to_numpy())
+
+    @classmethod
+    def _corr(cls, data, target):
+        return pearson_corr(
+            data[target[0]].to_numpy(), data[target[1]].to_numpy())
+
+    @classmethod
+    def compute(cls, real_data, synthetic_data, metadata=None,
+                entity_columns=None, target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            real_data, synthetic_data, metadata, entity_columns)
+
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns,
+                        target=target, configs=configs),
+            synthetic_data, metadata, entity_columns,
+            target=target, configs=configs)
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                target=None, configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+
+        return {
+            'schema': schema,
+            'real_corr': cls._corr(real_data, target)
+        }
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+
+        real_corr = profile['real_corr']
+        synthetic_corr = cls._corr(synthetic_data, target)
 
         return [1 - (abs(real_corr - synthetic_corr)) / 2]
@@ -3,7 +3,7 @@ import pandas as pd
 
 from sdmetrics.goal import Goal
 from sdmetrics.timeseries.base import TimeSeriesMetric
-from sdmetrics.timeseries.utils import distribution_similarity
+from sdmetrics.timeseries.utils import distribution_similarity, distribution_stats
 
 
 class FeatureDistSimilarity(TimeSeriesMetric):
@@ -13,27 +13,58 @@ class FeatureDistSimilarity(TimeSeriesMetric):
 
     name = "Feature distributional similarity"
     goal = Goal.MINIMIZE
+    _target_kind = 'feature'
+
+    @classmethod
+    def _data_type(cls, metadata, target):
+        return ['numerical'
+                if metadata['fields'][col]['type'] == 'datetime' else
+                metadata['fields'][col]['type'] for col in target]
+
+    @classmethod
+    def _target_columns(cls, data, metadata, target):
+        columns = data[target]
+        # Convert datetime to unix timestamp (unit: second)
+        datetime_cols = [col for col in target
+                         if metadata['fields'][col]['type'] == 'datetime']
+        if len(datetime_cols) > 0:
+            columns = columns.assign(**{
+                col: pd.to_datetime(columns[col]).astype(int) / 10**9
+                for col in datetime_cols})
+        return columns.to_numpy().reshape(-1, len(target))
 
     @classmethod
     def compute(cls, real_data, synthetic_data, metadata=None,
                 entity_columns=None, target=None, configs=None):
-        if not all(isinstance(s, str) for s in target):
-            raise ValueError(
-                "target has to be a list of strings where each string specifies a feature column.")
-
         _, entity_columns = cls._validate_inputs(
             real_data, synthetic_data, metadata, entity_columns)
-        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
-        for col in target:
-            if col not in feature_cols:
-                raise ValueError(f"Column {col} is not a feature.")
-
-            # Convert datetime to unix timestamp (unit: second) in-place
-            if metadata['fields'][col]['type'] == 'datetime':
-                real_data[col] = pd.to_datetime(
-                    real_data[col]).astype(int) / 10**9
-                synthetic_data[col] = pd.to_datetime(
-                    synthetic_data[col]).astype(int) / 10**9
+
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns,
+                        target=target, configs=configs),
+            synthetic_data, metadata, entity_columns,
+            target=target, configs=configs)
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                target=None, configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+
+        real_columns = cls._target_columns(real_data, metadata, target)
+        return {
+            'schema': schema,
+            'real_columns': real_columns,
+            'real_stats': distribution_stats(
+                real_columns, cls._data_type(metadata, target))
+        }
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
 
         if metadata['fields'][target[0]]['type'] in ['numerical', 'datetime']:
             cls.min_value = 0.0
@@ -42,16 +73,12 @@ class FeatureDistSimilarity(TimeSeriesMetric):
             cls.min_value = 0.0
             cls.max_value = 1.0
 
-        real_columns = real_data[target].to_numpy().reshape(-1, len(target))
-        synthetic_columns = synthetic_data[target].to_numpy(
-        ).reshape(-1, len(target))
-
         return distribution_similarity(
-            real_data=real_columns,
-            synthetic_data=synthetic_columns,
+            real_data=profile['real_columns'],
+            synthetic_data=cls._target_columns(
+                synthetic_data, metadata, target),
             column_names=target,
-            data_type=['numerical'
-                       if metadata['fields'][col]['type'] == 'datetime' else
-                       metadata['fields'][col]['type'] for col in target],
+            data_type=cls._data_type(metadata, target),
             comparison_type=getattr(configs, 'comparison_type', 'both'),
-            categorical_mapping=getattr(configs, 'categorical_mapping', True))
+            categorical_mapping=getattr(configs, 'categorical_mapping', True),
+            real_stats=profile['real_stats'])
@@ -1,9 +1,8 @@
-import numpy as np
 import pandas as pd
 
 from sdmetrics.goal import Goal
 from sdmetrics.timeseries.base import TimeSeriesMetric
-from sdmetrics.timeseries.utils import distribution_similarity
+from sdmetrics.timeseries.utils import distribution_similarity, distribution_stats
 
 
 class InterarrivalDistSimilarity(TimeSeriesMetric):
@@ -14,48 +13,57 @@ class InterarrivalDistSimilarity(TimeSeriesMetric):
     min_value = 0.0
     max_value = float("inf")
 
+    @classmethod
+    def _interarrivals(cls, data, metadata):
+        # By SDV, metadata["sequence_index"] is the column name used to order the rows in the table
+        column_sequence_index = metadata["sequence_index"]
+        sequence_index = data[column_sequence_index]
+        # Convert datetime to unix timestamp (unit: second)
+        if metadata["fields"][column_sequence_index]["type"] == "datetime":
+            sequence_index = pd.to_datetime(
+                sequence_index).astype(int) / 10**9
+
+        return cls._sequence_tensor(data, metadata).diff(
+            sequence_index).reshape(-1, 1)
+
     @classmethod
     def compute(cls, real_data, synthetic_data, metadata=None,
                 entity_columns=None, configs=None):
         _, entity_columns = cls._validate_inputs(
             real_data, synthetic_data, metadata, entity_columns
         )
-        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
 
-        # By SDV, metadata["sequence_index"] is the column name used to order the rows in the table
-        column_sequence_index = metadata["sequence_index"]
-        # Convert datetime to unix timestamp (unit: second) in-place
-        if metadata["fields"][column_sequence_index]["type"] == "datetime":
-            real_data[column_sequence_index] = (pd.to_datetime(
-                real_data[column_sequence_index]).astype(int) / 10**9)
-            synthetic_data[column_sequence_index] = (pd.to_datetime(
-                synthetic_data[column_sequence_index]).astype(int) / 10**9)
-
-        real_gk = real_data.groupby(attribute_cols)
-        real_interarrival_within_flow_list = []
-        synthetic_gk = synthetic_data.groupby(attribute_cols)
-        synthetic_interarrival_within_flow_list = []
-
-        for group_name, df_group in real_gk:
-            real_interarrival_within_flow_list += list(
-                np.diff(df_group[column_sequence_index])
-            )
-        real_interarrival_within_flow_list = np.asarray(
-            real_interarrival_within_flow_list
-        ).reshape(-1, 1)
-        for group_name, df_group in synthetic_gk:
-            synthetic_interarrival_within_flow_list += list(
-                np.diff(df_group[column_sequence_index])
-            )
-        synthetic_interarrival_within_flow_list = np.asarray(
-            synthetic_interarrival_within_flow_list
-        ).reshape(-1, 1)
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns, configs=configs),
+            synthetic_data, metadata, entity_columns, configs=configs)
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+
+        real_interarrival_within_flow_list = cls._interarrivals(
+            real_data, metadata)
+        return {
+            'schema': schema,
+            'real_interarrivals': real_interarrival_within_flow_list,
+            'real_stats': distribution_stats(
+                real_interarrival_within_flow_list, ['numerical'])
+        }
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns
+        )
 
         return distribution_similarity(
-            real_data=real_interarrival_within_flow_list,
-            synthetic_data=synthetic_interarrival_within_flow_list,
+            real_data=profile['real_interarrivals'],
+            synthetic_data=cls._interarrivals(synthetic_data, metadata),
             column_names=["interarrival"],
             data_type=["numerical"],
             comparison_type=getattr(configs, "comparison_type", "both"),
-            categorical_mapping=True
+            categorical_mapping=True,
+            real_stats=profile['real_stats']
         )
@@ -1,9 +1,9 @@
 import numpy as np
-import pandas as pd
 
 from sdmetrics.goal import Goal
 from sdmetrics.timeseries.base import TimeSeriesMetric
 from sdmetrics.timeseries.utils import autocorrelation_similarity
+from sdmetrics.timeseries.utils.autocorrelation_similarity import get_autocorr
 
 
 class PerFeatureAutocorrelation(TimeSeriesMetric):
@@ -13,47 +13,81 @@ class PerFeatureAutocorrelation(TimeSeriesMetric):
     goal = Goal.MINIMIZE
     min_value = 0.0
     max_value = float("inf")
+    _target_kind = 'feature'
 
     @classmethod
-    def compute(cls, real_data, synthetic_data, metadata=None,
-                entity_columns=None, target=None, configs=None):
-        _, entity_columns = cls._validate_inputs(
-            real_data, synthetic_data, metadata, entity_columns)
-
-        if not all(isinstance(s, str) for s in target):
-            raise ValueError(
-                "target has to be a list of strings where each string specifies an attribute column.")
+    def _validate_target(cls, metadata, target):
+        super()._validate_target(metadata, target)
         assert len(target) == 1, \
             "`target` is expected to be a single-element list where the only element in the feature column to be computed."
 
-        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
         for col in target:
-            if col not in feature_cols:
-                raise ValueError(f"Column {col} is not a feature.")
             if metadata['fields'][col]['type'] != 'numerical':
                 raise ValueError(f"Column {col} is not a numerical feature")
 
-        real_gk = real_data.groupby(attribute_cols)
-        real_feature = []
-        synthetic_gk = synthetic_data.groupby(attribute_cols)
-        synthetic_feature = []
-        max_length = max(max(real_gk.size()), max(synthetic_gk.size()))
-
-        for group_name, df_group in real_gk:
-            real_feature.append(list(df_group[target[0]]) +
-                                [0.0] * (max_length - len(df_group)))
-        real_feature = np.asarray(
-            real_feature).reshape(-1, max_length)
-        for group_name, df_group in synthetic_gk:
-            synthetic_feature.append(list(df_group[target[0]]) +
-                                     [0.0] * (max_length - len(df_group)))
-        synthetic_feature = np.asarray(
-            synthetic_feature).reshape(-1, max_length)
+    @classmethod
+    def _padded_feature(cls, data, metadata, target, min_length=0):
+        # One row per time series, zero-padded to the longest one (or to
+        # `min_length` if longer)
+        tensor = cls._sequence_tensor(data, metadata)
+        return tensor.padded(
+            data[target[0]].to_numpy().astype(float),
+            max(max(tensor.lengths, default=0), min_length))
+
+    @classmethod
+    def compute(cls, real_data, synthetic_data, metadata=None,
+                entity_columns=None, target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            real_data, synthetic_data, metadata, entity_columns)
+
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns,
+                        target=target, configs=configs),
+            synthetic_data, metadata, entity_columns,
+            target=target, configs=configs)
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                target=None, configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+
+        real_feature = cls._padded_feature(real_data, metadata, target)
+        return {
+            'schema': schema,
+            'real_feature': real_feature,
+            # at the padded length of the real feature only
+            'real_autocorr': get_autocorr(real_feature).numpy()
+        }
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+
+        # Both are padded to the longest time series of either dataset
+        real_feature = profile['real_feature']
+        synthetic_feature = cls._padded_feature(
+            synthetic_data, metadata, target,
+            min_length=real_feature.shape[1])
+        max_length = synthetic_feature.shape[1]
+        if max_length == real_feature.shape[1]:
+            real_autocorr = profile['real_autocorr']
+        else:
+            # Longer synthetic time series: recomputed by
+            # autocorrelation_similarity
+            real_autocorr = None
+            real_feature = np.pad(
+                real_feature,
+                ((0, 0), (0, max_length - real_feature.shape[1])))
 
         return autocorrelation_similarity(
             real_data=real_feature,
             synthetic_data=synthetic_feature,
             column_names=target,
             data_type=[metadata['fields'][col]['type'] for col in target],
-            comparison_type='both'
+            comparison_type='both',
+            real_autocorr=real_autocorr
         )
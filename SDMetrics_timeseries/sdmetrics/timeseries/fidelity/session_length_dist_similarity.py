@@ -3,7 +3,7 @@ import pandas as pd
 
 from sdmetrics.goal import Goal
 from sdmetrics.timeseries.base import TimeSeriesMetric
-from sdmetrics.timeseries.utils import distribution_similarity
+from sdmetrics.timeseries.utils import distribution_similarity, distribution_stats
 
 
 class SessionLengthDistSimilarity(TimeSeriesMetric):
@@ -12,27 +12,49 @@ class SessionLengthDistSimilarity(TimeSeriesMetric):
     min_value = 0.0
     max_value = float("inf")
 
+    column_name = "session_length"
+
+    @classmethod
+    def _session_lengths(cls, data, metadata):
+        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
+        sess_length = data.groupby(
+            attribute_cols).size().reset_index(name=cls.column_name)
+        return sess_length[cls.column_name].to_numpy().reshape(-1, 1)
+
     @classmethod
     def compute(cls, real_data, synthetic_data, metadata=None,
                 entity_columns=None, configs=None):
         _, entity_columns = cls._validate_inputs(
             real_data, synthetic_data, metadata, entity_columns)
-        attribute_cols, feature_cols = cls._get_attribute_feature_cols(metadata)
 
-        column_name = "session_length"
-        real_sess_length = real_data.groupby(
-            attribute_cols).size().reset_index(name=column_name)
-        synthetic_sess_length = synthetic_data.groupby(
-            attribute_cols).size().reset_index(name=column_name)
-        real_column = real_sess_length[column_name].to_numpy().reshape(-1, 1)
-        synthetic_column = synthetic_sess_length[column_name].to_numpy(
-        ).reshape(-1, 1)
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns, configs=configs),
+            synthetic_data, metadata, entity_columns, configs=configs)
+
+    @classmethod
+    def profile(cls, real_data, metadata=None, entity_columns=None,
+                configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+
+        real_column = cls._session_lengths(real_data, metadata)
+        return {
+            'schema': schema,
+            'real_column': real_column,
+            'real_stats': distribution_stats(real_column, ['numerical'])
+        }
+
+    @classmethod
+    def score_against(cls, profile, synthetic_data, metadata=None,
+                      entity_columns=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns)
 
         return distribution_similarity(
-            real_data=real_column,
-            synthetic_data=synthetic_column,
-            column_names=[column_name],
+            real_data=profile['real_column'],
+            synthetic_data=cls._session_lengths(synthetic_data, metadata),
+            column_names=[cls.column_name],
             data_type=['numerical'],
             comparison_type=getattr(configs, 'comparison_type', 'both'),
-            categorical_mapping=True
+            categorical_mapping=True,
+            real_stats=profile['real_stats']
         )
@@ -3,7 +3,7 @@ import pandas as pd
 
 from sdmetrics.goal import Goal
 from sdmetrics.timeseries.base import TimeSeriesMetric
-from sdmetrics.timeseries.utils import distribution_similarity
+from sdmetrics.timeseries.utils import distribution_similarity, distribution_stats
 
 
 class SingleAttrSingleFeatureCorrelation(TimeSeriesMetric):
@@ -13,16 +13,8 @@ class SingleAttrSingleFeatureCorrelation(TimeSeriesMetric):
     goal = Goal.MINIMIZE
 
     @classmethod
-    def compute(
-            cls, real_data, synthetic_data,
-            metadata=None, entity_columns=None,
-            target=None, configs=None):
-        _, entity_columns = cls._validate_inputs(
-            real_data, synthetic_data, metadata, entity_columns)
-
-        if not all(isinstance(s, str) for s in target):
-            raise ValueError(
-                "target has to be a list of strings where each string specifies an attribute column.")
+    def _validate_target(cls, metadata, target):
+        super()._validate_target(metadata, target)
         assert len(target) == 2, \
             "`target` is expected to be a list including two elements representing one attribute column and one feature column."
 
@@ -36,6 +28,50 @@ class SingleAttrSingleFeatureCorrelation(TimeSeriesMetric):
         assert metadata['fields'][attr_name]['type'] == 'categorical', \
             f"attribute needs to be a categorical variable"
 
+    @classmethod
+    def compute(
+            cls, real_data, synthetic_data,
+            metadata=None, entity_columns=None,
+            target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            real_data, synthetic_data, metadata, entity_columns)
+
+        return cls.score_against(
+            cls.profile(real_data, metadata, entity_columns,
+                        target=target, configs=configs),
+            synthetic_data, metadata, entity_columns,
+            target=target, configs=configs)
+
+    @classmethod
+    def profile(
+            cls, real_data, metadata=None, entity_columns=None,
+            target=None, configs=None):
+        schema = cls._profile_schema(real_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+        attr_name, feature_name = target[0], target[1]
+
+        # attribute value -> (feature values, statistics)
+        real_features = {}
+        for v in set(real_data[attr_name]):
+            f_real = real_data[real_data[attr_name] == v
+                               ][feature_name].to_numpy().reshape(-1, 1)
+            real_features[v] = (f_real, distribution_stats(
+                f_real, [metadata['fields'][feature_name]['type']]))
+
+        return {
+            'schema': schema,
+            'real_features': real_features
+        }
+
+    @classmethod
+    def score_against(
+            cls, profile, synthetic_data, metadata=None, entity_columns=None,
+            target=None, configs=None):
+        _, entity_columns = cls._validate_inputs(
+            profile['schema'], synthetic_data, metadata, entity_columns)
+        cls._validate_target(metadata, target)
+        attr_name, feature_name = target[0], target[1]
+
         if metadata['fields'][feature_name]['type'] in ['numerical', 'datetime']:
             cls.min_value = 0.0
             cls.max_value = float("inf")
@@ -44,9 +80,7 @@ class SingleAttrSingleFeatureCorrelation(TimeSeriesMetric):
             cls.max_value = 1.0
 
         scores = {}
-        for v in set(real_data[attr_name]):
-            f_real = real_data[real_data[attr_name] == v
-                               ][feature_name].to_numpy().reshape(-1, 1)
+        for v, (f_real, real_stats) in profile['real_features'].items():
             f_syn = synthetic_data[synthetic_data[attr_name] == v
                                    ][feature_name].to_numpy().reshape(-1, 1)
             scores[f"{attr_name}: {v}"] = distribution_similarity(
@@ -55,7 +89,8 @@ class SingleAttrSingleFeatureCorrelation(TimeSeriesMetric):
                 column_names=[feature_name],
                 data_type=[metadata['fields'][feature_name]['type']],
                 comparison_type=getattr(configs, 'comparison_type', 'both'),
-                categorical_mapping=True
+                categorical_mapping=True,
+                real_stats=real_stats
             )
 
         return scores
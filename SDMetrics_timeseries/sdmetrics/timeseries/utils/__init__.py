@@ -1,10 +1,11 @@
-from .distribution_similarity import distribution_similarity
+from .distribution_similarity import distribution_similarity, distribution_stats
 from .coverage import coverage
 from .pearson_corr import pearson_corr
 from .autocorrelation_similarity import autocorrelation_similarity
 
 __all__ = [
     'distribution_similarity',
+    'distribution_stats',
     'coverage',
     'pearson_corr',
     'autocorrelation_similarity'
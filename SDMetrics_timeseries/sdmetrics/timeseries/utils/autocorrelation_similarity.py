@@ -49,7 +49,9 @@ def autocorrelation_similarity(
     column_names: List[str],
     data_type: List[Literal['categorical', 'numerical']],
     comparison_type: Literal['quantitative', 'qualitative', 'both'],
+    real_autocorr: Optional[np.ndarray] = None
 ):
+    """`real_autocorr`: `get_autocorr(real_data)` if precomputed."""
     assert len(column_names) == 1, \
         "The length of columns should be 1."
 
@@ -64,7 +66,8 @@ def autocorrelation_similarity(
     real_data = real_data.astype(float)
     synthetic_data = synthetic_data.astype(float)
 
-    real_autocorr = get_autocorr(real_data).numpy()
+    if real_autocorr is None:
+        real_autocorr = get_autocorr(real_data).numpy()
     synthetic_autocorr = get_autocorr(synthetic_data).numpy()
 
     if comparison_type in ['quantitative', 'both']:
@@ -13,7 +13,15 @@ from scipy.stats import wasserstein_distance
 from .misc import get_frequencies
 
 
-def jsd(p: np.ndarray, q: np.ndarray, categorical_mapping: bool):
+def value_counts(p: np.ndarray):
+    """Counter of the values (d=1) or of the rows (d>=2) of a nxd array."""
+    if p.shape[1] == 1:
+        return Counter(p.T[0])
+    return Counter(map(tuple, p))
+
+
+def jsd(p: np.ndarray, q: np.ndarray, categorical_mapping: bool,
+        p_counts: Optional[Counter] = None):
     """Compute the Jensen-Shannon distance (metric) between two distributions. This is the square root of the Jensen-Shannon divergence.
 
     Args: 
@@ -21,6 +29,7 @@ def jsd(p: np.ndarray, q: np.ndarray, categorical_mapping: bool):
         q: mxd array.
             p and q can have different number of samples (n \neq m), but the dimensionality has to be the same (d).
         categorical_mapping: exact mapping for categorical variable or not.
+        p_counts: `value_counts(p)` if precomputed.
     """
     assert len(p.shape) == len(q.shape) == 2, \
         "p and q must be arrays of shape (n, d). " \
@@ -31,18 +40,40 @@ def jsd(p: np.ndarray, q: np.ndarray, categorical_mapping: bool):
 
     # 1D
     if p.shape[1] == 1:
-        f_p, f_q = get_frequencies(p.T[0], q.T[0], categorical_mapping)
+        f_p, f_q = get_frequencies(
+            p.T[0] if p_counts is None else p_counts, q.T[0],
+            categorical_mapping)
         return distance.jensenshannon(f_p, f_q)
     # multi(>=2)-dimension
     elif p.shape[1] > 1:
         f_p, f_q = get_frequencies(
-            list(map(tuple, p)), list(map(tuple, q)), categorical_mapping)
+            list(map(tuple, p)) if p_counts is None else p_counts,
+            list(map(tuple, q)), categorical_mapping)
         return distance.jensenshannon(f_p, f_q)
     else:
         raise ValueError("Invalid dimensions!")
 
 
-def emd(p: np.ndarray, q: np.ndarray):
+def sorted_values(p: np.ndarray):
+    """Sorted values of a nx1 array, as used by `emd`."""
+    return np.sort(np.asarray(p.T[0], dtype=float))
+
+
+def wasserstein_distance_sorted(u_sorted: np.ndarray, v_sorted: np.ndarray):
+    """`scipy.stats.wasserstein_distance` (w/o weights) of sorted samples."""
+    if len(u_sorted) == 0 or len(v_sorted) == 0:
+        raise ValueError("Distribution can't be empty.")
+
+    all_values = np.concatenate((u_sorted, v_sorted))
+    all_values.sort(kind='mergesort')
+    deltas = np.diff(all_values)
+
+    u_cdf = u_sorted.searchsorted(all_values[:-1], 'right') / u_sorted.size
+    v_cdf = v_sorted.searchsorted(all_values[:-1], 'right') / v_sorted.size
+    return np.sum(np.abs(u_cdf - v_cdf) * deltas)
+
+
+def emd(p: np.ndarray, q: np.ndarray, p_sorted: Optional[np.ndarray] = None):
     """Compute the Wasserstein distance between two distributions.
 
     For 1D arrays, use scipy.stats.wasserstein_distance().
@@ -52,6 +83,7 @@ def emd(p: np.ndarray, q: np.ndarray):
         p: nxd array.
         q: mxd array.
             p and q can have different number of samples (n \neq m), but the dimensionality has to be the same (d).
+        p_sorted: `sorted_values(p)` if precomputed (d=1 only).
     """
     assert len(p.shape) == len(q.shape) == 2, \
         "p and q must be arrays of shape (n, d). " \
@@ -62,6 +94,8 @@ def emd(p: np.ndarray, q: np.ndarray):
 
     # d=1
     if p.shape[1] == 1:
+        if p_sorted is not None:
+            return wasserstein_distance_sorted(p_sorted, sorted_values(q))
         return wasserstein_distance(p.T[0], q.T[0])
     # d>=2
     elif p.shape[1] > 1:
@@ -9,7 +9,7 @@ except ImportError:
     from typing_extensions import Literal
 from typing import Optional, Dict, List
 from collections import Counter, OrderedDict
-from .distance import jsd, emd
+from .distance import jsd, emd, value_counts, sorted_values
 from sdmetrics.reports.utils import make_discrete_column_plot, make_continuous_column_plot
 
 
@@ -20,7 +20,8 @@ def distribution_similarity(
     column_names: List[str],
     data_type: List[Literal['categorical', 'numerical']],
     comparison_type: Literal['quantitative', 'qualitative', 'both'],
-    categorical_mapping: Optional[bool] = None
+    categorical_mapping: Optional[bool] = None,
+    real_stats: Optional[Dict] = None
 ):
     """Computes the quantitative and/or qualitative similarity between two distributions
 
@@ -31,6 +32,7 @@ def distribution_similarity(
         Data type (categorical, continuous)
         Type of comparison (quantitative, qualitative, both)
         Categorical mapping: search exact mapping of values
+        Real stats: `distribution_stats(real_data, data_type)` if precomputed
     """
     assert len(real_data.shape) == len(synthetic_data.shape) == 2, \
         "Both real data and synthetic data must be 2D array. " \
@@ -50,11 +52,15 @@ def distribution_similarity(
         if set(data_type) == {'categorical'}:
             assert categorical_mapping is not None, \
                 "Categorical variable, `categorical_mapping` must be set."
-            output.append(jsd(real_data, synthetic_data, categorical_mapping))
+            output.append(jsd(
+                real_data, synthetic_data, categorical_mapping,
+                p_counts=(real_stats or {}).get('counts')))
 
         # numerical only
         elif set(data_type) == {'numerical'}:
-            output.append(emd(real_data, synthetic_data))
+            output.append(emd(
+                real_data, synthetic_data,
+                p_sorted=(real_stats or {}).get('sorted')))
 
         # categorical/numerical mixed: discretizing numerical variables
         # TODO: think of alternative strategy
@@ -88,3 +94,17 @@ def distribution_similarity(
         # TODO:
 
     return output
+
+
+def distribution_stats(
+    real_data: np.ndarray,
+    data_type: List[Literal['categorical', 'numerical']]
+):
+    """Real-side statistics of `distribution_similarity` (frequency table
+    or sorted samples), to be passed as `real_stats` when the same real data
+    is compared with several synthetic datasets."""
+    if set(data_type) == {'categorical'}:
+        return {'counts': value_counts(real_data)}
+    elif set(data_type) == {'numerical'} and real_data.shape[1] == 1:
+        return {'sorted': sorted_values(real_data)}
+    return {}
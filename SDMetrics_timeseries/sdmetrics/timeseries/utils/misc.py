@@ -1,52 +1,81 @@
 from typing import Optional, Dict, List
-from collections import Counter, OrderedDict
+from collections import Counter
+
+import numpy as np
+import pandas as pd
 try:
     from typing import Literal
 except ImportError:
     from typing_extensions import Literal
 
 
+def _unique_counts(values):
+    """Distinct values (in order of first occurrence) and their counts.
+
+    `values` is an iterable of hashable objects, or a `Counter` of them.
+    """
+    if isinstance(values, Counter):
+        return pd.Series(list(values.keys()), dtype=object).to_numpy(), \
+            np.fromiter(values.values(), dtype=np.int64, count=len(values))
+
+    if not isinstance(values, np.ndarray):
+        # keeps tuples as objects
+        values = pd.Series(list(values), dtype=object).to_numpy()
+    codes, uniques = pd.factorize(values)
+    if np.any(codes == -1):
+        # NaN/None are counted as one value, as the other values
+        codes = np.where(codes == -1, len(uniques), codes)
+        uniques = np.append(uniques.astype(object), None)
+    return uniques, np.bincount(codes, minlength=len(uniques))
+
+
 def get_frequencies(real: List, synthetic: List, categorical_mapping: bool):
     """Get percentual frequencies for each possible real categorical value.
     Given two iterators containing categorical data, this transforms it into
     real/synthetic frequencies which can be used for statistical tests. It
     adds a regularization term (zero) to handle cases where the synthetic data contains values that don't exist in the real data.
 
+    Runs in O(n) for n values (no per-value Python loop).
+
     Args:
         real (list):
-            A list of hashable objects.
+            A list (or 1-D array) of hashable objects, or a `Counter` of
+            them.
         synthetic (list):
-            A list of hashable objects.
+            A list (or 1-D array) of hashable objects.
         categorical_mapping (bool): 
             search exact mapping of values
-    Yields:
-        tuple[list, list]:
-            The real and synthetic frequencies (as a percent).
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]:
+            The real and synthetic frequencies (as a percent). With
+            `categorical_mapping`, in the order of the real values followed
+            by the synthetic values that are not in the real data. Otherwise,
+            sorted in decreasing order of frequency.
 
     Reference: https://github.com/netsharecmu/SDMetrics_timeseries/blob/6983bc075073a794aabb4a9d48badfbbf0f6ec70/sdmetrics/utils.py#L45-L74
     """
+    real_values, c_real = _unique_counts(real)
+    syn_values, c_syn = _unique_counts(synthetic)
     if categorical_mapping:
-        f_real, f_syn = [], []
-        real, synthetic = Counter(real), Counter(synthetic)
-        for value in synthetic:
-            if value not in real:
-                # warnings.warn(f'Unexpected value {value} in synthetic data.')
-                real[value] = 0  # Regularization to prevent NaN.
-
-        for value in real:
-            f_syn.append(synthetic[value] / sum(synthetic.values()))  # noqa: PD011
-            f_real.append(real[value] / sum(real.values()))  # noqa: PD011
+        real_index = pd.Index(real_values, dtype=object, tupleize_cols=False)
+        syn_index = pd.Index(syn_values, dtype=object, tupleize_cols=False)
+        positions = real_index.get_indexer(syn_index)
+        # Regularization to prevent NaN: the synthetic values that are not
+        # in the real data have a real frequency of zero
+        unexpected = positions == -1
+        c_syn_aligned = np.zeros(len(c_real), dtype=np.int64)
+        c_syn_aligned[positions[~unexpected]] = c_syn[~unexpected]
+        c_syn_aligned = np.concatenate([c_syn_aligned, c_syn[unexpected]])
+        c_real_aligned = np.concatenate([
+            c_real, np.zeros(np.count_nonzero(unexpected), dtype=np.int64)])
     else:
-        c_real, c_syn = \
-            list(OrderedDict(Counter(real).most_common()).values()), \
-            list(OrderedDict(
-                Counter(synthetic).most_common()).values())
         # pad c_real and c_syn to be the same length with zeros
         real_syn_max_len = max(len(c_real), len(c_syn))
-        c_real += [0]*(real_syn_max_len - len(c_real))
-        c_syn += [0]*(real_syn_max_len - len(c_syn))
-        f_real, f_syn = [i/sum(c_real) for i in c_real], \
-            [i/sum(c_syn) for i in c_syn]
+        c_real_aligned, c_syn_aligned = [
+            np.pad(np.sort(c)[::-1], (0, real_syn_max_len - len(c)))
+            for c in [c_real, c_syn]]
+    f_real = c_real_aligned / np.sum(c_real)
+    f_syn = c_syn_aligned / np.sum(c_syn)
 
     # assert sum(f_real) == 1.0 and sum(
     #     f_syn) == 1.0, f"Relative frequency should sum up to 1.0. f_real: {sum(f_real)}, f_syn: {sum(f_syn)}"
@@ -0,0 +1,279 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sdmetrics.reports.timeseries import QualityReport
+from sdmetrics.reports.timeseries.executor import SharedFrame
+from sdmetrics.reports.timeseries.quality_report import _read_only_view
+
+METADATA = {
+    'fields': {
+        'srcip': {'type': 'categorical'},
+        'proto': {'type': 'categorical'},
+        'time': {'type': 'datetime'},
+        'pkt_len': {'type': 'numerical'},
+        'ttl': {'type': 'numerical'},
+        'flag': {'type': 'categorical'},
+    },
+    'entity_columns': ['srcip', 'proto'],
+    'context_columns': [],
+    'sequence_index': 'time',
+}
+
+
+def _quality_report_config(comparison_type):
+    configs = {'comparison_type': comparison_type}
+    return {'metrics': {'fidelity': [
+        {'Single attribute distributional similarity': {
+            'class': 'AttrDistSimilarity',
+            'target_list': [['srcip'], ['proto'], ['srcip', 'proto']],
+            'configs': configs}},
+        {'Single attribute coverage': {
+            'class': 'SingleAttrCoverage',
+            'target_list': [['proto']]}},
+        {'Session length distributional similarity': {
+            'class': 'SessionLengthDistSimilarity',
+            'configs': configs}},
+        {'Single feature distributional similarity': {
+            'class': 'FeatureDistSimilarity',
+            'target_list': [['pkt_len'], ['flag'], ['time']],
+            'configs': configs}},
+        {'Cross feature correlation': {
+            'class': 'CrossFeatureCorrelation',
+            'target_list': [['pkt_len', 'ttl']]}},
+        {'Interarrival distributional similarity': {
+            'class': 'InterarrivalDistSimilarity',
+            'configs': configs}},
+        {'Per feature autocorrelation': {
+            'class': 'PerFeatureAutocorrelation',
+            'target_list': [['pkt_len']]}},
+        {'Single attribute single feature correlation': {
+            'class': 'SingleAttrSingleFeatureCorrelation',
+            'target_list': [['proto', 'pkt_len']],
+            'configs': configs}},
+    ]}}
+
+
+def _make_data(num_rows, num_sessions, seed):
+    rng = np.random.default_rng(seed)
+    session = rng.integers(0, num_sessions, num_rows)
+    return pd.DataFrame({
+        'srcip': session % 7,
+        'proto': np.array(['TCP', 'UDP'])[session % 2],
+        'time': pd.to_datetime(
+            np.sort(rng.integers(0, 10**12, num_rows)), unit='us'),
+        'pkt_len': rng.integers(40, 1500, num_rows).astype(float),
+        'ttl': rng.integers(1, 255, num_rows),
+        'flag': rng.choice(['A', 'S', 'F'], num_rows),
+    })
+
+
+def _scores(dict_metric_scores, prefix=(), best_worst=False):
+    # {(metric_type, metric_name, ...): score (or (best, worst))}, w/o the
+    # figures
+    scores = {}
+    for key, value in dict_metric_scores.items():
+        if isinstance(value, list):
+            scores[prefix + (key,)] = \
+                value[0][1:] if best_worst else value[0][0]
+        else:
+            scores.update(_scores(value, prefix + (key,), best_worst))
+    return scores
+
+
+@pytest.mark.parametrize('comparison_type', ['quantitative', 'both'])
+def test_score_against_matches_generate(comparison_type):
+    """Test that ``score_against`` gives the same scores as ``generate``.
+
+    Each synthetic dataset is scored against a profile of the real data built
+    once, and compared to a full ``generate`` on the real data.
+    """
+    # Setup
+    real_data = _make_data(600, 40, seed=0)
+    synthetic_datasets = [
+        _make_data(500, 35, seed=1), _make_data(800, 50, seed=2)]
+    report = QualityReport(
+        config_dict=_quality_report_config(comparison_type))
+
+    # Run
+    profile = report.build_profile(real_data, METADATA)
+    for synthetic_data in synthetic_datasets:
+        report.score_against(profile, synthetic_data)
+        profile_scores = _scores(report.dict_metric_scores)
+        report.generate(real_data, synthetic_data, METADATA)
+        generate_scores = _scores(report.dict_metric_scores)
+
+        # Assert
+        assert list(profile_scores.keys()) == list(generate_scores.keys())
+        np.testing.assert_allclose(
+            list(profile_scores.values()), list(generate_scores.values()),
+            rtol=1e-9)
+
+
+def test_score_against_does_not_modify_data():
+    """Test that neither the real nor the synthetic data is modified.
+
+    The datetime columns are converted to unix timestamps for some metrics.
+    """
+    # Setup
+    real_data = _make_data(300, 20, seed=0)
+    synthetic_data = _make_data(300, 20, seed=1)
+    real_copy = real_data.copy(deep=True)
+    synthetic_copy = synthetic_data.copy(deep=True)
+    report = QualityReport(config_dict=_quality_report_config('quantitative'))
+
+    # Run
+    report.score_against(
+        report.build_profile(real_data, METADATA), synthetic_data)
+
+    # Assert
+    pd.testing.assert_frame_equal(real_data, real_copy)
+    pd.testing.assert_frame_equal(synthetic_data, synthetic_copy)
+
+
+def test_score_against_does_not_modify_profile():
+    """Test that the profile is not modified, also with longer synthetic time
+    series than the real ones."""
+    # Setup
+    real_data = _make_data(300, 20, seed=0)
+    synthetic_data = _make_data(300, 5, seed=1)
+    report = QualityReport(config_dict=_quality_report_config('both'))
+    profile = report.build_profile(real_data, METADATA)
+    profile_bytes = pickle.dumps(profile)
+
+    # Run
+    report.score_against(profile, synthetic_data)
+
+    # Assert
+    assert pickle.dumps(profile) == profile_bytes
+
+
+def test_score_against_different_columns():
+    """Test that the synthetic data is validated against the profile."""
+    # Setup
+    real_data = _make_data(300, 20, seed=0)
+    report = QualityReport(config_dict=_quality_report_config('quantitative'))
+    profile = report.build_profile(real_data, METADATA)
+
+    # Run and Assert
+    with pytest.raises(ValueError, match='must have the same columns'):
+        report.score_against(
+            profile, real_data.drop(columns=['ttl']))
+
+
+@pytest.mark.parametrize('comparison_type', ['quantitative', 'both'])
+def test_generate_copy_free(comparison_type):
+    """Test ``generate`` w/o copies against the default ``generate``.
+
+    Expect the same scores, with the datetime columns converted once up
+    front, and the input data left untouched.
+    """
+    # Setup
+    real_data = _make_data(600, 40, seed=0)
+    synthetic_data = _make_data(500, 35, seed=1)
+    real_copy = real_data.copy(deep=True)
+    synthetic_copy = synthetic_data.copy(deep=True)
+    report = QualityReport(
+        config_dict=_quality_report_config(comparison_type))
+
+    # Run
+    report.generate(real_data, synthetic_data, METADATA)
+    copy_scores = _scores(report.dict_metric_scores)
+    report.generate(real_data, synthetic_data, METADATA, copy_data=False)
+    copy_free_scores = _scores(report.dict_metric_scores)
+
+    # Assert
+    assert list(copy_free_scores.keys()) == list(copy_scores.keys())
+    np.testing.assert_allclose(
+        list(copy_free_scores.values()), list(copy_scores.values()),
+        rtol=1e-9)
+    pd.testing.assert_frame_equal(real_data, real_copy)
+    pd.testing.assert_frame_equal(synthetic_data, synthetic_copy)
+    assert METADATA['fields']['time']['type'] == 'datetime'
+
+
+def test__read_only_view():
+    """Test that the columns are shared with the input data, read-only."""
+    # Setup
+    data = _make_data(100, 10, seed=0)
+
+    # Run
+    view = _read_only_view(data, METADATA)
+
+    # Assert
+    for col in ['srcip', 'proto', 'pkt_len', 'ttl', 'flag']:
+        assert np.shares_memory(view[col].to_numpy(), data[col].to_numpy())
+    np.testing.assert_allclose(
+        view['time'], data['time'].astype(int) / 10**9)
+    with pytest.raises(ValueError, match='read-only'):
+        view.loc[0, 'pkt_len'] = 0.0
+
+
+@pytest.mark.parametrize('copy_data', [True, False])
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_generate_executor(executor, copy_data):
+    """Test ``generate`` with a thread/process pool against the sequential one.
+
+    Expect the same scores, best/worst values and order of
+    ``dict_metric_scores``, although the targets of a metric (with
+    different best/worst values) run at the same time.
+    """
+    # Setup
+    real_data = _make_data(600, 40, seed=0)
+    synthetic_data = _make_data(500, 35, seed=1)
+    real_copy = real_data.copy(deep=True)
+    report = QualityReport(config_dict=_quality_report_config('both'))
+
+    # Run
+    report.generate(real_data, synthetic_data, METADATA, copy_data=copy_data)
+    sequential_scores = report.dict_metric_scores
+    report.generate(real_data, synthetic_data, METADATA, copy_data=copy_data,
+                    executor=executor, max_workers=4)
+    parallel_scores = report.dict_metric_scores
+
+    # Assert
+    assert list(_scores(parallel_scores).keys()) == \
+        list(_scores(sequential_scores).keys())
+    np.testing.assert_allclose(
+        list(_scores(parallel_scores).values()),
+        list(_scores(sequential_scores).values()), rtol=1e-9)
+    assert _scores(parallel_scores, best_worst=True) == \
+        _scores(sequential_scores, best_worst=True)
+    pd.testing.assert_frame_equal(real_data, real_copy)
+
+
+def test_generate_unknown_executor():
+    """Test that an unknown executor raises a ``ValueError``."""
+    # Setup
+    data = _make_data(100, 10, seed=0)
+    report = QualityReport(config_dict=_quality_report_config('both'))
+
+    # Run and Assert
+    with pytest.raises(ValueError, match='Unknown executor'):
+        report.generate(data, data, METADATA, executor='gpu')
+
+
+def test_shared_frame():
+    """Test that a ``SharedFrame`` round trip gives the same DataFrame.
+
+    The numerical/datetime columns are in shared memory (read-only), the
+    object columns are pickled.
+    """
+    # Setup
+    data = _make_data(100, 10, seed=0)
+
+    # Run
+    shared = SharedFrame(data)
+    try:
+        loaded = pickle.loads(pickle.dumps(shared))
+        frame = loaded.to_frame()
+
+        # Assert
+        pd.testing.assert_frame_equal(frame, data)
+        assert not frame['pkt_len'].to_numpy().flags.writeable
+        assert not np.shares_memory(
+            frame['pkt_len'].to_numpy(), data['pkt_len'].to_numpy())
+    finally:
+        shared.unlink()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from scipy.stats import wasserstein_distance
+
+from sdmetrics.timeseries.utils.distance import (
+    emd, jsd, sorted_values, value_counts, wasserstein_distance_sorted)
+
+
+@pytest.mark.parametrize('sizes', [(1, 1), (10, 1000), (997, 1003)])
+def test_wasserstein_distance_sorted(sizes):
+    """Test that it matches ``scipy.stats.wasserstein_distance``."""
+    # Setup
+    rng = np.random.default_rng(0)
+    u_values = rng.normal(size=sizes[0])
+    v_values = np.round(rng.exponential(size=sizes[1]), 2)
+
+    # Run
+    distance = wasserstein_distance_sorted(
+        np.sort(u_values), np.sort(v_values))
+
+    # Assert
+    assert distance == pytest.approx(
+        wasserstein_distance(u_values, v_values), rel=1e-12)
+
+
+def test_wasserstein_distance_sorted_empty():
+    """Test that an empty distribution raises an error, as in scipy."""
+    with pytest.raises(ValueError, match="can't be empty"):
+        wasserstein_distance_sorted(np.array([]), np.array([1.0]))
+
+
+def test_emd_p_sorted():
+    """Test ``emd`` with the precomputed sorted real values."""
+    # Setup
+    rng = np.random.default_rng(0)
+    p = rng.integers(0, 100, (500, 1))
+    q = rng.integers(0, 120, (300, 1))
+
+    # Run and Assert
+    assert emd(p, q, p_sorted=sorted_values(p)) == pytest.approx(
+        emd(p, q), rel=1e-12)
+
+
+@pytest.mark.parametrize('categorical_mapping', [True, False])
+@pytest.mark.parametrize('dim', [1, 2])
+def test_jsd_p_counts(categorical_mapping, dim):
+    """Test ``jsd`` with the precomputed real frequency table."""
+    # Setup
+    rng = np.random.default_rng(0)
+    p = rng.choice(['a', 'b', 'c'], (500, dim))
+    q = rng.choice(['a', 'b', 'd'], (300, dim))
+
+    # Run and Assert
+    assert jsd(p, q, categorical_mapping, p_counts=value_counts(p)) == \
+        jsd(p, q, categorical_mapping)
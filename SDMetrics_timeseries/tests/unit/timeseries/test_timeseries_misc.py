@@ -0,0 +1,76 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from sdmetrics.timeseries.utils.misc import get_frequencies
+
+
+def test_get_frequencies_categorical_mapping():
+    """Test the frequencies aligned by value.
+
+    Expect the real values in order of first occurrence, followed by the
+    synthetic values that are not in the real data (w/ a real frequency of
+    zero).
+    """
+    # Setup
+    real = ['b', 'a', 'b', 'c']
+    synthetic = ['d', 'a', 'a', 'b']
+
+    # Run
+    f_real, f_syn = get_frequencies(real, synthetic, True)
+
+    # Assert
+    np.testing.assert_array_equal(f_real, [0.5, 0.25, 0.25, 0.0])
+    np.testing.assert_array_equal(f_syn, [0.25, 0.5, 0.0, 0.25])
+
+
+def test_get_frequencies_rank():
+    """Test the frequencies aligned by rank, padded with zeros."""
+    # Setup
+    real = [1, 1, 1, 2]
+    synthetic = [5, 6, 7, 7]
+
+    # Run
+    f_real, f_syn = get_frequencies(real, synthetic, False)
+
+    # Assert
+    np.testing.assert_array_equal(f_real, [0.75, 0.25, 0.0])
+    np.testing.assert_array_equal(f_syn, [0.5, 0.25, 0.25])
+
+
+@pytest.mark.parametrize('categorical_mapping', [True, False])
+def test_get_frequencies_tuples_and_counter(categorical_mapping):
+    """Test multi-dimensional values (tuples), w/ the real data as a Counter.
+
+    Expect the same frequencies as w/ the list of real values.
+    """
+    # Setup
+    rng = np.random.default_rng(0)
+    real = list(map(tuple, rng.integers(0, 4, (500, 2))))
+    synthetic = list(map(tuple, rng.integers(2, 6, (300, 2))))
+
+    # Run
+    f_real, f_syn = get_frequencies(real, synthetic, categorical_mapping)
+    f_real_counter, f_syn_counter = get_frequencies(
+        Counter(real), synthetic, categorical_mapping)
+
+    # Assert
+    np.testing.assert_array_equal(f_real, f_real_counter)
+    np.testing.assert_array_equal(f_syn, f_syn_counter)
+    assert f_real.sum() == pytest.approx(1.0)
+    assert f_syn.sum() == pytest.approx(1.0)
+
+
+def test_get_frequencies_mixed_numeric_types():
+    """Test that equal ints and floats are the same value, as in a dict."""
+    # Setup
+    real = np.array([1, 2, 2])
+    synthetic = np.array([2.0, 3.0])
+
+    # Run
+    f_real, f_syn = get_frequencies(real, synthetic, True)
+
+    # Assert
+    np.testing.assert_array_equal(f_real, [1 / 3, 2 / 3, 0.0])
+    np.testing.assert_array_equal(f_syn, [0.0, 0.5, 0.5])
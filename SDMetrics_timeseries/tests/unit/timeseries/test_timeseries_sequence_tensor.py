@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from sdmetrics.timeseries.base import SequenceTensor, sequence_tensor
+from sdmetrics.timeseries.fidelity import InterarrivalDistSimilarity
+
+
+def _data():
+    return pd.DataFrame({
+        'flow': ['b', 'a', 'b', None, 'a', 'b'],
+        'time': [5.0, 2.0, 1.0, 0.0, 4.0, 3.0],
+        'value': [10, 20, 30, 40, 50, 60],
+    })
+
+
+def test_sequence_tensor_layout():
+    """Test the CSR layout.
+
+    Expect the sequences in ``groupby`` order, sorted by the sequence index,
+    w/o the rows w/ a missing attribute.
+    """
+    # Run
+    tensor = SequenceTensor(_data(), ['flow'], 'time')
+
+    # Assert
+    assert len(tensor) == 2
+    np.testing.assert_array_equal(tensor.order, [1, 4, 2, 5, 0])
+    np.testing.assert_array_equal(tensor.offsets, [0, 2, 5])
+    np.testing.assert_array_equal(tensor.lengths, [2, 3])
+    assert list(tensor.attributes['flow']) == ['a', 'b']
+
+
+def test_sequence_tensor_diff_and_padded():
+    """Test the within-sequence differences and the zero-padded tensor."""
+    # Setup
+    data = _data()
+    tensor = SequenceTensor(data, ['flow'], 'time')
+
+    # Run
+    diff = tensor.diff(data['time'])
+    padded = tensor.padded(data['value'])
+    padded_longer = tensor.padded(data[['time', 'value']].to_numpy(), 4)
+
+    # Assert
+    np.testing.assert_array_equal(diff, [2.0, 2.0, 2.0])
+    np.testing.assert_array_equal(padded, [[20, 50, 0], [30, 60, 10]])
+    assert padded_longer.shape == (2, 4, 2)
+    np.testing.assert_array_equal(
+        padded_longer[0], [[2.0, 20], [4.0, 50], [0, 0], [0, 0]])
+
+
+def test_sequence_tensor_row_order():
+    """Test that w/o a sequence index, the rows keep the table order."""
+    # Setup
+    data = _data()
+
+    # Run
+    tensor = SequenceTensor(data, ['flow'])
+
+    # Assert
+    np.testing.assert_array_equal(tensor.order, [1, 4, 0, 2, 5])
+
+
+def test_sequence_tensor_cache():
+    """Test that the tensor is cached per table, and dropped with it."""
+    # Setup
+    data = _data()
+
+    # Run
+    tensor = sequence_tensor(data, ['flow'], 'time')
+
+    # Assert
+    assert sequence_tensor(data, ['flow'], 'time') is tensor
+    assert sequence_tensor(data, ['flow']) is not tensor
+    assert sequence_tensor(data.copy(), ['flow'], 'time') is not tensor
+
+
+def test_interarrivals_matches_groupby():
+    """Test the interarrivals against a per-flow ``groupby`` loop."""
+    # Setup
+    rng = np.random.default_rng(0)
+    num_rows = 2000
+    data = pd.DataFrame({
+        'srcip': rng.integers(0, 50, num_rows),
+        'proto': rng.choice(['TCP', 'UDP'], num_rows),
+        'time': pd.to_datetime(
+            np.sort(rng.integers(0, 10**12, num_rows)), unit='us'),
+    })
+    metadata = {
+        'fields': {
+            'srcip': {'type': 'categorical'},
+            'proto': {'type': 'categorical'},
+            'time': {'type': 'datetime'},
+        },
+        'entity_columns': ['srcip', 'proto'],
+        'context_columns': [],
+        'sequence_index': 'time',
+    }
+    seconds = data.assign(time=data['time'].astype(int) / 10**9)
+    expected = np.concatenate([
+        np.diff(df_group['time'])
+        for _, df_group in seconds.groupby(['srcip', 'proto'])])
+
+    # Run
+    interarrivals = InterarrivalDistSimilarity._interarrivals(data, metadata)
+
+    # Assert
+    np.testing.assert_array_equal(interarrivals, expected.reshape(-1, 1))